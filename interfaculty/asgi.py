@@ -2,6 +2,9 @@
 ASGI config for interfaculty project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through this entry point (e.g. gunicorn with an ASGI worker
+class) so the notification stream in transfer/views_realtime.py holds an
+event-loop task per listener instead of a whole worker.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -4,6 +4,7 @@ Django settings for interfaculty project.
 
 from pathlib import Path
 import os
+import sys
 import dj_database_url
 from decouple import config
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,18 +33,23 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise here
+    'transfer.timing.ServerTimingMiddleware',  # Server-Timing header and per-route timings
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'transfer.middleware.ProfileMiddleware',  # request.profile, cached in the session
+    'transfer.audit.AuditMiddleware',  # actor and address for audit entries
+    'transfer.replicas.ReplicaMiddleware',  # read-your-writes for replica reads; off without a replica
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'transfer.timing.ViewTimingMiddleware',  # must stay last: times the view alone
 ]
 
 ROOT_URLCONF = 'interfaculty.urls'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'transfer.timing.TimedDjangoTemplates',  # DjangoTemplates, timed per request
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # Your templates FIRST
         'APP_DIRS': True,  # Then app templates
         'OPTIONS': {
@@ -52,6 +58,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'transfer.context_processors.notifications',
             ],
         },
     },
@@ -60,6 +67,41 @@ TEMPLATES = [
 
 
 WSGI_APPLICATION = 'interfaculty.wsgi.application'
+ASGI_APPLICATION = 'interfaculty.asgi.application'
+
+# Real-time notifications (see transfer/realtime.py). Under ASGI pages follow a
+# Server-Sent Events stream (long-poll without EventSource); under WSGI they
+# poll every REALTIME_POLL_INTERVAL seconds, since a held request would tie up
+# a worker. The broker is chosen with the database, below.
+REALTIME_HEARTBEAT = 15  # seconds between keepalives on an idle stream
+REALTIME_STREAM_MAX_AGE = 300  # streams are recycled; EventSource reconnects automatically
+REALTIME_POLL_TIMEOUT = 25
+REALTIME_POLL_INTERVAL = 30
+
+# Admin dashboard snapshot cache lifetime in seconds (see transfer/analytics.py)
+ANALYTICS_CACHE_TTL = 300
+
+# Student and dean dashboard fragments, cached per user (see transfer/fragments.py);
+# their keys rotate whenever the applications shown change
+DASHBOARD_FRAGMENT_CACHE_TTL = 60 * 10
+
+# How long a rendered PDF report stays downloadable before it is regenerated (see transfer/exports.py)
+PDF_REPORT_CACHE_TTL = 60 * 60
+
+# Uploads (see transfer/uploads.py): in views wrapped with limit_uploads every
+# file streams to a temporary file in 64 KB chunks and is cut off as soon as
+# it passes the size limit
+UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+UPLOAD_THUMBNAIL_SIZE = (320, 320)
+
+# Responsive image variants served from /img/ (see transfer/images.py)
+IMAGE_VARIANT_WIDTHS = (64, 128, 256, 512)
+IMAGE_VARIANT_SOURCES = ('deans/', 'profiles/')
+
+# Estimated totals on the admin panel lists (see transfer/worklists.py): planner
+# estimates below the threshold are counted exactly; other backends cache a count
+ESTIMATED_COUNT_EXACT_BELOW = 1000
+ESTIMATED_COUNT_CACHE_TTL = 300
 
 import os
 
@@ -80,10 +122,84 @@ DATABASES = {
             'keepalives_interval': 5,
             'keepalives_count': 5,
             'connect_timeout': 10,
-        }
+        },
+        # Neon's pooler runs PgBouncer in transaction mode, which cannot keep a
+        # server-side cursor open across statements; the exports read in keyset
+        # chunks instead (see transfer/exports.py)
+        'DISABLE_SERVER_SIDE_CURSORS': True,
+    }
+}
+
+# Connection pooling (psycopg 3's pool). Each process keeps up to DB_POOL_MAX_SIZE
+# connections open, so a request no longer pays for a TLS handshake and
+# authentication before its first query. CONN_HEALTH_CHECKS makes the pool check
+# a connection before handing it out; connections are recycled after
+# DB_POOL_MAX_LIFETIME seconds. With DB_POOL=False, Django instead keeps one
+# persistent connection per thread for DB_CONN_MAX_AGE seconds.
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+if config('DB_POOL', default=True, cast=bool):
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # wait for a free connection
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+# Notifications are created in the job worker, so on PostgreSQL they reach the
+# web processes' listeners through LISTEN/NOTIFY (REALTIME_BROKER defaults to
+# transfer.realtime.PostgresBroker there). LISTEN needs a session of its own,
+# which Neon's pooler (PgBouncer, transaction mode) cannot keep: the listener
+# connects to the direct endpoint, the pooled host without "-pooler".
+REALTIME_LISTEN_HOST = config('REALTIME_LISTEN_HOST', default=DATABASES['default']['HOST'].replace('-pooler', '', 1))
+
+# Rolling per-route timings on the admin performance page (see transfer/timing.py)
+PERFORMANCE_ROUTE_SAMPLES = 500
+
+# Read replica for reports, exports and analytics (see transfer/replicas.py).
+# Set DATABASE_REPLICA_URL to enable it; it shares the primary's pool and
+# connection settings. After writing, a user reads from the primary for
+# REPLICA_STICKY_SECONDS, longer than the replica's usual lag.
+# Under `manage.py test` the replica is always configured, as a second test
+# database on the primary's server (a real replica is read-only). It is not a
+# mirror, so the routing tests (transfer/tests.py) can tell which one was read.
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+TESTING = sys.argv[1:2] == ['test']
+if DATABASE_REPLICA_URL or TESTING:
+    _replica = DATABASES['default'] if TESTING else dj_database_url.parse(DATABASE_REPLICA_URL)
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        **{key: _replica[key] for key in ('ENGINE', 'NAME', 'USER', 'PASSWORD', 'HOST', 'PORT')},
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica"},
+    }
+DATABASE_ROUTERS = ['transfer.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+
+# Shared cache. Several processes (the web workers and the run_jobs worker)
+# must see the same version stamps, report states and fragments, which a
+# per-process LocMemCache cannot give them, so the cache lives in a database
+# table (created by migration transfer 0013). Readers of version stamps treat
+# a culled stamp as a change, so culling only costs a recomputation.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'transfer_cache',
+        'OPTIONS': {'MAX_ENTRIES': 50000, 'CULL_FREQUENCY': 4},
     }
 }
 
+# Audit log (see transfer/audit.py): entries are buffered in memory and
+# written in batches of AUDIT_BATCH_SIZE every AUDIT_FLUSH_INTERVAL seconds by
+# a background thread. AUDIT_WRITE_BEHIND = False writes each one on commit,
+# as tests do: their writes are never committed for a thread to see.
+AUDIT_WRITE_BEHIND = config('AUDIT_WRITE_BEHIND', default=not TESTING, cast=bool)
+AUDIT_FLUSH_INTERVAL = 2.0
+AUDIT_BATCH_SIZE = 200
+AUDIT_BUFFER_LIMIT = 10000
+
 
 
 # Password validation
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Faculty, Program, Profile, Student, TransferApplication, Notification
+from .models import Faculty, Program, Profile, Student, TransferApplication, Notification, Job, Upload, AuditLog
 
 @admin.register(Faculty)
 class FacultyAdmin(admin.ModelAdmin):
@@ -9,7 +9,7 @@ class FacultyAdmin(admin.ModelAdmin):
 
 @admin.register(Program)
 class ProgramAdmin(admin.ModelAdmin):
-    list_display = ['name', 'faculty']
+    list_display = ['name', 'faculty', 'cutoff_points']
     list_filter = ['faculty']
     search_fields = ['name']
     ordering = ['faculty', 'name']
@@ -39,4 +39,37 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ['user', 'message', 'is_read', 'created_at']
     list_filter = ['is_read', 'created_at']
     search_fields = ['user__username', 'message']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['created_at', 'finished_at', 'locked_at', 'locked_by', 'last_error']
+    ordering = ['-run_at']
+
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ['file', 'content_type', 'size', 'status', 'created_at']
+    list_filter = ['status', 'content_type']
+    search_fields = ['sha256', 'file']
+    readonly_fields = ['sha256', 'file', 'content_type', 'size', 'status', 'error', 'thumbnail', 'created_at']
+    ordering = ['-created_at']
+
+
+@admin.register(AuditLog)
+class AuditLogAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'actor_username', 'action', 'object_repr', 'ip_address']
+    list_filter = ['action', 'object_type']
+    search_fields = ['actor_username', 'object_repr', 'object_id']
+    ordering = ['-created_at', '-id']
+
+    # Append-only: entries are viewed here, never added, changed or removed
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,111 @@
+"""
+Admin dashboard analytics.
+
+``dashboard_snapshot()`` computes every number on the admin landing page in a
+fixed handful of grouped queries (users, students, faculties with program and
+student counts, profile types, status counters, recent applications, FAQs),
+so its cost does not grow with the number of faculties. The snapshot is
+cached for ANALYTICS_CACHE_TTL seconds and dropped as soon as any of the
+models it summarises is written.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.signals import post_delete, post_save
+from faq.models import Question
+
+from .counters import summarize
+from .models import ApplicationStatusCounter, Faculty, Profile, Program, Student, TransferApplication
+
+
+SNAPSHOT_CACHE_KEY = 'analytics:admin_dashboard'
+SNAPSHOT_CACHE_TTL = getattr(settings, 'ANALYTICS_CACHE_TTL', 300)
+
+
+def _application_counts():
+    """(status totals, per-faculty application totals) from one grouped query on the status counters"""
+    statuses = Counter()
+    per_faculty = Counter()
+    rows = ApplicationStatusCounter.objects.values('faculty', 'requested_faculty', 'status').annotate(total=Sum('count'))
+    for row in rows:
+        statuses[row['status']] += row['total']
+        # An application counts once for each faculty it touches, as either source or target
+        for faculty_id in {row['faculty'], row['requested_faculty']} - {None}:
+            per_faculty[faculty_id] += row['total']
+    return statuses, per_faculty
+
+
+def compute_dashboard_snapshot():
+    users = User.objects.aggregate(total=Count('id'), admins=Count('id', filter=Q(is_superuser=True)))
+    total_students = Student.objects.count()
+    profile_types = dict(Profile.objects.values_list('user_type').annotate(total=Count('id')))
+    statuses, applications_per_faculty = _application_counts()
+    application_summary = summarize(statuses)
+
+    faculties = Faculty.objects.annotate(
+        program_count=Count('programs', distinct=True),
+        student_count=Count('programs__current_students', distinct=True),
+    ).order_by('id')
+    faculty_stats = [
+        {
+            'name': faculty.name,
+            'code': faculty.code,
+            'programs': faculty.program_count,
+            'students': faculty.student_count,
+            'applications': applications_per_faculty[faculty.id],
+        }
+        for faculty in faculties
+    ]
+
+    recent_applications = list(
+        TransferApplication.objects.select_related(
+            'student__user', 'current_program__faculty', 'requested_program__faculty'
+        ).order_by('-application_date')[:10]
+    )
+
+    return {
+        'total_users': users['total'],
+        'total_students': total_students,
+        'total_faculties': len(faculty_stats),
+        'total_programs': sum(stat['programs'] for stat in faculty_stats),
+        'total_applications': application_summary['total'],
+        'pending_applications': application_summary['pending'],
+        'approved_applications': application_summary['approved'],
+        'rejected_applications': application_summary['rejected'],
+        'completed_applications': application_summary['completed'],
+        'recent_applications': recent_applications,
+        'faq_count': Question.objects.count(),
+        'faculty_stats': faculty_stats,
+        'user_types': {
+            'students': total_students,
+            'hods': profile_types.get('hod', 0),
+            'deans': profile_types.get('dean', 0),
+            'registrars': profile_types.get('registrar', 0),
+            'admins': users['admins'],
+        },
+    }
+
+
+def dashboard_snapshot():
+    """The admin dashboard numbers, served from the cache when nothing has changed"""
+    snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        snapshot = compute_dashboard_snapshot()
+        cache.set(SNAPSHOT_CACHE_KEY, snapshot, SNAPSHOT_CACHE_TTL)
+    return snapshot
+
+
+def invalidate_dashboard_snapshot(sender, update_fields=None, **kwargs):
+    if sender is User and update_fields and set(update_fields) == {'last_login'}:
+        # Every login touches last_login; that never changes a dashboard number
+        return
+    cache.delete(SNAPSHOT_CACHE_KEY)
+
+
+for model in (User, Faculty, Program, Student, Profile, TransferApplication):
+    post_save.connect(invalidate_dashboard_snapshot, sender=model, dispatch_uid=f'analytics_save_{model.__name__}')
+    post_delete.connect(invalidate_dashboard_snapshot, sender=model, dispatch_uid=f'analytics_delete_{model.__name__}')
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TransferConfig(AppConfig):
     name = 'transfer'
+
+    def ready(self):
+        from . import analytics, audit, counters, eligibility, fragments, middleware, reports, search, tasks  # noqa: F401  (register signal handlers and job handlers)
@@ -0,0 +1,273 @@
+"""
+Write-behind audit log.
+
+``record()`` costs a request almost nothing. It builds an unsaved AuditLog
+row and, once the surrounding transaction commits, appends it to an
+in-process buffer, so a rolled-back action leaves no entry. A background
+thread writes the buffer with one ``bulk_create`` per AUDIT_BATCH_SIZE
+entries, every AUDIT_FLUSH_INTERVAL seconds or as soon as a batch is full.
+The buffer is also flushed when the process exits. If it ever reaches
+AUDIT_BUFFER_LIMIT entries (the database is unreachable, say), the oldest
+are dropped and logged, so memory stays bounded. With AUDIT_WRITE_BEHIND =
+False every entry is written as soon as its transaction commits.
+
+The actor and client address come from the current request, which
+``AuditMiddleware`` makes available to code that has no request at hand,
+such as the workflow. Recorded here: every application transition and
+status override (workflow.py), changes to users, faculties and programs
+(model signals), and sign-ins, failed sign-ins and sign-outs.
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .exports import day_bound
+from .models import AuditLog, Faculty, Program
+
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND = getattr(settings, 'AUDIT_WRITE_BEHIND', True)
+FLUSH_INTERVAL = getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0)
+BATCH_SIZE = getattr(settings, 'AUDIT_BATCH_SIZE', 200)
+BUFFER_LIMIT = getattr(settings, 'AUDIT_BUFFER_LIMIT', 10000)
+
+_request = ContextVar('audit_request', default=None)
+
+
+# ============================================
+# BUFFER
+# ============================================
+class AuditBuffer:
+    """Entries waiting to be written, and the thread that writes them"""
+
+    def __init__(self):
+        self.entries = deque()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def add(self, entries):
+        with self.lock:
+            self.entries.extend(entries)
+            overflow = len(self.entries) - BUFFER_LIMIT
+            for _ in range(max(0, overflow)):
+                self.entries.popleft()
+            full = len(self.entries) >= BATCH_SIZE
+        if overflow > 0:
+            logger.error("Audit buffer full; dropped the %s oldest entries", overflow)
+        if not WRITE_BEHIND:
+            self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self.wake.set()
+
+    def _take(self):
+        with self.lock:
+            count = min(BATCH_SIZE, len(self.entries))
+            return [self.entries.popleft() for _ in range(count)]
+
+    def flush(self):
+        """Write every buffered entry now; returns how many were written"""
+        written = 0
+        while True:
+            batch = self._take()
+            if not batch:
+                return written
+            try:
+                AuditLog.objects.bulk_create(batch)
+            except Exception:
+                # Put the batch back for the next attempt
+                with self.lock:
+                    self.entries.extendleft(reversed(batch))
+                raise
+            written += len(batch)
+
+    def _run(self):
+        while True:
+            self.wake.wait(FLUSH_INTERVAL)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing the audit log failed; retrying in %s s", FLUSH_INTERVAL)
+            finally:
+                # This thread's connection is not managed by a request
+                close_old_connections()
+
+    def _ensure_thread(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self.thread.start()
+
+
+_buffer = AuditBuffer()
+
+
+def flush():
+    """Write the buffered entries now (tests, shutdown)"""
+    return _buffer.flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception("Could not write %s buffered audit entries at exit", len(_buffer.entries))
+
+
+# ============================================
+# RECORDING
+# ============================================
+def _client_ip(request):
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def entry(action, obj=None, changes=None, actor=None, request=None, object_repr=None):
+    """
+    An unsaved entry for ``record_many``. ``actor`` and ``request`` default
+    to the current request's user and request; pass ``object_repr`` where
+    ``str(obj)`` would query related rows.
+    """
+    request = request or _request.get()
+    if actor is None and request is not None:
+        user = getattr(request, 'user', None)
+        actor = user if user is not None and user.is_authenticated else None
+    if object_repr is None:
+        object_repr = str(obj) if obj is not None else ''
+    return AuditLog(
+        created_at=timezone.now(),
+        action=action,
+        actor_id=actor.pk if actor is not None else None,
+        actor_username=actor.get_username() if actor is not None else '',
+        object_type=obj._meta.model_name if obj is not None else '',
+        object_id=str(obj.pk) if obj is not None else '',
+        object_repr=object_repr[:200],
+        changes=changes or {},
+        ip_address=_client_ip(request) if request is not None else None,
+    )
+
+
+def record(action, obj=None, changes=None, actor=None, request=None, object_repr=None):
+    """Log ``action`` on ``obj`` once the current transaction commits"""
+    record_many([entry(action, obj, changes, actor, request, object_repr)])
+
+
+def record_many(entries):
+    entries = list(entries)
+    if entries:
+        transaction.on_commit(lambda: _buffer.add(entries))
+
+
+def filter_entries(entries, params):
+    """
+    Narrow ``entries`` by the audit log filters in ``params`` (usually request.GET).
+
+    Supported keys: ``action``, ``actor`` (username), ``type`` and ``object``
+    (object type and id) and ``from`` and ``to`` (YYYY-MM-DD, inclusive);
+    each is backed by one of AuditLog's indexes, newest first.
+    Malformed values are ignored rather than raising.
+    """
+    action = params.get('action', '')
+    if action in dict(AuditLog.ACTION_CHOICES):
+        entries = entries.filter(action=action)
+
+    actor = params.get('actor', '').strip()
+    if actor:
+        entries = entries.filter(actor_username=actor)
+
+    object_type = params.get('type', '').strip()
+    if object_type:
+        entries = entries.filter(object_type=object_type)
+        object_id = params.get('object', '').strip()
+        if object_id:
+            entries = entries.filter(object_id=object_id)
+
+    date_from = day_bound(params.get('from', ''))
+    if date_from:
+        entries = entries.filter(created_at__gte=date_from)
+
+    date_to = day_bound(params.get('to', ''), end=True)
+    if date_to:
+        entries = entries.filter(created_at__lte=date_to)
+
+    return entries
+
+
+class AuditMiddleware:
+    """Make the current request (its user and address) available to ``record``; follows AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+
+# ============================================
+# SIGNALS
+# ============================================
+AUDITED_MODELS = {
+    User: ('user', ('username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')),
+    Faculty: ('faculty', ('code', 'name')),
+    Program: ('program', ('name', 'faculty_id', 'cutoff_points', 'subject_requirements')),
+}
+
+
+def _snapshot(instance, fields):
+    return {field: str(value) if not isinstance(value, (bool, int, type(None), dict, list)) else value
+            for field in fields for value in [getattr(instance, field)]}
+
+
+def model_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return  # Recorded as the sign-in itself
+    prefix, fields = AUDITED_MODELS[sender]
+    record(f"{prefix}.{'create' if created else 'update'}", instance, _snapshot(instance, fields))
+
+
+def model_deleted(sender, instance, **kwargs):
+    prefix, fields = AUDITED_MODELS[sender]
+    record(f'{prefix}.delete', instance, _snapshot(instance, fields))
+
+
+def logged_in(sender, request, user, **kwargs):
+    record('auth.login', user, actor=user, request=request)
+
+
+def login_failed(sender, credentials, request=None, **kwargs):
+    # credentials has the password cleansed; keep only the username tried
+    username = str(credentials.get('username', ''))[:150]
+    record('auth.login_failed', changes={'username': username}, request=request)
+
+
+def logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        record('auth.logout', user, actor=user, request=request)
+
+
+for model in AUDITED_MODELS:
+    post_save.connect(model_saved, sender=model, dispatch_uid=f'audit_save_{model.__name__}')
+    post_delete.connect(model_deleted, sender=model, dispatch_uid=f'audit_delete_{model.__name__}')
+user_logged_in.connect(logged_in, dispatch_uid='audit_login')
+user_login_failed.connect(login_failed, dispatch_uid='audit_login_failed')
+user_logged_out.connect(logged_out, dispatch_uid='audit_logout')
@@ -0,0 +1,320 @@
+"""
+End-to-end route benchmark.
+
+``run_benchmark()`` signs in as each role with the Django test client and
+requests every route in ``transfer/urls.py`` several times. For each route it
+records p50/p95 latency (including reading a streamed body), the number of
+SQL queries and the response size. ``compare()`` checks a run against a
+saved baseline. ``manage.py benchmark_routes`` drives both; seed data first
+with ``manage.py seed_data``.
+
+``run_connection_benchmark()`` (``manage.py benchmark_connections``) measures
+what a request pays to reach a PostgreSQL database when it connects afresh,
+keeps a persistent connection (CONN_MAX_AGE) or borrows one from the pool.
+"""
+
+import copy
+import statistics
+import time
+import warnings
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.test import Client
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from .models import Faculty, Profile, Program, Student, TransferApplication
+from .synthetic import staff_usernames
+
+
+SKIP = 'skip'
+
+# Which signed-in role requests each route; None means anonymous. Routes not
+# listed fall back to 'admin' under admin-panel/ and 'registrar' elsewhere.
+ROUTE_ROLES = {
+    'home': None,
+    'register_student': None,
+    'login': None,
+    'logout': SKIP,  # would end the benchmark client's session
+    'notification_stream': SKIP,  # an open-ended event stream, not a request/response
+    'dashboard_redirect': 'student',
+    'profile_redirect': 'student',
+    'student_dashboard': 'student',
+    'student_application_form': 'student',
+    'hod_dashboard': 'hod',
+    'review_application': 'hod',
+    'hod_bulk_review': SKIP,  # POST only
+    'dean_dashboard': 'dean',
+    'dean_review': 'dean',
+    'dean_bulk_review': SKIP,  # POST only
+    'registrar_dashboard': 'registrar',
+    'registrar_review': 'registrar',
+    'notification_poll': 'hod',
+    'image_variant': SKIP,  # needs a media image; covered by its immutable caching
+}
+
+# Extra query strings, e.g. so the long-poll answers at once instead of waiting
+ROUTE_QUERY = {
+    'notification_poll': {'after': 0},
+}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Fixtures:
+    """The users and objects the routes are exercised with, picked from the seeded data"""
+
+    def __init__(self, prefix='synthetic'):
+        faculties = list(Faculty.objects.order_by('id'))
+        accounts = staff_usernames(faculties, prefix)
+        users = User.objects.in_bulk(list(accounts), field_name='username')
+
+        def account(user_type):
+            for username, (kind, faculty) in accounts.items():
+                if kind == user_type and username in users:
+                    return users[username]
+            profile = Profile.objects.select_related('user').filter(user_type=user_type).first()
+            return profile.user if profile else None
+
+        # A dean with an application waiting for them
+        dean_application = TransferApplication.objects.filter(status='hod_approved').order_by('-application_date').first()
+        dean = None
+        if dean_application and dean_application.requested_program_id:
+            dean_faculty_id = Program.objects.filter(id=dean_application.requested_program_id).values_list('faculty_id', flat=True).first()
+            profile = Profile.objects.select_related('user').filter(user_type='dean', faculty_id=dean_faculty_id).first()
+            dean = profile.user if profile else None
+
+        # A student with no open application, so the application form renders
+        student = Student.objects.select_related('user').exclude(
+            applications__status__in=TransferApplication.AWAITING_REVIEW_STATUSES
+        ).filter(applications__isnull=False).order_by('id').first()
+
+        self.users = {
+            'hod': account('hod'),
+            'dean': dean or account('dean'),
+            'registrar': account('registrar'),
+            'admin': account('admin') or User.objects.filter(is_staff=True).order_by('id').first(),
+            'student': student.user if student else None,
+        }
+        any_application = TransferApplication.objects.order_by('-application_date').first()
+        faculty = faculties[0] if faculties else None
+        self.kwargs = {
+            'app_id': any_application.id if any_application else None,
+            'user_id': student.user_id if student else None,
+            'student_id': student.id if student else None,
+            'faculty_id': faculty.id if faculty else None,
+            'faculty_code': faculty.code if faculty else None,
+            'program_id': Program.objects.order_by('id').values_list('id', flat=True).first(),
+        }
+        self.route_kwargs = {
+            'review_application': {'app_id': self._application_id(status='pending_hod')},
+            'dean_review': {'app_id': dean_application.id if dean_application else None},
+            'registrar_review': {'app_id': self._application_id(status='dean_approved')},
+        }
+
+    @staticmethod
+    def _application_id(**filters):
+        return TransferApplication.objects.filter(**filters).order_by('-application_date').values_list('id', flat=True).first()
+
+    def kwargs_for(self, name, parameters):
+        values = {**self.kwargs, **self.route_kwargs.get(name, {})}
+        return {parameter: values.get(parameter) for parameter in parameters}
+
+
+def routes():
+    """(name, URLPattern) for every named route in transfer/urls.py"""
+    from . import urls
+    return [(p.name, p) for p in urls.urlpatterns if isinstance(p, URLPattern) and p.name]
+
+
+def _role_for(name, pattern):
+    if name in ROUTE_ROLES:
+        return ROUTE_ROLES[name]
+    return 'admin' if str(pattern.pattern).startswith('admin-panel/') else 'registrar'
+
+
+class QueryCounter:
+    """Database execute wrapper that counts the queries run through it"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _measure(client, path, query):
+    # An execute wrapper rather than CaptureQueriesContext: every request resets connection.queries
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        started = time.perf_counter()
+        response = client.get(path, query)
+        if response.streaming:
+            with warnings.catch_warnings():
+                # Async views stream through an async iterator, which the sync client buffers
+                warnings.simplefilter('ignore')
+                size = sum(len(chunk) for chunk in response)
+        else:
+            size = len(response.content)
+        elapsed = time.perf_counter() - started
+    return response.status_code, elapsed * 1000, queries.count, size
+
+
+def run_benchmark(repeat=10, prefix='synthetic', only=None):
+    """Benchmark every route; returns the JSON-serialisable report"""
+    fixtures = Fixtures(prefix)
+    # A broken view is reported with its 500 status instead of aborting the run
+    clients = {None: Client(raise_request_exception=False)}
+    for role, user in fixtures.users.items():
+        if user is not None:
+            clients[role] = Client(raise_request_exception=False)
+            clients[role].force_login(user)
+
+    results = {}
+    for name, pattern in routes():
+        if only and name not in only:
+            continue
+        role = _role_for(name, pattern)
+        if role == SKIP:
+            continue
+        if role not in clients:
+            results[name] = {'role': role, 'skipped': f'no {role} account in the database'}
+            continue
+        kwargs = fixtures.kwargs_for(name, pattern.pattern.converters)
+        if any(value is None for value in kwargs.values()):
+            results[name] = {'role': role, 'skipped': 'no sample object for the URL parameters'}
+            continue
+
+        path = reverse(name, kwargs=kwargs)
+        query = ROUTE_QUERY.get(name, {})
+        client = clients[role]
+        _measure(client, path, query)  # warm-up: caches, session profile, template loading
+
+        timings = []
+        for _ in range(repeat):
+            status, elapsed, query_count, size = _measure(client, path, query)
+            timings.append(elapsed)
+        results[name] = {
+            'path': path,
+            'role': role or 'anonymous',
+            'status': status,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(_percentile(timings, 0.95), 2),
+            'queries': query_count,
+            'bytes': size,
+        }
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'repeat': repeat,
+        'routes': results,
+    }
+
+
+def compare(report, baseline, tolerance=0.25, noise_ms=5.0):
+    """
+    Regressions of ``report`` against ``baseline``: any route issuing more
+    queries than before, or whose p95 grew by more than ``tolerance`` (and by
+    at least ``noise_ms``, so sub-millisecond jitter is ignored).
+    """
+    regressions = []
+    for name, current in report['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before or 'skipped' in before or 'skipped' in current:
+            continue
+        if current['queries'] > before['queries']:
+            regressions.append(f"{name}: {current['queries']} queries (baseline {before['queries']})")
+        slower = current['p95_ms'] - before['p95_ms']
+        if slower > noise_ms and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms (baseline {before['p95_ms']} ms)")
+    return regressions
+
+
+# ============================================
+# CONNECTION BENCHMARK
+# ============================================
+# Pool used for the 'pooled' mode when the settings do not configure one
+DEFAULT_POOL_OPTIONS = {'min_size': 1, 'max_size': 4, 'timeout': 10}
+
+CONNECTION_MODES = ('per_request', 'persistent', 'pooled')
+
+
+def _mode_settings(base, mode):
+    settings_dict = copy.deepcopy(base)
+    options = settings_dict.setdefault('OPTIONS', {})
+    pool = options.pop('pool', None)
+    if mode == 'pooled':
+        options['pool'] = pool if isinstance(pool, dict) else DEFAULT_POOL_OPTIONS
+        settings_dict['CONN_MAX_AGE'] = 0
+    elif mode == 'persistent':
+        settings_dict['CONN_MAX_AGE'] = 600
+        settings_dict['CONN_HEALTH_CHECKS'] = True
+    else:
+        settings_dict['CONN_MAX_AGE'] = 0
+    return settings_dict
+
+
+def _simulated_requests(wrapper, requests, queries):
+    # What Django does around a request: close_if_unusable_or_obsolete() on
+    # request_started and request_finished, with the queries in between
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        wrapper.close_if_unusable_or_obsolete()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run_connection_benchmark(settings_dict=None, requests=200, queries=1, modes=CONNECTION_MODES):
+    """
+    Time ``requests`` simulated requests of ``queries`` trivial queries each
+    against a PostgreSQL database (default: the 'default' one) in every
+    connection mode; returns the JSON-serialisable report.
+    """
+    base = settings_dict or connections.settings['default']
+    if 'postgresql' not in base['ENGINE']:
+        raise ValueError('The connection benchmark needs a PostgreSQL database.')
+
+    results = {}
+    for mode in modes:
+        wrapper = load_backend(base['ENGINE']).DatabaseWrapper(
+            _mode_settings(base, mode), alias=f'connection_benchmark_{mode}'
+        )
+        try:
+            _simulated_requests(wrapper, 3, queries)  # warm-up: DNS, the pool's first connections
+            timings = _simulated_requests(wrapper, requests, queries)
+        finally:
+            wrapper.close()
+            if wrapper.pool is not None:
+                wrapper.close_pool()
+        results[mode] = {
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(_percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+        }
+
+    if 'per_request' in results:
+        baseline = results['per_request']['mean_ms']
+        for mode, result in results.items():
+            result['saved_per_request_ms'] = round(baseline - result['mean_ms'], 3)
+
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'host': base.get('HOST') or 'local socket',
+        'requests': requests,
+        'queries_per_request': queries,
+        'modes': results,
+    }
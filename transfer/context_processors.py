@@ -0,0 +1,20 @@
+from django.conf import settings
+
+from .notifications import unread_count
+from .views_realtime import served_over_asgi
+
+
+def notifications(request):
+    """
+    Expose the signed-in user's unread notification count as ``unread_notifications``,
+    and how the page should follow it: ``notification_stream`` (Server-Sent Events,
+    only under ASGI) or polling every ``notification_poll_interval`` seconds
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {
+        'unread_notifications': unread_count(user),
+        'notification_stream': served_over_asgi(request),
+        'notification_poll_interval': getattr(settings, 'REALTIME_POLL_INTERVAL', 30),
+    }
@@ -0,0 +1,192 @@
+"""
+Incrementally maintained application status counters.
+
+ApplicationStatusCounter holds one row per (faculty, requested faculty,
+academic year, status). TransferApplication.save() and the post_delete
+handler below move applications between rows inside the same transaction as
+the write, so dashboards can read every total from a single grouped query
+instead of running COUNT(*) over the whole applications table.
+"""
+
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ApplicationStatusCounter, Program, TransferApplication
+
+
+PENDING_STATUSES = ['pending_hod', 'pending_dean', 'pending_registrar']
+APPROVED_STATUSES = ['hod_approved', 'dean_approved', 'registrar_approved']
+REJECTED_STATUSES = ['hod_rejected', 'dean_rejected', 'registrar_rejected']
+
+
+def _pk(value):
+    # Views may assign a foreign key straight from request.POST, as a string
+    return None if value is None else int(value)
+
+
+def counter_key(application):
+    """(current_program_id, requested_program_id, academic_year, status) as currently held in memory"""
+    data = application.__dict__
+    return (
+        _pk(data.get('current_program_id')),
+        _pk(data.get('requested_program_id')),
+        data.get('academic_year'),
+        data.get('status'),
+    )
+
+
+def _faculty_ids(program_ids):
+    program_ids = {pk for pk in program_ids if pk is not None}
+    if not program_ids:
+        return {}
+    return dict(Program.objects.filter(id__in=program_ids).values_list('id', 'faculty_id'))
+
+
+def _adjust(faculty_id, requested_faculty_id, academic_year, status, delta):
+    lookup = {
+        'faculty_id': faculty_id,
+        'requested_faculty_id': requested_faculty_id,
+        'academic_year': academic_year or '',
+        'status': status,
+    }
+    if ApplicationStatusCounter.objects.filter(**lookup).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ApplicationStatusCounter.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Another transaction created the row first
+        ApplicationStatusCounter.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def move(old_key, new_key):
+    """Decrement the counter for ``old_key`` and increment the one for ``new_key`` (either may be None)"""
+    move_many([(old_key, new_key)])
+
+
+def move_many(moves):
+    """Apply several (old_key, new_key) moves, touching each affected counter row once"""
+    moves = list(moves)
+    keys = [key for move in moves for key in move if key is not None and key[3]]
+    faculties = _faculty_ids(pk for key in keys for pk in key[:2])
+
+    deltas = Counter()
+    for old_key, new_key in moves:
+        for key, delta in ((old_key, -1), (new_key, 1)):
+            if key is not None and key[3]:
+                current, requested, year, status = key
+                deltas[(faculties.get(current), faculties.get(requested), year, status)] += delta
+    for (faculty_id, requested_faculty_id, year, status), delta in deltas.items():
+        if delta:
+            _adjust(faculty_id, requested_faculty_id, year, status, delta)
+
+
+@receiver(post_delete, sender=TransferApplication)
+def remove_deleted_application(sender, instance, **kwargs):
+    move(getattr(instance, '_counter_key', None) or counter_key(instance), None)
+
+
+# ============================================
+# READING COUNTERS
+# ============================================
+def status_totals(**filters):
+    """
+    Return a Counter of status -> number of applications, in one query.
+
+    ``filters`` apply to ApplicationStatusCounter, e.g. ``requested_faculty=faculty``.
+    """
+    rows = ApplicationStatusCounter.objects.filter(**filters).values('status').annotate(total=Sum('count'))
+    return Counter({row['status']: row['total'] for row in rows})
+
+
+def summarize(totals):
+    """Roll a status Counter up into the totals the dashboards display"""
+    return {
+        'total': sum(totals.values()),
+        'pending': sum(totals[status] for status in PENDING_STATUSES),
+        'approved': sum(totals[status] for status in APPROVED_STATUSES),
+        'rejected': sum(totals[status] for status in REJECTED_STATUSES),
+        'completed': totals['completed'],
+    }
+
+
+# ============================================
+# REBUILD / VERIFY
+# ============================================
+def expected_counters(application_model=TransferApplication):
+    """Recount applications from scratch: {(faculty_id, requested_faculty_id, year, status): count}"""
+    rows = application_model.objects.values(
+        'current_program__faculty', 'requested_program__faculty', 'academic_year', 'status'
+    ).annotate(total=Count('id'))
+    return {
+        (
+            row['current_program__faculty'],
+            row['requested_program__faculty'],
+            row['academic_year'] or '',
+            row['status'],
+        ): row['total']
+        for row in rows
+    }
+
+
+def stored_counters(counter_model=ApplicationStatusCounter):
+    stored = Counter()
+    for faculty_id, requested_faculty_id, year, status, count in counter_model.objects.values_list(
+        'faculty_id', 'requested_faculty_id', 'academic_year', 'status', 'count'
+    ):
+        stored[(faculty_id, requested_faculty_id, year, status)] += count
+    return {key: count for key, count in stored.items() if count}
+
+
+def _lock_counters(counter_model):
+    """
+    Block counter writes until the current transaction ends.
+
+    PostgreSQL: EXCLUSIVE conflicts with the row locks taken by move(), so
+    a transaction that already moved a counter commits first (the recount
+    sees it) and one that has not waits for the rebuild (its delta lands on
+    the new rows). SQLite has a single writer, so the DELETE below is enough.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {connection.ops.quote_name(counter_model._meta.db_table)} IN EXCLUSIVE MODE')
+
+
+def rebuild(application_model=TransferApplication, counter_model=ApplicationStatusCounter):
+    """Replace every counter row with a fresh recount; returns the number of rows written"""
+    with transaction.atomic():
+        _lock_counters(counter_model)
+        counter_model.objects.all().delete()
+        # Recount only once no other transaction can move a counter
+        expected = expected_counters(application_model)
+        counter_model.objects.bulk_create([
+            counter_model(
+                faculty_id=faculty_id,
+                requested_faculty_id=requested_faculty_id,
+                academic_year=year,
+                status=status,
+                count=count,
+            )
+            for (faculty_id, requested_faculty_id, year, status), count in expected.items()
+        ])
+    return len(expected)
+
+
+@receiver(post_delete, sender=Program)
+def recount_after_program_delete(sender, instance, **kwargs):
+    # Deleting a program nulls application foreign keys with a bulk UPDATE that
+    # bypasses TransferApplication.save(), so recount once the delete commits.
+    transaction.on_commit(rebuild)
+
+
+@receiver(post_save, sender=Program)
+def recount_after_program_move(sender, instance, created, **kwargs):
+    # Counters are kept per faculty, so moving a program to another faculty
+    # moves every application to or from it. Program.save() updates
+    # _saved_faculty_id only after post_save, so it still holds the old faculty.
+    if not created and getattr(instance, '_saved_faculty_id', instance.faculty_id) != instance.faculty_id:
+        transaction.on_commit(rebuild)
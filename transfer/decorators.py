@@ -0,0 +1,41 @@
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect
+
+
+def role_required(*user_types, message='Access denied.', redirect_to='home'):
+    """
+    Allow the view only for signed-in users whose profile has one of ``user_types``.
+
+    Relies on ``request.profile`` from ProfileMiddleware, so the check costs no
+    queries. Anyone else is redirected to ``redirect_to`` with ``message``.
+    """
+    def decorator(view_func):
+        @login_required
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            profile = request.profile
+            if profile is None:
+                messages.error(request, 'Profile not found. Please contact admin.')
+                return redirect('home')
+            if profile.user_type not in user_types:
+                messages.error(request, message)
+                return redirect(redirect_to)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def faculty_required(message='Your profile has no faculty assigned. Contact administrator.', redirect_to='home'):
+    """Allow the view only when the signed-in user's profile has a faculty; use under role_required"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.profile is None or request.profile.faculty is None:
+                messages.error(request, message)
+                return redirect(redirect_to)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,166 @@
+"""
+Transfer eligibility scoring.
+
+An application's score is the student's cluster weight minus the requested
+program's cutoff (``Program.cutoff_points``, or the student's own university
+cutoff when the program sets none). It is eligible when that margin is not
+negative and every grade in ``Program.subject_requirements`` is met.
+
+Scores are stored on the application (``eligible``, ``eligibility_score`` and
+the sortable ``eligibility_rank``), so the Dean queue is an indexed ORDER BY
+rather than a computation per request. ``score_applications`` rescores a
+queryset in batches: each batch reads the applications, students, programs
+and KCSE results with four queries, scores them in memory and writes them
+back with one bulk UPDATE. Only the rows a change can affect are rescored:
+a new or edited application, a student whose KCSE details or results
+changed, or (in the job worker) every open application for a program whose
+cutoff or requirements changed.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .fragments import invalidate_dashboards
+from .models import (
+    AWAITING_REVIEW_STATUSES, KCSE_Result, Program, Student, TransferApplication, UNRANKED, kcse_grade_points,
+)
+
+
+BATCH_SIZE = 1000
+# Ineligible applications rank below every eligible one, still ordered by margin
+INELIGIBLE_PENALTY = 1000.0
+# Mean subject points (at most 12) break ties between equal margins
+TIE_BREAK_SCALE = 1e-4
+
+SCORE_FIELDS = ['eligible', 'eligibility_score', 'eligibility_rank']
+
+
+def _meets(points, grade):
+    # A grade that is not a KCSE grade cannot be met (Program.save rejects them)
+    required = kcse_grade_points(grade)
+    return required is not None and points >= required
+
+
+def score(cluster_weight, cutoff, subject_points, requirements):
+    """
+    (eligible, score, rank) for one application.
+
+    ``subject_points`` maps lower-cased subject names to grade points and
+    ``requirements`` maps subject names to minimum grades. Without a
+    cluster weight there is nothing to score: (None, None, UNRANKED).
+    """
+    if cluster_weight is None:
+        return None, None, UNRANKED
+    margin = float(cluster_weight) - float(cutoff or 0)
+    meets_subjects = all(
+        _meets(subject_points.get(subject.strip().lower(), 0), grade)
+        for subject, grade in (requirements or {}).items()
+    )
+    eligible = margin >= 0 and meets_subjects
+
+    rank = margin if eligible else margin - INELIGIBLE_PENALTY
+    if subject_points:
+        rank += sum(subject_points.values()) / len(subject_points) * TIE_BREAK_SCALE
+    return eligible, round(margin, 3), rank
+
+
+def _score_batch(rows):
+    student_ids = {student_id for pk, student_id, program_id in rows}
+    program_ids = {program_id for pk, student_id, program_id in rows if program_id is not None}
+
+    students = {
+        pk: (weight, cutoff)
+        for pk, weight, cutoff in Student.objects.filter(id__in=student_ids).values_list(
+            'id', 'cluster_weight', 'university_cutoff'
+        )
+    }
+    programs = {
+        pk: (cutoff, requirements)
+        for pk, cutoff, requirements in Program.objects.filter(id__in=program_ids).values_list(
+            'id', 'cutoff_points', 'subject_requirements'
+        )
+    }
+    subject_points = {}
+    results = KCSE_Result.objects.filter(student_id__in=student_ids, points__isnull=False)
+    for student_id, subject, points in results.values_list('student_id', 'subject', 'points'):
+        best = subject_points.setdefault(student_id, {})
+        key = subject.strip().lower()
+        best[key] = max(points, best.get(key, 0))
+
+    updates = []
+    for pk, student_id, program_id in rows:
+        weight, university_cutoff = students.get(student_id, (None, None))
+        program_cutoff, requirements = programs.get(program_id, (None, {}))
+        eligible, margin, rank = score(
+            weight,
+            program_cutoff if program_cutoff is not None else university_cutoff,
+            subject_points.get(student_id, {}),
+            requirements,
+        )
+        updates.append(TransferApplication(id=pk, eligible=eligible, eligibility_score=margin, eligibility_rank=rank))
+    # bulk_update bypasses save(), so no counters move and no signals fire
+    TransferApplication.objects.bulk_update(updates, SCORE_FIELDS)
+    return len(updates)
+
+
+def score_applications(queryset=None, batch_size=BATCH_SIZE):
+    """Rescore the applications in ``queryset`` (default: every one awaiting review); returns how many"""
+    if queryset is None:
+        queryset = TransferApplication.objects.filter(status__in=AWAITING_REVIEW_STATUSES)
+    rows = queryset.order_by('id').values_list('id', 'student_id', 'requested_program_id')
+
+    scored = 0
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            if scored:
+                # Scores are on the dean dashboards, and bulk_update leaves last_updated alone
+                invalidate_dashboards()
+            return scored
+        scored += _score_batch(batch)
+        last_id = batch[-1][0]
+
+
+def rescore_students(student_ids):
+    """Rescore the open applications of ``student_ids`` once the current transaction commits"""
+    student_ids = list(student_ids)
+    transaction.on_commit(lambda: score_applications(
+        TransferApplication.objects.filter(student_id__in=student_ids, status__in=AWAITING_REVIEW_STATUSES)
+    ))
+
+
+def rescore_program(program_id):
+    """Rescore every open application for ``program_id``"""
+    return score_applications(
+        TransferApplication.objects.filter(requested_program_id=program_id, status__in=AWAITING_REVIEW_STATUSES)
+    )
+
+
+# ============================================
+# RESCORING TRIGGERS
+# ============================================
+def application_saved(sender, instance, created, **kwargs):
+    # Workflow transitions use QuerySet.update() and do not get here
+    if instance.status in AWAITING_REVIEW_STATUSES:
+        application_id = instance.pk
+        transaction.on_commit(lambda: score_applications(TransferApplication.objects.filter(id=application_id)))
+
+
+def student_saved(sender, instance, created, **kwargs):
+    if not created:
+        rescore_students([instance.pk])
+
+
+def program_saved(sender, instance, created, **kwargs):
+    # Program.save() updates _eligibility_rules only after post_save, so it still holds the old rules
+    if created or getattr(instance, '_eligibility_rules', None) == instance.eligibility_rules():
+        return
+    from .jobs import enqueue
+    # A popular program can have thousands of open applications
+    enqueue('rescore_program_eligibility', program_id=instance.pk)
+
+
+post_save.connect(application_saved, sender=TransferApplication, dispatch_uid='eligibility_application_save')
+post_save.connect(student_saved, sender=Student, dispatch_uid='eligibility_student_save')
+post_save.connect(program_saved, sender=Program, dispatch_uid='eligibility_program_save')
@@ -0,0 +1,351 @@
+"""
+Report and export helpers shared by the report views.
+
+Exports read the database in fixed-size keyset chunks (each query resumes
+after the last row of the one before) and fetch every column they print in the
+same joined query, so memory use stays flat however many rows are exported.
+Server-side cursors would read one snapshot, but they cannot stay open through
+PgBouncer's transaction pooling; each chunk is its own snapshot, so a row
+edited during a long export may show either version. Rows are never skipped or
+repeated, because their ids and application dates do not change. PDF reports
+are rendered off the request by the job worker and kept until the applications
+they cover change.
+"""
+
+import csv
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .counters import summarize
+from .jobs import enqueue
+from .models import PdfReport, Student, TransferApplication
+from .pdf import PdfWriter
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_HEADER = [
+    'Application ID', 'Date', 'Student Name', 'Admission Number',
+    'Current Program', 'Current Faculty', 'Requested Program',
+    'Requested Faculty', 'Status', 'Academic Year', 'Semester',
+    'HOD Comment', 'Dean Comment', 'Registrar Comment',
+    'New Admission Number'
+]
+
+CSV_COLUMNS = (
+    'id', 'application_date',
+    'student__user__first_name', 'student__user__last_name', 'student__admission_number',
+    'current_program__name', 'current_program__faculty__name',
+    'requested_program__name', 'requested_program__faculty__name',
+    'status', 'academic_year', 'semester',
+    'hod_comment', 'dean_comment', 'registrar_comment',
+    'new_admission_number',
+)
+
+STATUS_LABELS = dict(TransferApplication.STATUS_CHOICES)
+SEMESTER_LABELS = dict(TransferApplication._meta.get_field('semester').choices)
+
+
+def applications_for_profile(profile, user):
+    """Applications the given profile may report on, or None if the role has no report access"""
+    if profile.user_type == 'hod' and profile.faculty is None:
+        return TransferApplication.objects.all()
+    elif profile.user_type == 'dean':
+        return TransferApplication.objects.filter(requested_program__faculty=profile.faculty)
+    elif profile.user_type == 'registrar':
+        return TransferApplication.objects.all()
+    elif profile.user_type == 'student':
+        student = Student.objects.get(user=user)
+        return TransferApplication.objects.filter(student=student)
+    return None
+
+
+def day_bound(value, end=False):
+    """Aware start (or with ``end``, end) of the YYYY-MM-DD day ``value``, or None if it is not a date"""
+    day = parse_date(value) if value else None
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.max if end else time.min))
+
+
+def filter_applications(applications, params):
+    """
+    Narrow ``applications`` by the report filters in ``params`` (usually request.GET).
+
+    Supported keys: ``status``, ``faculty`` (faculty id, matched on either
+    side of the transfer), ``from`` and ``to`` (YYYY-MM-DD, inclusive).
+    Malformed values are ignored rather than raising.
+    """
+    status = params.get('status', '')
+    if status in STATUS_LABELS:
+        applications = applications.filter(status=status)
+
+    faculty = params.get('faculty', '')
+    if faculty.isdigit():
+        applications = applications.filter(
+            Q(current_program__faculty__id=faculty) |
+            Q(requested_program__faculty__id=faculty)
+        )
+
+    date_from = day_bound(params.get('from', ''))
+    if date_from:
+        applications = applications.filter(application_date__gte=date_from)
+
+    date_to = day_bound(params.get('to', ''), end=True)
+    if date_to:
+        applications = applications.filter(application_date__lte=date_to)
+
+    return applications
+
+
+def _keyset_rows(applications, columns, order, chunk_size):
+    """
+    Every row of ``applications.values_list(*columns)`` in ``order`` (fields
+    ending with 'id', all ascending or all '-' descending, each one of
+    ``columns``), read with one indexed query per ``chunk_size`` rows.
+    """
+    fields = [field.lstrip('-') for field in order]
+    lookup = 'lt' if order[0].startswith('-') else 'gt'
+    positions = [columns.index(field) for field in fields]
+    rows = applications.order_by(*order).values_list(*columns)
+    last = None
+    while True:
+        chunk = rows
+        if last is not None:
+            # Past the last row: (a, id) > (x, y) is a > x, or a = x and id > y
+            condition = Q()
+            for depth, field in enumerate(fields):
+                equal = {earlier: last[positions[i]] for i, earlier in enumerate(fields[:depth])}
+                condition |= Q(**equal, **{f'{field}__{lookup}': last[positions[depth]]})
+            chunk = rows.filter(condition)
+        chunk = list(chunk[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+
+
+# ============================================
+# CSV STREAMING
+# ============================================
+class Echo:
+    """File-like object whose write() hands the line straight back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_row(row):
+    (pk, applied, first_name, last_name, admission_number,
+     current_program, current_faculty, requested_program, requested_faculty,
+     status, academic_year, semester,
+     hod_comment, dean_comment, registrar_comment, new_admission_number) = row
+    return [
+        pk,
+        timezone.localtime(applied).strftime('%Y-%m-%d %H:%M') if applied else '',
+        f"{first_name or ''} {last_name or ''}".strip(),
+        admission_number,
+        current_program or '',
+        current_faculty or '',
+        requested_program or '',
+        requested_faculty or '',
+        STATUS_LABELS.get(status, status),
+        academic_year,
+        SEMESTER_LABELS.get(semester, semester),
+        hod_comment or '',
+        dean_comment or '',
+        registrar_comment or '',
+        new_admission_number or '',
+    ]
+
+
+def stream_applications_csv(applications, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV lines for ``applications``, reading the database ``chunk_size`` rows at a time"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in _keyset_rows(applications, CSV_COLUMNS, ('id',), chunk_size):
+        yield writer.writerow(_csv_row(row))
+
+
+# ============================================
+# PDF REPORTS
+# ============================================
+# PDFs are rendered by the job worker (tasks.render_pdf_report) and kept in
+# default_storage. A PdfReport row maps a report key (role, scope, filters and
+# a data version) to its state: pending, ready (with the stored file name) or
+# failed. It lives in the database so the web processes see what the worker
+# wrote. Identical requests share one rendering until the data changes.
+PDF_REPORT_FILTERS = ('status', 'faculty', 'from', 'to')
+PDF_REPORT_TTL = getattr(settings, 'PDF_REPORT_CACHE_TTL', 60 * 60)
+PDF_PENDING_TTL = 60 * 15  # a report not rendered by then is queued again
+
+PDF_ROWS_PER_PAGE = 32
+PDF_COLUMNS = (
+    # (heading, x offset, maximum characters)
+    ('ID', 40, 8),
+    ('Date', 85, 12),
+    ('Student', 160, 32),
+    ('Admission No.', 340, 20),
+    ('From', 450, 16),
+    ('To', 540, 16),
+    ('Year', 630, 10),
+    ('Status', 690, 26),
+)
+PDF_COLUMN_FIELDS = (
+    'id', 'application_date', 'student__user__first_name', 'student__user__last_name',
+    'student__admission_number', 'current_program__faculty__code', 'requested_program__faculty__code',
+    'academic_year', 'status',
+)
+
+
+def pdf_report_title(profile, user):
+    if profile.user_type == 'dean':
+        return f"{profile.faculty.name} - Applications Report"
+    elif profile.user_type == 'registrar':
+        return "Registrar - Complete Applications Report"
+    elif profile.user_type == 'student':
+        return f"{user.get_full_name()} - My Applications Report"
+    return "All Applications Report"
+
+
+def pdf_report_key(profile, user, filters, applications):
+    """Key for the report ``profile`` would get for ``filters``; changes whenever the rows do"""
+    version = applications.aggregate(total=Count('id'), latest=Max('last_updated'))
+    scope = {
+        'role': profile.user_type,
+        'faculty': profile.faculty_id if profile.user_type == 'dean' else None,
+        'user': user.pk if profile.user_type == 'student' else None,
+        'filters': {name: filters.get(name, '') for name in PDF_REPORT_FILTERS},
+        'total': version['total'],
+        'latest': version['latest'].isoformat() if version['latest'] else None,
+    }
+    return hashlib.sha256(json.dumps(scope, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _pdf_state(report):
+    return {'status': report.status, 'name': report.file_name, 'pages': report.pages, 'error': report.error}
+
+
+def pdf_report_state(key):
+    """{'status': 'pending' | 'ready' | 'failed', ...} for a report key, or None if never requested or expired"""
+    # Always the primary: the worker has only just written the state, and a replica may lag
+    report = PdfReport.objects.using(DEFAULT_DB_ALIAS).filter(key=key).first()
+    if report is None:
+        return None
+    timeout = PDF_PENDING_TTL if report.status == 'pending' else PDF_REPORT_TTL
+    if report.updated_at < timezone.now() - timedelta(seconds=timeout):
+        return None
+    return _pdf_state(report)
+
+
+def set_pdf_report_state(key, status, name='', pages=0, error=''):
+    PdfReport.objects.update_or_create(key=key, defaults={
+        'status': status, 'file_name': name, 'pages': pages, 'error': error, 'updated_at': timezone.now(),
+    })
+
+
+def request_pdf_report(key, user, filters):
+    """Queue rendering of report ``key`` unless it is already queued; returns its state"""
+    now = timezone.now()
+    with transaction.atomic():
+        report, created = PdfReport.objects.get_or_create(key=key, defaults={'updated_at': now})
+        if not created:
+            # Take the row over unless another request queued it recently
+            queued = PdfReport.objects.filter(pk=report.pk).exclude(
+                status='pending', updated_at__gte=now - timedelta(seconds=PDF_PENDING_TTL),
+            ).update(status='pending', file_name='', pages=0, error='', updated_at=now)
+            if not queued:
+                return pdf_report_state(key)
+        enqueue('render_pdf_report', key=key, user_id=user.pk,
+                filters={name: filters.get(name, '') for name in PDF_REPORT_FILTERS})
+    return {'status': 'pending', 'name': '', 'pages': 0, 'error': ''}
+
+
+def prune_pdf_reports(directory='reports'):
+    """Delete stored PDF reports older than PDF_REPORT_TTL, and their states"""
+    cutoff = timezone.now() - timedelta(seconds=PDF_REPORT_TTL)
+    PdfReport.objects.filter(updated_at__lt=cutoff).delete()
+    try:
+        files = default_storage.listdir(directory)[1]
+        for filename in files:
+            name = f'{directory}/{filename}'
+            if default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+    except (FileNotFoundError, NotImplementedError):
+        # Nothing stored yet, or a storage backend that cannot list or date its files
+        pass
+
+
+def _pdf_cell(value, limit):
+    text = '' if value is None else str(value)
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def _pdf_page(writer, title, subtitle, number):
+    page = writer.new_page()
+    top = page.height - 40
+    page.text(40, top, title, size=16, bold=True)
+    page.text(40, top - 18, subtitle, size=9, gray=0.4)
+    page.text(page.width - 90, top, f'Page {number}', size=9, gray=0.4)
+    header_y = top - 48
+    page.rect(36, header_y - 5, page.width - 72, 18, rgb=(0.17, 0.24, 0.31))
+    for heading, x, limit in PDF_COLUMNS:
+        page.text(x, header_y, heading, size=9, bold=True, gray=1)
+    return page, header_y - 16
+
+
+def write_applications_pdf(applications, title, fileobj, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Write ``applications`` as a paginated PDF table to ``fileobj``; returns the page count.
+
+    Rows are read ``chunk_size`` at a time and each page is flushed to
+    ``fileobj`` as soon as it is full.
+    """
+    totals = Counter(dict(applications.order_by().values_list('status').annotate(n=Count('id'))))
+    summary = summarize(totals)
+    generated = timezone.localtime().strftime('%B %d, %Y %H:%M')
+    subtitle = (
+        f"Generated {generated}  |  Total {summary['total']}  |  Pending {summary['pending']}  |  "
+        f"Approved {summary['approved']}  |  Rejected {summary['rejected']}  |  Completed {summary['completed']}"
+    )
+
+    writer = PdfWriter(fileobj)
+    page, y = _pdf_page(writer, title, subtitle, 1)
+    rows_on_page = 0
+    rows = _keyset_rows(applications, PDF_COLUMN_FIELDS, ('-application_date', '-id'), chunk_size)
+    for pk, applied, first_name, last_name, admission, current, requested, year, status in rows:
+        if rows_on_page == PDF_ROWS_PER_PAGE:
+            writer.add_page(page)
+            page, y = _pdf_page(writer, title, subtitle, writer.page_count + 1)
+            rows_on_page = 0
+        values = (
+            pk,
+            timezone.localtime(applied).strftime('%Y-%m-%d') if applied else '',
+            f"{first_name or ''} {last_name or ''}".strip(),
+            admission,
+            current,
+            requested,
+            year,
+            STATUS_LABELS.get(status, status),
+        )
+        for (heading, x, limit), value in zip(PDF_COLUMNS, values):
+            page.text(x, y, _pdf_cell(value, limit))
+        page.line(36, y - 4, page.width - 36, y - 4)
+        y -= 14
+        rows_on_page += 1
+
+    if summary['total'] == 0:
+        page.text(40, y, 'No applications found.', gray=0.4)
+    page.text(40, 24, 'Inter-Faculty Transfer System - Official Report. This is a computer generated document.', size=8, gray=0.4)
+    writer.add_page(page)
+    writer.close()
+    return writer.page_count
@@ -0,0 +1,62 @@
+"""
+Per-user fragment caching for the student and dean dashboards.
+
+Each dashboard wraps its application sections in a ``{% cache %}`` block
+varied on the user and on ``dashboard_version(...)``. The version is one
+aggregate query over the applications the section lists: how many there are
+and their latest ``last_updated``. It also folds in the number of unread
+notifications the page shows and a generation token. Transitions, new
+applications and deletions all change the aggregate, so the key rotates by
+itself. Old fragments are never looked up again and expire after
+DASHBOARD_FRAGMENT_CACHE_TTL. The generation covers what ``last_updated``
+does not see: faculty, program and student changes and eligibility
+rescoring, which is written with bulk_update. It lives in the shared cache
+(settings.CACHES), since the job worker bumps it too.
+
+The views hand the sections their querysets and pages lazily, so a cache
+hit skips their queries as well as the template work.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.middleware.csrf import get_token
+
+from .models import Faculty, Program, Student
+
+
+FRAGMENT_CACHE_TTL = getattr(settings, 'DASHBOARD_FRAGMENT_CACHE_TTL', 60 * 10)
+GENERATION_KEY = 'dashboards:fragments:generation'
+GENERATION_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def dashboard_version(request, applications, *extra):
+    """A token for a fragment listing ``applications``; changes whenever they, the generation or ``extra`` do"""
+    version = applications.aggregate(total=Count('id'), latest=Max('last_updated'))
+    # Forms in a fragment carry a CSRF token, which is only valid for the secret it was made from
+    get_token(request)
+    parts = (
+        # A missing generation (expired or culled) starts afresh rather than reading as 0
+        cache.get_or_set(GENERATION_KEY, time.time_ns, GENERATION_TIMEOUT),
+        version['total'],
+        version['latest'].isoformat() if version['latest'] else '',
+        request.META['CSRF_COOKIE'],
+        *extra,
+    )
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def invalidate_dashboards(sender=None, **kwargs):
+    """Rotate every dashboard fragment key once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, time.time_ns(), GENERATION_TIMEOUT))
+
+
+# Program names and faculty codes are on every dashboard; student details on the dean's
+for model in (Faculty, Program, Student):
+    post_save.connect(invalidate_dashboards, sender=model, dispatch_uid=f'dashboard_fragments_save_{model.__name__}')
+    post_delete.connect(invalidate_dashboards, sender=model, dispatch_uid=f'dashboard_fragments_delete_{model.__name__}')
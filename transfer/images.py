@@ -0,0 +1,145 @@
+"""
+Responsive image variants.
+
+Images in media storage (profile pictures, the dean portraits under
+``deans/``) are served through ``/img/<width>/<format>/<digest>/<source>``.
+The digest is a hash of the source file's content. When the source changes
+its URLs change too, so every variant can be cached by browsers forever
+(``Cache-Control: immutable``). A variant is resized with Pillow the first
+time it is requested and written to ``variants/<digest>/<width>.<ext>`` in
+media storage; later requests just stream that file.
+
+Templates use ``{% responsive_image %}`` from the ``images`` tag library,
+which emits a <picture> with WebP and JPEG ``srcset``s.
+"""
+
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+
+VARIANT_WIDTHS = tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (64, 128, 256, 512)))
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+SOURCE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif'}
+# Only these media directories can be resized (not, say, uploaded KCSE slips)
+SOURCE_DIRECTORIES = tuple(getattr(settings, 'IMAGE_VARIANT_SOURCES', ('deans/', 'profiles/')))
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DIGEST_CACHE_TTL = 60 * 60 * 24
+
+
+class VariantError(Exception):
+    """The requested source, width or format cannot be served"""
+
+
+class StaleVariant(VariantError):
+    """The source has changed since the URL was issued; ``url`` is the current one"""
+
+    def __init__(self, url):
+        super().__init__('The image has changed.')
+        self.url = url
+
+
+def _source_name(source):
+    # A FieldFile (e.g. profile.profile_pic) or a name relative to MEDIA_ROOT
+    return getattr(source, 'name', source) or ''
+
+
+def source_digest(name):
+    """Short content hash of media file ``name``, or None if it is missing or not an image"""
+    if not name.startswith(SOURCE_DIRECTORIES) or os.path.splitext(name)[1].lower() not in SOURCE_EXTENSIONS:
+        return None
+    try:
+        stamp = (default_storage.size(name), default_storage.get_modified_time(name).timestamp())
+    except (OSError, NotImplementedError, ValueError, SuspiciousFileOperation):
+        return None
+    key = 'images:digest:' + hashlib.md5(f'{name}|{stamp}'.encode()).hexdigest()
+    digest = cache.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with default_storage.open(name, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()[:16]
+        cache.set(key, digest, DIGEST_CACHE_TTL)
+    return digest
+
+
+def media_url(source):
+    """Plain URL of a media file, for images that cannot be resized"""
+    return default_storage.url(_source_name(source))
+
+
+def variant_url(name, digest, width, fmt):
+    return reverse('image_variant', kwargs={'width': width, 'fmt': fmt, 'digest': digest, 'source': name})
+
+
+def srcset(source, fmt, widths=VARIANT_WIDTHS):
+    """The ``srcset`` attribute value for ``source`` in ``fmt``, or '' if it cannot be served"""
+    name = _source_name(source)
+    digest = source_digest(name) if name else None
+    if digest is None:
+        return ''
+    return ', '.join(f'{variant_url(name, digest, width, fmt)} {width}w' for width in widths)
+
+
+def variant_name(digest, width, fmt):
+    return f'variants/{digest}/{width}.{fmt}'
+
+
+def _render(name, width, fmt):
+    from PIL import Image, ImageOps
+
+    with default_storage.open(name, 'rb') as f:
+        image = Image.open(io.BytesIO(f.read()))
+        image = ImageOps.exif_transpose(image)
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+    pil_format = FORMATS[fmt][0]
+    if fmt == 'jpeg' or image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if has_alpha and fmt == 'jpeg':
+            # JPEG has no transparency: flatten onto white
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, 'white')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    output = io.BytesIO()
+    options = {'optimize': True} if fmt == 'jpeg' else {'method': 4}
+    image.save(output, pil_format, quality=80, **options)
+    return output.getvalue()
+
+
+def get_variant(name, digest, width, fmt):
+    """
+    Storage name of the ``width``/``fmt`` variant of ``name``, creating it on
+    first use. Raises VariantError for widths or formats outside the fixed
+    set or missing sources, and StaleVariant for an outdated digest.
+    """
+    if width not in VARIANT_WIDTHS or fmt not in FORMATS:
+        raise VariantError('Unsupported variant.')
+    current = source_digest(name)
+    if current is None:
+        raise VariantError('No such image.')
+    if current != digest:
+        raise StaleVariant(variant_url(name, current, width, fmt))
+
+    target = variant_name(digest, width, fmt)
+    if not default_storage.exists(target):
+        data = _render(name, width, fmt)
+        if not default_storage.exists(target):
+            target = default_storage.save(target, ContentFile(data))
+    return target
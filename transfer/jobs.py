@@ -0,0 +1,109 @@
+"""
+A small durable job queue stored in the application database.
+
+Register a handler with ``@job('name')`` and queue work with
+``enqueue('name', key=value, ...)``. A handler registered with
+``@job('name', bind=True)`` is also passed its Job's id as ``job_id``, to
+recognise work an earlier attempt of the same job already committed. The Job
+row is written in the caller's transaction, so a job only becomes visible to
+workers if the request that queued it commits. ``manage.py run_jobs`` drains
+the queue: it claims batches with ``SELECT ... FOR UPDATE SKIP LOCKED``
+(where the database supports it), runs each handler inside its own
+transaction and retries failures with exponential backoff until
+``max_attempts`` is reached.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 30  # seconds; doubled on every further attempt
+LOCK_TIMEOUT = timedelta(minutes=10)  # running jobs older than this are assumed abandoned
+
+_registry = {}
+
+
+def job(name, bind=False):
+    """Register the decorated function as the handler for jobs called ``name``; ``bind`` passes it ``job_id`` too"""
+    def decorator(func):
+        _registry[name] = (func, bind)
+        return func
+    return decorator
+
+
+def enqueue(name, run_at=None, max_attempts=5, **payload):
+    """Queue a job; ``payload`` must be JSON-serialisable and becomes the handler's kwargs"""
+    if name not in _registry:
+        raise ValueError(f"No job handler registered for '{name}'")
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def claim(worker_id, batch_size):
+    """Mark up to ``batch_size`` due jobs as running for ``worker_id`` and return them"""
+    now = timezone.now()
+    due = Job.objects.filter(
+        Q(status='queued', run_at__lte=now) |
+        Q(status='running', locked_at__lt=now - LOCK_TIMEOUT)
+    )
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.order_by('run_at', 'id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids).update(status='running', locked_at=now, locked_by=worker_id)
+    return list(Job.objects.filter(id__in=ids, locked_by=worker_id).order_by('run_at', 'id'))
+
+
+def run(job_row):
+    """Run one claimed job and record the outcome; returns True on success"""
+    handler, bind = _registry.get(job_row.name, (None, False))
+    attempts = job_row.attempts + 1
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler registered for '{job_row.name}'")
+        kwargs = {**job_row.payload, 'job_id': job_row.pk} if bind else job_row.payload
+        with transaction.atomic():
+            handler(**kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s (%s) failed on attempt %s", job_row.pk, job_row.name, attempts)
+        if attempts >= job_row.max_attempts:
+            Job.objects.filter(pk=job_row.pk).update(
+                status='failed', attempts=attempts, last_error=error,
+                locked_at=None, locked_by='', finished_at=timezone.now(),
+            )
+        else:
+            delay = timedelta(seconds=RETRY_BASE_DELAY * 2 ** (attempts - 1))
+            Job.objects.filter(pk=job_row.pk).update(
+                status='queued', attempts=attempts, last_error=error,
+                locked_at=None, locked_by='', run_at=timezone.now() + delay,
+            )
+        return False
+
+    Job.objects.filter(pk=job_row.pk).update(
+        status='done', attempts=attempts, locked_at=None, locked_by='', finished_at=timezone.now(),
+    )
+    return True
+
+
+def run_pending(worker_id='inline', batch_size=50):
+    """Claim and run one batch; returns the number of jobs processed"""
+    batch = claim(worker_id, batch_size)
+    for job_row in batch:
+        run(job_row)
+    return len(batch)
@@ -0,0 +1,51 @@
+"""
+KCSE subject results.
+
+``replace_results(student, results)`` swaps a student's subject results for
+a new set with one DELETE and one bulk INSERT, computing each row's grade
+points on the way and rescoring the student's open applications.
+``with_kcse_results(queryset)`` makes a queryset of applications load the
+results of every student on it in one extra query.
+"""
+
+import re
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .eligibility import rescore_students
+from .models import KCSE_Result, kcse_grade_points
+
+
+SUBJECT_FIELD = re.compile(r'^subject_(\d+)$')
+
+
+def results_from_post(data):
+    """(subject, grade) pairs from the application form's numbered subject_N/grade_N fields, in row order"""
+    rows = sorted(int(match.group(1)) for match in map(SUBJECT_FIELD.match, data) if match)
+    results = []
+    for row in rows:
+        subject = (data.get(f'subject_{row}') or '').strip()
+        grade = (data.get(f'grade_{row}') or '').strip()
+        if subject and grade:
+            results.append((subject, grade))
+    return results
+
+
+def replace_results(student, results):
+    """Replace ``student``'s KCSE results with ``results``, an iterable of (subject, grade) pairs"""
+    rows = [
+        KCSE_Result(student=student, subject=subject, grade=grade, points=kcse_grade_points(grade))
+        for subject, grade in results
+    ]
+    with transaction.atomic():
+        KCSE_Result.objects.filter(student=student).delete()
+        rows = KCSE_Result.objects.bulk_create(rows)
+        # bulk_create sends no post_save, so rescore the student's open applications here
+        rescore_students([student.pk])
+    return rows
+
+
+def with_kcse_results(queryset, lookup='student__kcse_results'):
+    """Prefetch the KCSE results of every student on ``queryset`` (in entry order) with one query"""
+    return queryset.prefetch_related(Prefetch(lookup, queryset=KCSE_Result.objects.order_by('id')))
@@ -0,0 +1,55 @@
+import json
+
+import dj_database_url
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from transfer import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency of connecting afresh, a persistent connection and the "
+        "connection pool against a PostgreSQL database, as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database-url', metavar='URL',
+            help="Benchmark this database (e.g. postgres://localhost/interfaculty) instead of 'default'.",
+        )
+        parser.add_argument('--requests', type=int, default=200, help="Simulated requests per mode (default: 200).")
+        parser.add_argument('--queries', type=int, default=1, help="Queries per simulated request (default: 1).")
+        parser.add_argument(
+            '--mode', action='append', dest='modes', choices=benchmark.CONNECTION_MODES,
+            help="Only benchmark this mode (repeatable).",
+        )
+        parser.add_argument('--output', metavar='FILE', help="Write the JSON report to FILE instead of stdout.")
+
+    def handle(self, *args, **options):
+        settings_dict = None
+        if options['database_url']:
+            # Start from the configured database so every setting Django expects
+            # (and the configured pool size) carries over
+            default = connections.settings['default']
+            settings_dict = {**default, **dj_database_url.parse(options['database_url'])}
+            if default.get('OPTIONS', {}).get('pool'):
+                settings_dict['OPTIONS'] = {**settings_dict.get('OPTIONS', {}), 'pool': default['OPTIONS']['pool']}
+
+        try:
+            report = benchmark.run_connection_benchmark(
+                settings_dict,
+                requests=max(1, options['requests']),
+                queries=max(1, options['queries']),
+                modes=options['modes'] or benchmark.CONNECTION_MODES,
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        rendered = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(rendered + '\n')
+            self.stdout.write(f"Wrote connection benchmark to {options['output']}.")
+        else:
+            self.stdout.write(rendered)
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from transfer import benchmark
+
+
+class Command(BaseCommand):
+    help = "Request every route as each role and report p50/p95 latency, query count and bytes as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10, help="Timed requests per route (default: 10).")
+        parser.add_argument('--prefix', default='synthetic', help="Username prefix used by seed_data (default: synthetic).")
+        parser.add_argument('--route', action='append', dest='routes', metavar='NAME', help="Only benchmark this URL name (repeatable).")
+        parser.add_argument('--output', metavar='FILE', help="Write the JSON report to FILE instead of stdout.")
+        parser.add_argument('--baseline', metavar='FILE', help="Fail on regressions against the report in FILE.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help="Allowed p95 slowdown against the baseline, as a fraction (default: 0.25).",
+        )
+
+    def handle(self, *args, **options):
+        # Allow the test client's host name and keep outgoing e-mail in memory
+        setup_test_environment()
+
+        report = benchmark.run_benchmark(
+            repeat=max(1, options['repeat']), prefix=options['prefix'], only=options['routes'],
+        )
+        rendered = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(rendered + '\n')
+            self.stdout.write(f"Wrote results for {len(report['routes'])} routes to {options['output']}.")
+        else:
+            self.stdout.write(rendered)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = benchmark.compare(report, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} routes regressed against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
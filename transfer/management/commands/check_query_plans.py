@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from transfer import query_plans, synthetic
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN every dashboard, report and admin-list query and fail on sequential scans of large tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0, metavar='STUDENTS',
+            help="Generate this many synthetic students first; they are rolled back afterwards.",
+        )
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help="Ignore scans of tables smaller than this (default: 1000).",
+        )
+        parser.add_argument(
+            '--baseline', metavar='FILE',
+            help="Also fail when a large-table scan differs from the plans saved in FILE.",
+        )
+        parser.add_argument(
+            '--write-baseline', metavar='FILE',
+            help="Save the current plans to FILE for later --baseline runs.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        with transaction.atomic():
+            if options['seed']:
+                created = synthetic.generate(students=options['seed'])
+                self.stdout.write(f"Seeded {created['applications']} applications, {created['notifications']} notifications.")
+            query_plans.analyze()
+            plans, problems = query_plans.check_plans(
+                query_plans.plan_queries(), options['min_rows'], baseline,
+            )
+            # Never keep the synthetic rows
+            transaction.set_rollback(True)
+
+        for name, scans in plans.items():
+            self.stdout.write(f"{name}:")
+            for scan in scans:
+                self.stdout.write(f"    {scan}")
+
+        if options['write_baseline']:
+            with open(options['write_baseline'], 'w') as f:
+                json.dump(plans, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote baseline for {len(plans)} queries to {options['write_baseline']}.")
+
+        for problem in problems:
+            self.stderr.write(problem)
+        if problems:
+            raise CommandError(f"{len(problems)} query plan problems.")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(plans)} query plans use indexes on every large table."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from transfer import eligibility
+from transfer.models import TransferApplication
+
+
+class Command(BaseCommand):
+    help = "Recompute the eligibility score and merit rank of transfer applications"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true', dest='all_statuses',
+            help="Rescore every application, not only those awaiting review.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=eligibility.BATCH_SIZE,
+            help=f"Applications scored per batch (default: {eligibility.BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        queryset = TransferApplication.objects.all() if options['all_statuses'] else None
+        scored = eligibility.score_applications(queryset, batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f"Scored {scored} applications."))
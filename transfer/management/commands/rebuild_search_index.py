@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from transfer import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the user search index (search entries and the full-text index over them)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=search.BATCH_SIZE,
+            help=f"Users indexed per batch (default: {search.BATCH_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} users."))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transfer import counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the application status counters from TransferApplication and verify them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help="Compare the stored counters with a fresh recount without changing anything.",
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            written = counters.rebuild()
+            self.stdout.write(f"Rebuilt {written} counter rows.")
+
+        expected = counters.expected_counters()
+        stored = counters.stored_counters()
+        mismatches = [
+            (key, expected.get(key, 0), stored.get(key, 0))
+            for key in sorted(set(expected) | set(stored), key=str)
+            if expected.get(key, 0) != stored.get(key, 0)
+        ]
+
+        for (faculty_id, requested_faculty_id, year, status), want, have in mismatches:
+            self.stderr.write(
+                f"faculty={faculty_id} requested_faculty={requested_faculty_id} "
+                f"year={year} status={status}: expected {want}, stored {have}"
+            )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} counter rows do not match the applications table.")
+
+        self.stdout.write(self.style.SUCCESS("Status counters match the applications table."))
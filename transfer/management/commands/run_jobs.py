@@ -0,0 +1,62 @@
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from transfer import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (notifications, student updates, e-mail)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help="Jobs claimed per round trip to the queue (default: 50).",
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help="Worker threads, each claiming its own batches (default: 1).",
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=2.0,
+            help="Seconds to wait when the queue is empty (default: 2).",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Drain the queue and exit instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        if concurrency == 1:
+            processed = self.work(f"{prefix}:0", options)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [pool.submit(self.work, f"{prefix}:{n}", options) for n in range(concurrency)]
+                processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs."))
+
+    def work(self, worker_id, options):
+        processed = 0
+        try:
+            while True:
+                close_old_connections()
+                count = jobs.run_pending(worker_id, options['batch_size'])
+                processed += count
+                if count:
+                    continue
+                if options['once']:
+                    return processed
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            return processed
+        finally:
+            # Each thread owns its connection; release it rather than leaking it
+            connections.close_all()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transfer import synthetic
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic faculties, programs, students, KCSE results, applications and notifications"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help="Students to create (default: 1000).")
+        parser.add_argument(
+            '--faculties', type=int, default=None,
+            help="Faculties to create or reuse (default: one per built-in faculty choice).",
+        )
+        parser.add_argument(
+            '--programs-per-faculty', type=int, default=synthetic.PROGRAMS_PER_FACULTY,
+            help=f"Programs per faculty (default: {synthetic.PROGRAMS_PER_FACULTY}).",
+        )
+        parser.add_argument('--kcse-subjects', type=int, default=7, help="KCSE results per student (default: 7).")
+        parser.add_argument(
+            '--notifications-per-user', type=int, default=5,
+            help="Notifications per student; reviewers get ten times as many (default: 5).",
+        )
+        parser.add_argument('--prefix', default='synthetic', help="Username prefix (default: synthetic).")
+        parser.add_argument('--password', default='password', help="Password for every created account.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for repeatable data (default: 0).")
+
+    def handle(self, *args, **options):
+        if options['faculties'] is not None and options['faculties'] < 1:
+            raise CommandError("--faculties must be at least 1.")
+        if options['programs_per_faculty'] < 1:
+            raise CommandError("--programs-per-faculty must be at least 1.")
+
+        created = synthetic.generate(
+            students=options['students'],
+            faculties=options['faculties'],
+            programs_per_faculty=options['programs_per_faculty'],
+            kcse_subjects=options['kcse_subjects'],
+            notifications_per_user=options['notifications_per_user'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            password=options['password'],
+        )
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}."))
+        self.stdout.write(
+            f"Reviewer accounts: {options['prefix']}_hod, {options['prefix']}_registrar, "
+            f"{options['prefix']}_admin and {options['prefix']}_dean_<faculty> (password: {options['password']})."
+        )
@@ -0,0 +1,114 @@
+"""
+Request-scoped profile resolution.
+
+ProfileMiddleware gives every request a ``request.profile`` attribute: the
+signed-in user's Profile (with its faculty attached), or None. The profile
+is loaded once with a joined query, then kept in the session so later
+requests need no profile query. A per-user version stamp in the shared
+cache, bumped whenever that Profile (or any Faculty) is written in any
+process, tells the middleware when the session copy is stale.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from .models import Faculty, Profile
+
+
+SESSION_KEY = '_cached_profile'
+FACULTY_VERSION_KEY = 'profile:version:faculties'
+VERSION_TIMEOUT = 60 * 60 * 24 * 7
+
+PROFILE_FIELDS = ('id', 'user_id', 'user_type', 'profile_pic', 'phone', 'faculty_id', 'department')
+FACULTY_FIELDS = ('id', 'name', 'code')
+
+
+def _user_version_key(user_id):
+    return f'profile:version:user:{user_id}'
+
+
+def _current_version(user_id):
+    keys = [_user_version_key(user_id), FACULTY_VERSION_KEY]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Never bumped, expired or culled: start a new stamp, so an older session copy cannot match
+            cache.add(key, time.time_ns(), VERSION_TIMEOUT)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _serialize(profile):
+    data = {field: getattr(profile, field) for field in PROFILE_FIELDS}
+    data['profile_pic'] = profile.profile_pic.name or ''
+    faculty = None
+    if profile.faculty is not None:
+        faculty = {field: getattr(profile.faculty, field) for field in FACULTY_FIELDS}
+    return {'profile': data, 'faculty': faculty}
+
+
+def _deserialize(data):
+    profile = Profile(**data['profile'])
+    profile._state.adding = False
+    faculty = None
+    if data['faculty'] is not None:
+        faculty = Faculty(**data['faculty'])
+        faculty._state.adding = False
+    profile.faculty = faculty
+    return profile
+
+
+def resolve_profile(request):
+    """The request user's Profile, from the session when it is still current, else from the database"""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+
+    version = _current_version(user.pk)
+    cached = request.session.get(SESSION_KEY)
+    if cached is not None and cached.get('user_id') == user.pk and cached.get('version') == version:
+        profile = _deserialize(cached['data']) if cached['data'] is not None else None
+    else:
+        profile = Profile.objects.select_related('faculty').filter(user=user).first()
+        request.session[SESSION_KEY] = {
+            'user_id': user.pk,
+            'version': version,
+            'data': _serialize(profile) if profile is not None else None,
+        }
+
+    # Make user.profile (used throughout the templates) reuse this instance
+    if profile is not None:
+        user = getattr(user, '_wrapped', user)
+        profile.user = user
+        Profile._meta.get_field('user').remote_field.set_cached_value(user, profile)
+    return profile
+
+
+class ProfileMiddleware:
+    """Attach ``request.profile`` to every request; must follow AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = resolve_profile(request)
+        return self.get_response(request)
+
+
+# ============================================
+# INVALIDATION
+# ============================================
+def invalidate_profile(sender, instance, **kwargs):
+    cache.set(_user_version_key(instance.user_id), time.time_ns(), VERSION_TIMEOUT)
+
+
+def invalidate_faculties(sender, instance, **kwargs):
+    cache.set(FACULTY_VERSION_KEY, time.time_ns(), VERSION_TIMEOUT)
+
+
+post_save.connect(invalidate_profile, sender=Profile, dispatch_uid='profile_cache_save')
+post_delete.connect(invalidate_profile, sender=Profile, dispatch_uid='profile_cache_delete')
+post_save.connect(invalidate_faculties, sender=Faculty, dispatch_uid='profile_cache_faculty_save')
+post_delete.connect(invalidate_faculties, sender=Faculty, dispatch_uid='profile_cache_faculty_delete')
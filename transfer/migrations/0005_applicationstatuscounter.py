@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    TransferApplication = apps.get_model('transfer', 'TransferApplication')
+    ApplicationStatusCounter = apps.get_model('transfer', 'ApplicationStatusCounter')
+    rows = TransferApplication.objects.values(
+        'current_program__faculty', 'requested_program__faculty', 'academic_year', 'status'
+    ).annotate(total=Count('id'))
+    ApplicationStatusCounter.objects.bulk_create([
+        ApplicationStatusCounter(
+            faculty_id=row['current_program__faculty'],
+            requested_faculty_id=row['requested_program__faculty'],
+            academic_year=row['academic_year'] or '',
+            status=row['status'],
+            count=row['total'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0004_student_aggregate_points_student_birth_cert_no_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('pending_hod', 'Pending HOD Review'), ('hod_approved', 'HOD Approved'), ('hod_rejected', 'HOD Rejected'), ('pending_dean', 'Pending Dean Review'), ('dean_approved', 'Dean Approved'), ('dean_rejected', 'Dean Rejected'), ('pending_registrar', 'Pending Registrar Review'), ('registrar_approved', 'Registrar Approved'), ('registrar_rejected', 'Registrar Rejected'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('faculty', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_counters', to='transfer.faculty')),
+                ('requested_faculty', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='incoming_counters', to='transfer.faculty')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('faculty', 'requested_faculty', 'academic_year', 'status'), name='unique_application_status_counter')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
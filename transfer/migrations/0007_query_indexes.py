@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0006_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at'], name='notification_user_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['user_type', 'faculty'], name='profile_type_faculty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferapplication',
+            index=models.Index(condition=models.Q(('status__in', ['pending_hod', 'hod_approved', 'dean_approved'])), fields=['status', '-application_date', '-id'], name='app_awaiting_review_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferapplication',
+            index=models.Index(fields=['status', '-application_date', '-id'], name='app_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferapplication',
+            index=models.Index(fields=['status', '-last_updated', '-id'], name='app_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferapplication',
+            index=models.Index(fields=['requested_program', 'status', '-application_date'], name='app_requested_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferapplication',
+            index=models.Index(fields=['current_program', 'status', '-application_date'], name='app_current_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferapplication',
+            index=models.Index(fields=['-application_date', '-id'], name='app_date_idx'),
+        ),
+        # auth.User is not ours to add Meta indexes to; the admin user list orders by date_joined
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_date_joined_idx ON auth_user (date_joined DESC, id DESC)',
+            'DROP INDEX IF EXISTS auth_user_date_joined_idx',
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:52
+
+from django.db import migrations, models
+
+
+GRADE_POINTS = {
+    'A': 12, 'A-': 11, 'B+': 10, 'B': 9, 'B-': 8, 'C+': 7,
+    'C': 6, 'C-': 5, 'D+': 4, 'D': 3, 'D-': 2, 'E': 1,
+}
+
+
+def fill_points(apps, schema_editor):
+    KCSE_Result = apps.get_model('transfer', 'KCSE_Result')
+    # One UPDATE per distinct grade spelling rather than one per row
+    for grade in KCSE_Result.objects.values_list('grade', flat=True).distinct():
+        points = GRADE_POINTS.get((grade or '').replace(' ', '').upper())
+        if points is not None:
+            KCSE_Result.objects.filter(grade=grade).update(points=points)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kcse_result',
+            name='points',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_points, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0008_kcse_result_points'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='program',
+            name='cutoff_points',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='program',
+            name='subject_requirements',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='transferapplication',
+            name='eligibility_rank',
+            field=models.FloatField(default=-1000000.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='transferapplication',
+            name='eligibility_score',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='transferapplication',
+            name='eligible',
+            field=models.BooleanField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transferapplication',
+            index=models.Index(fields=['status', '-eligibility_rank', '-id'], name='app_status_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+SQLITE_FORWARD = [
+    # External-content FTS5 table: the text lives in transfer_searchentry, the index here
+    """CREATE VIRTUAL TABLE transfer_search_fts USING fts5(
+        document, content='transfer_searchentry', content_rowid='user_id',
+        tokenize='unicode61', prefix='2 3'
+    )""",
+    """CREATE TRIGGER transfer_search_fts_insert AFTER INSERT ON transfer_searchentry BEGIN
+        INSERT INTO transfer_search_fts(rowid, document) VALUES (new.user_id, new.document);
+    END""",
+    """CREATE TRIGGER transfer_search_fts_delete AFTER DELETE ON transfer_searchentry BEGIN
+        INSERT INTO transfer_search_fts(transfer_search_fts, rowid, document)
+        VALUES ('delete', old.user_id, old.document);
+    END""",
+    """CREATE TRIGGER transfer_search_fts_update AFTER UPDATE ON transfer_searchentry BEGIN
+        INSERT INTO transfer_search_fts(transfer_search_fts, rowid, document)
+        VALUES ('delete', old.user_id, old.document);
+        INSERT INTO transfer_search_fts(rowid, document) VALUES (new.user_id, new.document);
+    END""",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS transfer_search_fts_update',
+    'DROP TRIGGER IF EXISTS transfer_search_fts_delete',
+    'DROP TRIGGER IF EXISTS transfer_search_fts_insert',
+    'DROP TABLE IF EXISTS transfer_search_fts',
+]
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    "CREATE INDEX search_document_fts_idx ON transfer_searchentry USING gin (to_tsvector('simple', document))",
+    'CREATE INDEX search_document_trgm_idx ON transfer_searchentry USING gin (document gin_trgm_ops)',
+]
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS search_document_trgm_idx',
+    'DROP INDEX IF EXISTS search_document_fts_idx',
+]
+
+
+def _execute(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _execute(schema_editor, {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD})
+
+
+def fill_entries(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Student = apps.get_model('transfer', 'Student')
+    SearchEntry = apps.get_model('transfer', 'SearchEntry')
+    students = {
+        user_id: (pk, (admission_number or '').lower())
+        for pk, user_id, admission_number in Student.objects.values_list('id', 'user_id', 'admission_number')
+    }
+    entries = []
+    users = User.objects.values_list('id', 'username', 'first_name', 'last_name', 'email')
+    for user_id, username, first_name, last_name, email in users.iterator(chunk_size=1000):
+        student_id, admission_number = students.get(user_id, (None, ''))
+        fields = [username.lower(), first_name.lower(), last_name.lower(), admission_number]
+        entries.append(SearchEntry(
+            user_id=user_id, student_id=student_id,
+            username=fields[0], first_name=fields[1], last_name=fields[2], admission_number=fields[3],
+            document=' '.join(filter(None, [*fields, email.lower()])),
+        ))
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('transfer', '0010_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('username', models.CharField(max_length=150)),
+                ('first_name', models.CharField(blank=True, max_length=150)),
+                ('last_name', models.CharField(blank=True, max_length=150)),
+                ('admission_number', models.CharField(blank=True, max_length=20)),
+                ('document', models.TextField(blank=True)),
+                ('student', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='search_entry', to='transfer.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['username'], name='search_username_idx', opclasses=['varchar_pattern_ops']), models.Index(fields=['first_name'], name='search_first_name_idx', opclasses=['varchar_pattern_ops']), models.Index(fields=['last_name'], name='search_last_name_idx', opclasses=['varchar_pattern_ops']), models.Index(fields=['admission_number'], name='search_admission_idx', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(fill_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0011_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('action', models.CharField(choices=[('application.transition', 'Application reviewed'), ('application.override', 'Application status overridden'), ('user.create', 'User created'), ('user.update', 'User changed'), ('user.delete', 'User deleted'), ('faculty.create', 'Faculty created'), ('faculty.update', 'Faculty changed'), ('faculty.delete', 'Faculty deleted'), ('program.create', 'Program created'), ('program.update', 'Program changed'), ('program.delete', 'Program deleted'), ('auth.login', 'Signed in'), ('auth.login_failed', 'Failed sign-in'), ('auth.logout', 'Signed out')], max_length=40)),
+                ('actor_username', models.CharField(blank=True, max_length=150)),
+                ('object_type', models.CharField(blank=True, max_length=50)),
+                ('object_id', models.CharField(blank=True, max_length=50)),
+                ('object_repr', models.CharField(blank=True, max_length=200)),
+                ('changes', models.JSONField(blank=True, default=dict)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='audit_created_idx'), models.Index(fields=['action', '-created_at', '-id'], name='audit_action_created_idx'), models.Index(fields=['actor_username', '-created_at', '-id'], name='audit_actor_created_idx'), models.Index(fields=['object_type', 'object_id', '-created_at'], name='audit_object_idx')],
+            },
+        ),
+    ]
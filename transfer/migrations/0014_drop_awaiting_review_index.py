@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0013_cache_table'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transferapplication',
+            name='app_awaiting_review_idx',
+        ),
+    ]
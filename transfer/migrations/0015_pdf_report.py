@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0014_drop_awaiting_review_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=32, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('file_name', models.CharField(blank=True, default='', max_length=255)),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, default='', max_length=200)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['updated_at'], name='pdf_report_updated_idx')],
+            },
+        ),
+    ]
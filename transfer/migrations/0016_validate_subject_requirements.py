@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:05
+
+import transfer.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transfer', '0015_pdf_report'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='program',
+            name='subject_requirements',
+            field=models.JSONField(blank=True, default=dict, validators=[transfer.models.validate_subject_requirements]),
+        ),
+    ]
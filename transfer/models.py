@@ -1,4 +1,8 @@
-from django.db import models
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
@@ -21,15 +25,48 @@ class Faculty(models.Model):
         return f"{self.code}: {self.name}"  # Shows "SESS: School of Education & Social Sciences"
 
 # PROGRAM MODEL - FIXED __str__ METHOD
+def validate_subject_requirements(value):
+    """Subject requirements map subject names to KCSE grades, e.g. {"Mathematics": "C+"}"""
+    if not isinstance(value, dict):
+        raise ValidationError('Enter the subject requirements as {"Subject": "Grade"}.')
+    invalid = [
+        f'{subject}: {grade}' for subject, grade in value.items()
+        if not str(subject).strip() or not isinstance(grade, str) or kcse_grade_points(grade) is None
+    ]
+    if invalid:
+        raise ValidationError('Not a subject and KCSE grade: %(invalid)s', params={'invalid': ', '.join(invalid)})
+
+
 class Program(models.Model):
     name = models.CharField(max_length=100)
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, related_name='programs')
+    # Transfer eligibility: minimum cluster weight (blank = the student's university cutoff)
+    # and minimum KCSE grades per subject, e.g. {"Mathematics": "C+"}
+    cutoff_points = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+    subject_requirements = models.JSONField(default=dict, blank=True, validators=[validate_subject_requirements])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._eligibility_rules = instance.eligibility_rules()
+        instance._saved_faculty_id = instance.faculty_id
+        return instance
+
+    def eligibility_rules(self):
+        """What eligibility scoring reads from this program (see transfer/eligibility.py)"""
+        return self.cutoff_points, json.dumps(self.subject_requirements, sort_keys=True, default=str)
+
+    def save(self, *args, **kwargs):
+        # An unknown grade would make every application ineligible for this program
+        validate_subject_requirements(self.subject_requirements)
+        super().save(*args, **kwargs)
+        self._eligibility_rules = self.eligibility_rules()
+        self._saved_faculty_id = self.faculty_id
     
     def __str__(self):
         return f"{self.name} ({self.faculty.code})"  # FIXED: self.faculty.code, NOT self.code
 
 # USER PROFILE MODEL
-User.profile = property(lambda u: Profile.objects.get_or_create(user=u)[0])
 class Profile(models.Model):
     USER_TYPES = [
         ('student', 'Student'),
@@ -45,6 +82,12 @@ class Profile(models.Model):
     phone = models.CharField(max_length=15, null=True, blank=True)
     faculty = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True)
     department = models.CharField(max_length=100, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # "The dean / HOD of this faculty" lookups
+            models.Index(fields=['user_type', 'faculty'], name='profile_type_faculty_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.user_type}"
@@ -77,17 +120,37 @@ class Student(models.Model):
     university_cutoff = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
     
     # NEW FIELD - KCSE Slip Upload
-    kcse_slip = models.FileField(upload_to='kcse_slips/', blank=True, null=True)
+    kcse_slip = models.FileField(upload_to='kcse_slips/', blank=True, null=True, max_length=255)
+    kcse_slip_upload = models.ForeignKey(
+        'Upload', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', editable=False
+    )
     
     def __str__(self):
         return f"{self.admission_number} - {self.user.get_full_name()}"
 
 
     # KCSE RESULT MODEL
+# KNEC grade points per subject grade
+KCSE_GRADE_POINTS = {
+    'A': 12, 'A-': 11, 'B+': 10, 'B': 9, 'B-': 8, 'C+': 7,
+    'C': 6, 'C-': 5, 'D+': 4, 'D': 3, 'D-': 2, 'E': 1,
+}
+
+
+def kcse_grade_points(grade):
+    """Points for a KCSE grade such as 'B+' (case and spaces ignored), or None if it is not one"""
+    return KCSE_GRADE_POINTS.get((grade or '').replace(' ', '').upper())
+
+
 class KCSE_Result(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='kcse_results')
     subject = models.CharField(max_length=100)
     grade = models.CharField(max_length=5)
+    points = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    
+    def save(self, *args, **kwargs):
+        self.points = kcse_grade_points(self.grade)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.subject}: {self.grade}"
@@ -105,6 +168,12 @@ cluster_weight = models.DecimalField(max_digits=5, decimal_places=2)
 university_cutoff = models.DecimalField(max_digits=5, decimal_places=2)
 kcse_slip = models.FileField(upload_to='kcse_slips/', blank=True, null=True)
 # TRANSFER APPLICATION MODEL
+# Statuses that still sit in a reviewer's queue (HOD, Dean, Registrar)
+AWAITING_REVIEW_STATUSES = ['pending_hod', 'hod_approved', 'dean_approved']
+# eligibility_rank of applications that have not been scored, below any real score
+UNRANKED = -1e6
+
+
 class TransferApplication(models.Model):
     STATUS_CHOICES = [
         ('pending_hod', 'Pending HOD Review'),
@@ -118,6 +187,7 @@ class TransferApplication(models.Model):
         ('registrar_rejected', 'Registrar Rejected'),
         ('completed', 'Completed'),
     ]
+    AWAITING_REVIEW_STATUSES = AWAITING_REVIEW_STATUSES
     
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='applications')
     current_program = models.ForeignKey('Program', on_delete=models.SET_NULL, null=True, related_name='transfer_from')
@@ -132,10 +202,48 @@ class TransferApplication(models.Model):
     dean_comment = models.TextField(null=True, blank=True)
     registrar_comment = models.TextField(null=True, blank=True)
     new_admission_number = models.CharField(max_length=20, null=True, blank=True)
+    # Maintained by transfer.eligibility; not editable by hand
+    eligible = models.BooleanField(null=True, editable=False)
+    eligibility_score = models.FloatField(null=True, editable=False)
+    eligibility_rank = models.FloatField(default=UNRANKED, editable=False)
+
+    class Meta:
+        indexes = [
+            # Any status filter (reviewer queues, admin list, exports), newest first
+            models.Index(fields=['status', '-application_date', '-id'], name='app_status_date_idx'),
+            # Registrar's completed transfers, most recently updated first
+            models.Index(fields=['status', '-last_updated', '-id'], name='app_status_updated_idx'),
+            # Dean (incoming) and faculty HOD (outgoing) queues
+            models.Index(fields=['requested_program', 'status', '-application_date'], name='app_requested_status_idx'),
+            models.Index(fields=['current_program', 'status', '-application_date'], name='app_current_status_idx'),
+            # Unfiltered "all applications" lists
+            models.Index(fields=['-application_date', '-id'], name='app_date_idx'),
+            # Dean queue ranked by merit
+            models.Index(fields=['status', '-eligibility_rank', '-id'], name='app_status_rank_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.admission_number} - {self.requested_program}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from .counters import counter_key
+        instance = super().from_db(db, field_names, values)
+        instance._counter_key = counter_key(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save and move this application between status counters in the same transaction"""
+        from . import counters
+        old_key = getattr(self, '_counter_key', None)
+        new_key = counters.counter_key(self)
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if old_key != new_key:
+                counters.move(old_key, new_key)
+        self._counter_key = new_key
+
+
 # NOTIFICATION MODEL
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
@@ -143,9 +251,214 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     application = models.ForeignKey(TransferApplication, on_delete=models.CASCADE, null=True, blank=True)
+    # The job that created it, so a rerun of that job does not notify twice
+    job = models.ForeignKey('Job', on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
+
+    class Meta:
+        indexes = [
+            # A user's unread notifications, newest first
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notification_user_unread_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'application', 'user'], name='unique_job_notification'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.message[:50]}"
 
 
+# APPLICATION STATUS COUNTER MODEL
+class ApplicationStatusCounter(models.Model):
+    """Running count of applications per (faculty, requested faculty, academic year, status)"""
+    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, null=True, blank=True, related_name='outgoing_counters')
+    requested_faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, null=True, blank=True, related_name='incoming_counters')
+    academic_year = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=TransferApplication.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['faculty', 'requested_faculty', 'academic_year', 'status'],
+                name='unique_application_status_counter',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.faculty_id} -> {self.requested_faculty_id} {self.academic_year} {self.status}: {self.count}"
+
+
+# BACKGROUND JOB MODEL
+class Job(models.Model):
+    """A unit of deferred work, stored in the database and run by `manage.py run_jobs`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
 
+# PDF REPORT MODEL
+class PdfReport(models.Model):
+    """The state of one PDF report rendered by the job worker; see transfer/exports.py"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    key = models.CharField(max_length=32, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file_name = models.CharField(max_length=255, blank=True, default='')
+    pages = models.PositiveIntegerField(default=0)
+    error = models.CharField(max_length=200, blank=True, default='')
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='pdf_report_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status})"
+
+
+# CONTENT-ADDRESSED UPLOAD MODEL
+class Upload(models.Model):
+    """An uploaded file stored once under its SHA-256; see transfer/uploads.py"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('valid', 'Valid'),
+        ('invalid', 'Invalid'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True, default='')
+    thumbnail = models.FileField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.file.name} ({self.status})"
+
+
+# SEARCH INDEX MODEL
+class SearchEntry(models.Model):
+    """
+    One row per user with their searchable text, lower-cased; maintained by
+    transfer/search.py, which also keeps the full-text index over it.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    student = models.OneToOneField(
+        Student, on_delete=models.SET_NULL, null=True, blank=True, related_name='search_entry'
+    )
+    username = models.CharField(max_length=150)
+    first_name = models.CharField(max_length=150, blank=True)
+    last_name = models.CharField(max_length=150, blank=True)
+    admission_number = models.CharField(max_length=20, blank=True)
+    document = models.TextField(blank=True)
+
+    class Meta:
+        # Prefix autocomplete; varchar_pattern_ops lets PostgreSQL use them for prefix matches
+        indexes = [
+            models.Index(fields=['username'], name='search_username_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['first_name'], name='search_first_name_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['last_name'], name='search_last_name_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(
+                fields=['admission_number'], name='search_admission_idx', opclasses=['varchar_pattern_ops']
+            ),
+        ]
+
+    def __str__(self):
+        return self.username
+
+
+# AUDIT LOG MODEL
+class AuditLogQuerySet(models.QuerySet):
+    """Audit entries are append-only: rows can be added, never changed or removed"""
+
+    def update(self, **kwargs):
+        raise TypeError('Audit log entries cannot be changed.')
+
+    def delete(self):
+        raise TypeError('Audit log entries cannot be deleted.')
+
+
+class AuditLog(models.Model):
+    """One recorded action; written in batches by transfer/audit.py"""
+    ACTION_CHOICES = [
+        ('application.transition', 'Application reviewed'),
+        ('application.override', 'Application status overridden'),
+        ('user.create', 'User created'),
+        ('user.update', 'User changed'),
+        ('user.delete', 'User deleted'),
+        ('faculty.create', 'Faculty created'),
+        ('faculty.update', 'Faculty changed'),
+        ('faculty.delete', 'Faculty deleted'),
+        ('program.create', 'Program created'),
+        ('program.update', 'Program changed'),
+        ('program.delete', 'Program deleted'),
+        ('auth.login', 'Signed in'),
+        ('auth.login_failed', 'Failed sign-in'),
+        ('auth.logout', 'Signed out'),
+    ]
+
+    # When the action happened, not when the batch was written
+    created_at = models.DateTimeField(default=timezone.now)
+    action = models.CharField(max_length=40, choices=ACTION_CHOICES)
+    # No foreign key constraint: entries outlive the users they mention
+    actor = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    actor_username = models.CharField(max_length=150, blank=True)
+    object_type = models.CharField(max_length=50, blank=True)
+    object_id = models.CharField(max_length=50, blank=True)
+    object_repr = models.CharField(max_length=200, blank=True)
+    changes = models.JSONField(default=dict, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+
+    objects = AuditLogQuerySet.as_manager()
+
+    class Meta:
+        # Newest-first keyset pages, overall and per filter
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='audit_created_idx'),
+            models.Index(fields=['action', '-created_at', '-id'], name='audit_action_created_idx'),
+            models.Index(fields=['actor_username', '-created_at', '-id'], name='audit_actor_created_idx'),
+            models.Index(fields=['object_type', 'object_id', '-created_at'], name='audit_object_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError('Audit log entries cannot be changed.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError('Audit log entries cannot be deleted.')
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M} {self.actor_username or '-'} {self.action} {self.object_repr}"
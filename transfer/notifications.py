@@ -0,0 +1,86 @@
+"""
+Notification service.
+
+All notification writes go through here:
+
+* ``notify`` / ``notify_many`` create notifications (the latter in one bulk INSERT)
+* ``take_unread`` returns a user's unread notifications and marks them read in one UPDATE
+* ``unread_count`` returns a user's unread notification count
+
+Every page shows the unread count, so it is kept in the shared cache
+(settings.CACHES) rather than counted per request. Creating notifications
+increments it and marking them read decrements it; a missing count is
+recounted on the next read. The cache is a table in the same database, so
+the job worker's increments commit or roll back with its notifications.
+Lost updates between concurrent writers are possible, so counts expire
+after UNREAD_COUNT_TIMEOUT and are recounted then.
+
+New notifications are also pushed to the recipient through ``realtime``.
+"""
+
+from collections import Counter
+
+from django.core.cache import cache
+
+from .models import Notification
+from .realtime import publish_notifications
+
+
+UNREAD_COUNT_TIMEOUT = 60 * 5
+
+
+def _unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _adjust_unread(deltas):
+    """Apply {user_id: delta} to the cached unread counts; uncached ones are recounted when next read"""
+    for user_id, delta in deltas.items():
+        try:
+            cache.incr(_unread_key(user_id), delta)
+        except ValueError:
+            pass
+
+
+def unread_count(user):
+    """Number of unread notifications for ``user``"""
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None or count < 0:
+        count = Notification.objects.filter(user=user, is_read=False).count()
+        cache.set(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def notify(user, message, application=None):
+    """Create one notification for ``user``"""
+    notification = Notification.objects.create(user=user, message=message, application=application)
+    _adjust_unread({notification.user_id: 1})
+    publish_notifications([notification])
+    return notification
+
+
+def notify_many(notifications):
+    """
+    Create several notifications with a single INSERT.
+
+    ``notifications`` is an iterable of unsaved Notification instances.
+    """
+    notifications = Notification.objects.bulk_create(list(notifications))
+    _adjust_unread(Counter(notification.user_id for notification in notifications))
+    publish_notifications(notifications)
+    return notifications
+
+
+def take_unread(user):
+    """Return ``user``'s unread notifications, newest first, and mark them read with one UPDATE"""
+    notifications = list(
+        Notification.objects.filter(user=user, is_read=False).order_by('-created_at')
+    )
+    if notifications:
+        marked = Notification.objects.filter(id__in=[n.id for n in notifications], is_read=False).update(is_read=True)
+        if marked:
+            _adjust_unread({user.pk: -marked})
+        for notification in notifications:
+            notification.is_read = True
+    return notifications
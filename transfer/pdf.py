@@ -0,0 +1,135 @@
+"""
+A minimal streaming PDF writer for tabular reports.
+
+Only what the reports need: A4 pages, the built-in Helvetica fonts, text,
+lines and filled rectangles. Each page is compressed and written to the
+output file as soon as it is finished, so a report of any length is produced
+in constant memory; the page tree and cross-reference table are written by
+``close()``.
+"""
+
+import zlib
+
+
+A4_LANDSCAPE = (842, 595)
+
+_FONTS = {'F1': 'Helvetica', 'F2': 'Helvetica-Bold'}
+
+
+def _escape(text):
+    data = str(text).encode('cp1252', 'replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _num(value):
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+class Page:
+    """Drawing operations for one page; coordinates are in points from the bottom-left corner"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._ops = []
+
+    def text(self, x, y, text, size=9, bold=False, gray=0):
+        font = 'F2' if bold else 'F1'
+        self._ops.append(
+            b'BT %s g /%s %s Tf %s %s Td (%s) Tj ET' % (
+                _num(gray).encode(), font.encode(), _num(size).encode(),
+                _num(x).encode(), _num(y).encode(), _escape(text),
+            )
+        )
+
+    def line(self, x1, y1, x2, y2, gray=0.8, width=0.5):
+        self._ops.append(
+            f'{_num(gray)} G {_num(width)} w {_num(x1)} {_num(y1)} m {_num(x2)} {_num(y2)} l S'.encode()
+        )
+
+    def rect(self, x, y, width, height, rgb=(0.9, 0.9, 0.9)):
+        r, g, b = (_num(c) for c in rgb)
+        self._ops.append(f'{r} {g} {b} rg {_num(x)} {_num(y)} {_num(width)} {_num(height)} re f'.encode())
+
+    def content(self):
+        return b'\n'.join(self._ops)
+
+
+class PdfWriter:
+    """
+    Write pages to ``fileobj`` as they are added::
+
+        writer = PdfWriter(fileobj)
+        page = writer.new_page()
+        page.text(40, 550, 'Hello')
+        writer.add_page(page)
+        writer.close()
+    """
+
+    def __init__(self, fileobj, pagesize=A4_LANDSCAPE):
+        self._file = fileobj
+        self._pagesize = pagesize
+        self._offsets = {}
+        self._written = 0
+        self._page_ids = []
+        # 1 = catalog and 2 = page tree are written last; fonts follow them
+        self._font_ids = {name: 3 + n for n, name in enumerate(_FONTS)}
+        self._next_id = 3 + len(_FONTS)
+
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for name, base_font in _FONTS.items():
+            self._object(
+                self._font_ids[name],
+                f'<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>'.encode(),
+            )
+
+    @property
+    def page_count(self):
+        return len(self._page_ids)
+
+    def _write(self, data):
+        self._file.write(data)
+        self._written += len(data)
+
+    def _object(self, object_id, body):
+        self._offsets[object_id] = self._written
+        self._write(b'%d 0 obj\n' % object_id + body + b'\nendobj\n')
+
+    def _allocate(self):
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def new_page(self):
+        return Page(*self._pagesize)
+
+    def add_page(self, page):
+        stream = zlib.compress(page.content())
+        content_id = self._allocate()
+        self._object(
+            content_id,
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream',
+        )
+        fonts = ' '.join(f'/{name} {object_id} 0 R' for name, object_id in self._font_ids.items())
+        page_id = self._allocate()
+        self._object(
+            page_id,
+            (
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page.width} {page.height}] '
+                f'/Resources << /Font << {fonts} >> >> /Contents {content_id} 0 R >>'
+            ).encode(),
+        )
+        self._page_ids.append(page_id)
+
+    def close(self):
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>'.encode())
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_offset = self._written
+        size = self._next_id
+        self._write(b'xref\n0 %d\n' % size)
+        self._write(b'0000000000 65535 f \n')
+        for object_id in range(1, size):
+            self._write(b'%010d 00000 n \n' % self._offsets[object_id])
+        self._write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset))
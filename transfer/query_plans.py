@@ -0,0 +1,198 @@
+"""
+Query-plan checks for the dashboard, report and admin-list queries.
+
+``plan_queries()`` builds the same querysets the views run (reviewer
+worklists, unread notifications, student history, exports, admin lists, the
+job queue). ``explain_scans()`` runs EXPLAIN on one of them and reduces the
+plan to the table scans it performs; ``check_plans()`` flags every
+sequential scan over a table of ``min_rows`` or more, plus any scan of such a
+table that differs from a saved baseline. ``manage.py check_query_plans``
+drives it, on PostgreSQL in production and SQLite locally, and
+QueryPlanTests in transfer/tests.py runs it under ``manage.py test``.
+"""
+
+import json
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from .exports import filter_applications
+from .models import (
+    ApplicationStatusCounter, Faculty, Job, Notification, Profile, Student, TransferApplication,
+)
+from .worklists import WORKLIST_PAGE_SIZE, worklist_queryset
+
+
+Scan = namedtuple('Scan', ['table', 'index', 'rows'])
+
+PAGE = WORKLIST_PAGE_SIZE + 1
+
+
+def _worklist(queryset, order_field='application_date'):
+    # Same ordering and limit as worklists.keyset_page
+    return queryset.order_by(f'-{order_field}', '-id')[:PAGE]
+
+
+def plan_queries():
+    """{name: queryset} for every list and dashboard query worth guarding"""
+    faculty = Faculty.objects.filter(programs__isnull=False).order_by('id').first()
+    student = Student.objects.order_by('id').first()
+    reviewer = User.objects.filter(profile__user_type__in=['hod', 'dean', 'registrar']).order_by('id').first()
+    since = (timezone.localdate() - timedelta(days=90)).isoformat()
+
+    queries = {
+        'hod.pending': _worklist(worklist_queryset(status='pending_hod')),
+        'hod.all': _worklist(worklist_queryset()),
+        'registrar.pending': _worklist(worklist_queryset(status='dean_approved')),
+        'registrar.completed': _worklist(worklist_queryset(status='completed'), 'last_updated'),
+        'admin.applications': worklist_queryset().order_by('-application_date')[:20],
+        'admin.applications_by_status': worklist_queryset(status='hod_rejected').order_by('-application_date')[:20],
+        'admin.users': User.objects.select_related('profile__faculty').order_by('-id')[:20],
+        'export.completed_since': filter_applications(
+            TransferApplication.objects.all(), {'status': 'completed', 'from': since}
+        ).order_by('-application_date')[:PAGE],
+        'reports.status_totals': ApplicationStatusCounter.objects.values('status').order_by('status'),
+        'jobs.claim': Job.objects.filter(status='queued', run_at__lte=timezone.now()).order_by('run_at', 'id')[:50],
+    }
+    if faculty is not None:
+        queries.update({
+            'hod.faculty_pending': _worklist(
+                worklist_queryset(status='pending_hod', current_program__faculty=faculty)
+            ),
+            'dean.pending': _worklist(
+                worklist_queryset(status='hod_approved', requested_program__faculty=faculty), 'eligibility_rank'
+            ),
+            'dean.all': _worklist(worklist_queryset(requested_program__faculty=faculty)),
+            'admin.students_by_faculty': Student.objects.select_related(
+                'user', 'current_program__faculty'
+            ).filter(current_program__faculty=faculty).order_by('-id')[:20],
+            'tasks.dean_lookup': Profile.objects.filter(user_type='dean', faculty=faculty)[:1],
+        })
+    if student is not None:
+        queries.update({
+            'student.applications': TransferApplication.objects.filter(student=student).order_by('-application_date'),
+            'student.open_application': TransferApplication.objects.filter(
+                student=student, status__in=TransferApplication.AWAITING_REVIEW_STATUSES
+            )[:1],
+        })
+    if reviewer is not None:
+        queries['notifications.unread'] = Notification.objects.filter(
+            user=reviewer, is_read=False
+        ).order_by('-created_at')
+    return queries
+
+
+# ============================================
+# EXPLAIN PARSING
+# ============================================
+def _postgres_scans(queryset):
+    plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+    scans = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if 'Relation Name' in node:
+            index = None if node['Node Type'] == 'Seq Scan' else node.get('Index Name', node['Node Type'])
+            scans.append(Scan(node['Relation Name'], index, node.get('Plan Rows')))
+        stack.extend(node.get('Plans', []))
+    return scans
+
+
+_SQLITE_SCAN = re.compile(r'\b(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX (\w+))?)?')
+
+
+def _walks_primary_key(queryset, plan):
+    """
+    Whether SQLite reads ``queryset``'s table in primary key order and stops at its LIMIT.
+
+    SQLite reports that as a plain SCAN of the table (rows are stored in
+    rowid order); PostgreSQL reports it as an index scan on the primary key.
+    """
+    query = queryset.query
+    pk = queryset.model._meta.pk
+    ordering = {pk.name, pk.attname, 'pk', f'-{pk.name}', f'-{pk.attname}', '-pk'}
+    return (
+        query.high_mark is not None and not query.where
+        and len(query.order_by) == 1 and query.order_by[0] in ordering
+        and 'TEMP B-TREE FOR ORDER BY' not in plan
+    )
+
+
+def _sqlite_scans(queryset):
+    plan = queryset.explain()
+    table_name = queryset.model._meta.db_table
+    scans = []
+    for line in plan.splitlines():
+        match = _SQLITE_SCAN.search(line)
+        if not match:
+            continue
+        operation, table, index = match.groups()
+        if operation == 'SEARCH' or ' USING ' in line:
+            index = index or 'primary key'
+        elif table == table_name and _walks_primary_key(queryset, plan):
+            index = 'primary key'
+        scans.append(Scan(table, index, None))
+    return scans
+
+
+def explain_scans(queryset):
+    """The table scans in ``queryset``'s plan; ``index`` is None for a sequential scan"""
+    if connection.vendor == 'postgresql':
+        return _postgres_scans(queryset)
+    if connection.vendor == 'sqlite':
+        return _sqlite_scans(queryset)
+    raise NotImplementedError(f'No plan parser for {connection.vendor}')
+
+
+def describe(scan):
+    if scan.index is None:
+        return f'Seq Scan on {scan.table}'
+    return f'Index scan on {scan.table} using {scan.index}'
+
+
+# ============================================
+# CHECKS
+# ============================================
+def table_sizes():
+    """Row count of every table, exact (these checks run against seeded data, not production)"""
+    sizes = {}
+    with connection.cursor() as cursor:
+        for table in connection.introspection.table_names(cursor):
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            sizes[table] = cursor.fetchone()[0]
+    return sizes
+
+
+def analyze():
+    """Refresh planner statistics so freshly seeded rows are reflected in the plans"""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def check_plans(queries, min_rows, baseline=None):
+    """
+    Return ({name: [scan descriptions]}, [problem messages]).
+
+    A problem is a sequential scan of a table holding at least ``min_rows``
+    rows, or (given a ``baseline`` from an earlier run) a scan of such a table
+    that the baseline did not have.
+    """
+    sizes = table_sizes()
+    plans = {}
+    problems = []
+    for name, queryset in queries.items():
+        scans = explain_scans(queryset)
+        plans[name] = [describe(scan) for scan in scans]
+        for scan in scans:
+            rows = max(sizes.get(scan.table, 0), scan.rows or 0)
+            if rows < min_rows:
+                continue
+            if scan.index is None:
+                problems.append(f'{name}: {describe(scan)} (~{rows} rows)')
+            elif baseline is not None and name in baseline and describe(scan) not in baseline[name]:
+                problems.append(f'{name}: plan changed to {describe(scan)}; baseline was {baseline[name]}')
+    return plans, problems
@@ -0,0 +1,207 @@
+"""
+Real-time delivery of notifications to signed-in users.
+
+The notification service publishes every new notification (which carries the
+application's new status when there is one) to a broker channel named after
+the recipient. Browsers listen through the Server-Sent Events view in
+``views_realtime`` or fall back to its long-poll endpoint.
+
+The broker is pluggable through ``settings.REALTIME_BROKER`` (a dotted path).
+Notifications are mostly created in the job worker, so subscribers in the
+web processes only hear about them through a broker that crosses processes.
+``PostgresBroker`` publishes with NOTIFY and runs one LISTEN connection per
+process that fans messages out to that process's subscribers.
+``InProcessBroker`` only reaches subscribers in the publishing process (the
+development server and the test client). Any class implementing
+``publish(channel, message)`` and ``subscribe(channel)`` returning an async
+context manager like ``Subscription`` can be used. A message only wakes the
+listener, which reads the notifications themselves from the table, so a
+subscriber that misses one still catches up on its next reconnect or poll.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# Used when settings.REALTIME_BROKER is not set
+DEFAULT_BROKERS = {'postgresql': 'transfer.realtime.PostgresBroker'}
+DEFAULT_BROKER = 'transfer.realtime.InProcessBroker'
+# One PostgreSQL channel carries every user channel; the payload names the user channel
+PG_CHANNEL = 'transfer_realtime'
+LISTEN_RETRY_SECONDS = 5
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class Subscription:
+    """
+    Messages delivered to one subscriber on a channel.
+
+    Use as ``async with broker.subscribe(channel) as subscription`` and read
+    with ``await subscription.get(timeout)``; leaving the block unsubscribes.
+    """
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self._queue = None
+        self._loop = None
+
+    async def __aenter__(self):
+        self._queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        self.broker.add_subscriber(self.channel, self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.remove_subscriber(self.channel, self)
+
+    def deliver(self, message):
+        # May be called from any thread (a WSGI worker, an on_commit hook, ...)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+
+    async def get(self, timeout=None):
+        """Next message, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Broker that fans messages out to subscribers living in the current process"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscribe(self, channel):
+        return Subscription(self, channel)
+
+    def add_subscriber(self, channel, subscription):
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+
+    def remove_subscriber(self, channel, subscription):
+        with self._lock:
+            self._subscribers[channel].discard(subscription)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Broker that relays messages between processes with PostgreSQL LISTEN/NOTIFY.
+
+    ``publish`` sends a NOTIFY on the default database, from whichever
+    process created the notification. The first subscriber in a process
+    starts a thread holding a LISTEN connection, which hands every message
+    to that process's subscribers. LISTEN needs a session of its own, so the
+    thread connects to REALTIME_LISTEN_HOST, the database's direct endpoint
+    when the default connection goes through a transaction-mode pooler.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, channel, message):
+        # NOTIFY payloads are limited to 8000 bytes; listeners read the rest from the table
+        payload = json.dumps({'channel': channel, 'id': message.get('id')})
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [PG_CHANNEL, payload])
+
+    def add_subscriber(self, channel, subscription):
+        super().add_subscriber(channel, subscription)
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='realtime-listener', daemon=True)
+                self._listener.start()
+
+    def _connection_params(self):
+        params = connections[DEFAULT_DB_ALIAS].get_connection_params()
+        host = getattr(settings, 'REALTIME_LISTEN_HOST', '')
+        if host:
+            params['host'] = host
+        return params
+
+    def _listen(self):
+        import psycopg
+
+        while True:
+            try:
+                with psycopg.connect(**self._connection_params(), autocommit=True) as conn:
+                    conn.execute(f'LISTEN {PG_CHANNEL}')
+                    for notify in conn.notifies():
+                        message = json.loads(notify.payload)
+                        InProcessBroker.publish(self, message['channel'], message)
+            except Exception:
+                logger.exception("Realtime listener lost its connection; reconnecting in %s s", LISTEN_RETRY_SECONDS)
+                time.sleep(LISTEN_RETRY_SECONDS)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    The process-wide broker instance configured by ``settings.REALTIME_BROKER``
+    (default: ``PostgresBroker`` on PostgreSQL, ``InProcessBroker`` elsewhere)
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                default = DEFAULT_BROKERS.get(connections[DEFAULT_DB_ALIAS].vendor, DEFAULT_BROKER)
+                _broker = import_string(getattr(settings, 'REALTIME_BROKER', default))()
+    return _broker
+
+
+def notification_payload(notification):
+    payload = {
+        'id': notification.id,
+        'message': notification.message,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'application': notification.application_id,
+        'status': None,
+        'status_display': None,
+    }
+    application_field = notification._meta.get_field('application')
+    if application_field.is_cached(notification) and notification.application is not None:
+        application = notification.application
+        payload['status'] = application.status
+        payload['status_display'] = application.get_status_display()
+    return payload
+
+
+def publish_notifications(notifications):
+    """Push ``notifications`` to their recipients once the current transaction commits"""
+    messages = [(user_channel(n.user_id), notification_payload(n)) for n in notifications]
+    if not messages:
+        return
+
+    def send():
+        broker = get_broker()
+        for channel, message in messages:
+            broker.publish(channel, message)
+
+    transaction.on_commit(send)
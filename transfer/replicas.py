@@ -0,0 +1,158 @@
+"""
+Read replica routing for reports, exports and analytics.
+
+When settings.DATABASES has a ``replica`` alias (DATABASE_REPLICA_URL),
+``ReplicaRouter`` sends reads made inside ``use_replica()`` to it. Every
+other query, including every write, goes to the primary. The report and
+export views are wrapped with ``replica_view``, and the PDF job renders
+inside ``use_replica()``, so their long scans stay off the primary that
+handles reviews.
+
+Reads stay on the primary for the user's own changes. ``ReplicaMiddleware``
+watches each request's queries on the primary. When one writes, the
+response sets a cookie that pins the user's next REPLICA_STICKY_SECONDS of
+requests to the primary, and the rest of that request is pinned too. A
+user who has just approved an application therefore never sees a report
+from a replica that has not caught up. Outside a request (the job worker)
+nothing is watched: only wrap reads that do not depend on the job's own
+writes in ``use_replica()``.
+"""
+
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+REPLICA_ALIAS = 'replica'
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+PIN_COOKIE = 'pin_primary'
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+WRITTEN_TABLE = re.compile(r'^(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?([\w.]+)"?', re.IGNORECASE)
+# The database cache (settings.CACHES) holds version stamps bumped moments
+# ago, which a lagging replica would hand back stale
+PRIMARY_APP_LABELS = {'django_cache'}
+# Writing a cache entry changes nothing a report reads, so it pins nobody
+UNWATCHED_TABLES = {
+    cache['LOCATION'] for cache in settings.CACHES.values() if cache['BACKEND'].endswith('.DatabaseCache')
+}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned = ContextVar('replica_pinned', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def reading_from_replica():
+    """Whether reads made here go to the replica (and so may lag the primary by up to STICKY_SECONDS)"""
+    return ReplicaRouter().db_for_read(None) == REPLICA_ALIAS
+
+
+@contextmanager
+def use_replica():
+    """Send the reads made inside the block to the replica, unless the request is pinned to the primary"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _streamed_from_replica(chunks, pinned):
+    # A streamed body (the CSV export) is produced after the view returns, so
+    # every chunk is read inside the view's routing context again
+    chunks = iter(chunks)
+    while True:
+        with use_replica():
+            token = _pinned.set(pinned)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                _pinned.reset(token)
+        yield chunk
+
+
+def replica_view(view_func):
+    """Run a read-only view (and any body it streams) with its reads on the replica"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with use_replica():
+            response = view_func(request, *args, **kwargs)
+        if getattr(response, 'streaming', False) and not getattr(response, 'is_async', False):
+            response.streaming_content = _streamed_from_replica(response.streaming_content, _pinned.get())
+        return response
+    return wrapper
+
+
+# ============================================
+# ROUTER
+# ============================================
+class ReplicaRouter:
+    """Reads inside ``use_replica()`` go to the replica; everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _pinned.get() or not replica_configured():
+            return None
+        if model is not None and model._meta.app_label in PRIMARY_APP_LABELS:
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        return db != REPLICA_ALIAS
+
+
+# ============================================
+# READ-YOUR-WRITES
+# ============================================
+class _WriteWatcher:
+    """Database execute wrapper that pins the rest of the request once it writes"""
+
+    def __init__(self):
+        self.wrote = False
+
+    def __call__(self, execute, sql, params, many, context):
+        statement = sql.lstrip()
+        if not self.wrote and statement[:6].upper() in WRITE_STATEMENTS:
+            table = WRITTEN_TABLE.match(statement)
+            if table is None or table.group(1) not in UNWATCHED_TABLES:
+                self.wrote = True
+                _pinned.set(True)
+        return execute(sql, params, many, context)
+
+
+class ReplicaMiddleware:
+    """Keep a user's reads on the primary for REPLICA_STICKY_SECONDS after they write"""
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        watcher = _WriteWatcher()
+        token = _pinned.set(bool(request.COOKIES.get(PIN_COOKIE)))
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(watcher):
+                response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+        if watcher.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,193 @@
+"""
+Cached faculty reports.
+
+``faculty_report_data(faculty, academic_year)`` computes the summary counts
+and application list behind the faculty report page. It needs one grouped
+count and one joined list query, and the result is cached for each faculty and
+year (either may be None, meaning "all").
+
+Each cached report is stamped with version tokens for the faculties and years
+it covers. When an application changes status, program or academic year, or
+is deleted (or its student's details change), only the tokens for the
+faculties it left or joined are bumped, after the transaction commits.
+Reports for every other faculty stay cached. The same tokens give the view
+its ETag. Reports and tokens live in the shared cache (settings.CACHES), so a
+bump made by the job worker or another web process is seen by all of them.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+
+from .counters import counter_key
+from .models import ApplicationStatusCounter, Faculty, Program, Student, TransferApplication
+from .replicas import STICKY_SECONDS, reading_from_replica
+
+
+REPORT_CACHE_TTL = getattr(settings, 'FACULTY_REPORT_CACHE_TTL', 60 * 60 * 24)
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+GENERATION_KEY = 'reports:faculty:generation'
+
+REPORT_COLUMNS = (
+    'id', 'application_date', 'student_id',
+    'student__user__first_name', 'student__user__last_name', 'student__admission_number',
+    'current_program__faculty__code', 'requested_program__faculty__code', 'status',
+)
+STATUS_LABELS = dict(TransferApplication.STATUS_CHOICES)
+
+
+def _version_key(faculty_id, academic_year):
+    return f'reports:faculty:version:{faculty_id or "all"}:{academic_year or "all"}'
+
+
+def report_versions(faculty_id, academic_year):
+    """Version tokens a (faculty, year) report depends on; they change whenever its data does"""
+    keys = [GENERATION_KEY, _version_key(faculty_id, academic_year)]
+    versions = cache.get_many(keys)
+    # A missing token (never bumped, expired or culled) starts afresh, so no stale report or ETag matches it
+    return [versions[key] if key in versions else cache.get_or_set(key, time.time_ns, VERSION_TIMEOUT) for key in keys]
+
+
+def academic_years():
+    """Academic years that have applications, newest first (read from the status counters)"""
+    years = ApplicationStatusCounter.objects.filter(count__gt=0).values_list('academic_year', flat=True).distinct()
+    return sorted(set(years), reverse=True)
+
+
+def report_etag(faculty_id, academic_year, *extra):
+    raw = '|'.join(str(part) for part in (faculty_id, academic_year, *report_versions(faculty_id, academic_year), *extra))
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def compute_faculty_report(faculty, academic_year=None):
+    applications = TransferApplication.objects.all()
+    if faculty is not None:
+        program_ids = list(Program.objects.filter(faculty=faculty).values_list('id', flat=True))
+        applications = applications.filter(
+            Q(current_program_id__in=program_ids) | Q(requested_program_id__in=program_ids)
+        )
+    if academic_year:
+        applications = applications.filter(academic_year=academic_year)
+
+    totals = dict(applications.order_by().values_list('status').annotate(total=Count('id')))
+
+    def count(word):
+        return sum(total for status, total in totals.items() if word in status)
+
+    rows = [
+        {
+            'id': pk,
+            'application_date': applied,
+            'student_id': student_id,
+            'student_name': f"{first_name or ''} {last_name or ''}".strip(),
+            'admission_number': admission_number,
+            'from_code': current_code,
+            'to_code': requested_code,
+            'status': status,
+            'status_display': STATUS_LABELS.get(status, status),
+        }
+        for (pk, applied, student_id, first_name, last_name, admission_number,
+             current_code, requested_code, status)
+        in applications.order_by('-application_date', '-id').values_list(*REPORT_COLUMNS)
+    ]
+    return {
+        'applications': rows,
+        'total': sum(totals.values()),
+        'pending': count('pending'),
+        'approved': count('approved'),
+        'rejected': count('rejected'),
+        'completed': totals.get('completed', 0),
+    }
+
+
+def faculty_report_data(faculty, academic_year=None):
+    """The faculty report, from the cache unless an application it covers has changed since"""
+    faculty_id = faculty.id if faculty is not None else None
+    versions = report_versions(faculty_id, academic_year)
+    key = f'reports:faculty:{faculty_id or "all"}:{academic_year or "all"}:' + ':'.join(map(str, versions))
+    data = cache.get(key)
+    if data is None:
+        data = compute_faculty_report(faculty, academic_year)
+        timeout = REPORT_CACHE_TTL
+        if reading_from_replica() and time.time_ns() - max(versions) < STICKY_SECONDS * 10 ** 9:
+            # Computed on a replica that may not have the latest change yet: keep it only briefly
+            timeout = STICKY_SECONDS
+        cache.set(key, data, timeout)
+    return data
+
+
+# ============================================
+# INVALIDATION
+# ============================================
+def invalidate_reports(faculty_ids, academic_years):
+    """Bump the versions of every report covering any of ``faculty_ids`` in any of ``academic_years``"""
+    stamp = time.time_ns()
+    faculties = set(faculty_ids) | {None}
+    years = set(academic_years) | {None}
+    cache.set_many({_version_key(f, y): stamp for f in faculties for y in years}, VERSION_TIMEOUT)
+
+
+def invalidate_for_counter_keys(old_key, new_key):
+    """
+    Invalidate the reports an application moving from ``old_key`` to
+    ``new_key`` affects (see counters.counter_key); either may be None.
+    Runs once the current transaction commits.
+    """
+    invalidate_for_moves([(old_key, new_key)])
+
+
+def invalidate_for_moves(moves):
+    """invalidate_for_counter_keys() for several (old_key, new_key) moves, with one lookup"""
+    keys = [key for old_key, new_key in moves if old_key != new_key for key in (old_key, new_key) if key is not None]
+    if not keys:
+        return
+    program_ids = {pk for key in keys for pk in key[:2] if pk is not None}
+    years = {key[2] for key in keys if key[2]}
+
+    def bump():
+        faculty_ids = set(Program.objects.filter(id__in=program_ids).values_list('faculty_id', flat=True))
+        invalidate_reports(faculty_ids, years)
+
+    transaction.on_commit(bump)
+
+
+def application_saved(sender, instance, created, **kwargs):
+    # TransferApplication.save() updates _counter_key only after post_save, so it still holds the old key
+    invalidate_for_counter_keys(None if created else getattr(instance, '_counter_key', None), counter_key(instance))
+
+
+def application_deleted(sender, instance, **kwargs):
+    invalidate_for_counter_keys(getattr(instance, '_counter_key', None) or counter_key(instance), None)
+
+
+def student_saved(sender, instance, **kwargs):
+    # Student names and admission numbers appear in the reports covering their applications
+    student_id = instance.pk
+
+    def bump():
+        rows = TransferApplication.objects.filter(student_id=student_id).values_list(
+            'current_program__faculty_id', 'requested_program__faculty_id', 'academic_year'
+        )
+        faculty_ids = {pk for current, requested, year in rows for pk in (current, requested) if pk is not None}
+        if faculty_ids:
+            invalidate_reports(faculty_ids, {year for current, requested, year in rows if year})
+
+    transaction.on_commit(bump)
+
+
+def invalidate_all_reports(sender, **kwargs):
+    # Faculty codes appear in every report
+    cache.set(GENERATION_KEY, time.time_ns(), VERSION_TIMEOUT)
+
+
+post_save.connect(application_saved, sender=TransferApplication, dispatch_uid='faculty_report_application_save')
+post_delete.connect(application_deleted, sender=TransferApplication, dispatch_uid='faculty_report_application_delete')
+post_save.connect(student_saved, sender=Student, dispatch_uid='faculty_report_student_save')
+for model in (Faculty, Program):
+    post_save.connect(invalidate_all_reports, sender=model, dispatch_uid=f'faculty_report_save_{model.__name__}')
+    post_delete.connect(invalidate_all_reports, sender=model, dispatch_uid=f'faculty_report_delete_{model.__name__}')
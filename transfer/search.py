@@ -0,0 +1,191 @@
+"""
+User, student and application search.
+
+Every user has a SearchEntry row holding their username, names, e-mail and
+admission number, lower-cased. It is rewritten whenever the User or Student
+is saved. Full-text matching runs against an index over that row:
+
+* PostgreSQL: GIN indexes on ``to_tsvector('simple', document)`` (word
+  prefixes) and on ``document gin_trgm_ops`` (any substring, via pg_trgm);
+* SQLite: the FTS5 table ``transfer_search_fts``, kept in sync by triggers.
+
+``search_filter(query, field)`` returns a Q that restricts any queryset to
+the matching users through ``field`` (the path to a user id), so the admin
+lists keep their own ordering, filters and pagination. ``autocomplete``
+answers prefix lookups on name, username and admission number from B-tree
+indexes.
+"""
+
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from .models import SearchEntry, Student
+
+
+FTS_TABLE = 'transfer_search_fts'
+BATCH_SIZE = 1000
+AUTOCOMPLETE_LIMIT = 10
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+# ============================================
+# INDEXING
+# ============================================
+def _entry(user_id, username, first_name, last_name, email, student=None):
+    student_id, admission_number = student or (None, '')
+    fields = {
+        'username': (username or '').lower(),
+        'first_name': (first_name or '').lower(),
+        'last_name': (last_name or '').lower(),
+        'admission_number': (admission_number or '').lower(),
+    }
+    document = ' '.join(filter(None, [*fields.values(), (email or '').lower()]))
+    return SearchEntry(user_id=user_id, student_id=student_id, document=document, **fields)
+
+
+def _index_batch(user_ids):
+    students = {
+        user_id: (pk, admission_number)
+        for pk, user_id, admission_number in Student.objects.filter(user_id__in=user_ids).values_list(
+            'id', 'user_id', 'admission_number'
+        )
+    }
+    rows = [
+        _entry(*values, student=students.get(values[0]))
+        for values in User.objects.filter(id__in=user_ids).values_list(
+            'id', 'username', 'first_name', 'last_name', 'email'
+        )
+    ]
+    SearchEntry.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['student', 'username', 'first_name', 'last_name', 'admission_number', 'document'],
+    )
+    return len(rows)
+
+
+def index_users(user_ids, batch_size=BATCH_SIZE):
+    """Create or refresh the search entries of ``user_ids``; returns how many were written"""
+    user_ids = list(user_ids)
+    return sum(
+        _index_batch(user_ids[start:start + batch_size]) for start in range(0, len(user_ids), batch_size)
+    )
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Re-index every user; returns how many entries were written"""
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = list(User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        indexed += _index_batch(ids)
+        last_id = ids[-1]
+    SearchEntry.objects.exclude(user_id__in=User.objects.values('id')).delete()
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return indexed
+
+
+def user_saved(sender, instance, **kwargs):
+    index_users([instance.pk])
+
+
+def student_saved(sender, instance, **kwargs):
+    index_users([instance.user_id])
+
+
+def student_deleted(sender, instance, origin=None, **kwargs):
+    # When the user is being deleted too (or a queryset of users), their entry goes with them
+    if isinstance(origin, User) and origin.pk == instance.user_id:
+        return
+    if isinstance(origin, QuerySet) and origin.model is User:
+        return
+    # Otherwise the user stays searchable without their admission number
+    index_users([instance.user_id])
+
+
+post_save.connect(user_saved, sender=User, dispatch_uid='search_user_save')
+post_save.connect(student_saved, sender=Student, dispatch_uid='search_student_save')
+post_delete.connect(student_deleted, sender=Student, dispatch_uid='search_student_delete')
+
+
+# ============================================
+# SEARCHING
+# ============================================
+def tokens(query):
+    return TOKEN.findall((query or '').lower())
+
+
+def matching_user_ids(query):
+    """
+    SQL (as a RawSQL expression) selecting the ids of users matching every
+    word of ``query`` as a prefix (PostgreSQL also matches any substring of
+    three or more characters). None if ``query`` has no words.
+    """
+    words = tokens(query)
+    if not words:
+        return None
+    if connection.vendor == 'postgresql':
+        sql = (
+            "SELECT user_id FROM transfer_searchentry "
+            "WHERE to_tsvector('simple', document) @@ to_tsquery('simple', %s)"
+        )
+        params = [' & '.join(f'{word}:*' for word in words)]
+        substring = query.strip().lower()
+        if len(substring) >= 3:
+            escaped = substring.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            sql += " OR document LIKE %s"
+            params.append(f'%{escaped}%')
+        return RawSQL(sql, params)
+    if connection.vendor == 'sqlite':
+        expression = ' '.join(f'"{word}"*' for word in words)
+        return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression])
+    # Any other database: no full-text index, but still one indexed table instead of joins
+    condition = Q()
+    for word in words:
+        condition &= Q(document__contains=word)
+    return SearchEntry.objects.filter(condition).values('user_id')
+
+
+def search_filter(query, field='id'):
+    """Q restricting a queryset to rows whose ``field`` (a user id path) belongs to a user matching ``query``"""
+    user_ids = matching_user_ids(query)
+    if user_ids is None:
+        # Nothing searchable, e.g. only punctuation: match nothing rather than everything
+        return Q(pk__in=[])
+    return Q(**{f'{field}__in': user_ids})
+
+
+def autocomplete(query, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Users whose first name, last name, username or admission number starts
+    with the first word of ``query`` (later words must appear anywhere), as
+    dicts for the admin search box.
+    """
+    words = tokens(query)
+    if not words:
+        return []
+    prefix, rest = words[0], words[1:]
+    condition = Q()
+    for column in ('username', 'first_name', 'last_name', 'admission_number'):
+        # LIKE 'prefix%', which PostgreSQL answers from the varchar_pattern_ops indexes (columns are lower-cased)
+        condition |= Q(**{f'{column}__startswith': prefix})
+    entries = SearchEntry.objects.filter(condition)
+    for word in rest:
+        entries = entries.filter(document__contains=word)
+    return list(
+        entries.order_by('username').values(
+            'user_id', 'student_id', 'user__username', 'user__first_name', 'user__last_name',
+            'student__admission_number',
+        )[:limit]
+    )
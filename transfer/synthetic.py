@@ -0,0 +1,231 @@
+"""
+Synthetic data for query-plan checks and benchmarks.
+
+``generate()`` bulk-inserts a realistic spread of faculties, programs,
+reviewer accounts, students (with their users, profiles and KCSE results),
+transfer applications across every status and academic year, and
+notifications, then rebuilds the status counters, eligibility scores and
+search index. Everything is created with ``bulk_create`` in batches, so tens of
+thousands of rows take seconds rather than minutes. Usernames carry a prefix
+so a second run adds new students instead of colliding with the first.
+"""
+
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import counters, eligibility, search
+from .analytics import SNAPSHOT_CACHE_KEY
+from .models import AWAITING_REVIEW_STATUSES, Faculty, KCSE_Result, Notification, Profile, Program, Student, TransferApplication, kcse_grade_points
+
+
+BATCH_SIZE = 1000
+PROGRAMS_PER_FACULTY = 4
+ACADEMIC_YEARS = ['2023/2024', '2024/2025', '2025/2026']
+
+# Roughly how a live system's applications are spread across the workflow
+STATUS_WEIGHTS = {
+    'pending_hod': 20,
+    'hod_approved': 10,
+    'hod_rejected': 8,
+    'dean_approved': 8,
+    'dean_rejected': 6,
+    'registrar_rejected': 4,
+    'completed': 44,
+}
+
+KCSE_SUBJECTS = [
+    'English', 'Kiswahili', 'Mathematics', 'Biology', 'Chemistry', 'Physics',
+    'History', 'Geography', 'CRE', 'Business Studies', 'Computer Studies', 'Agriculture',
+]
+KCSE_GRADES = ['A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D+']
+
+FIRST_NAMES = ['Achieng', 'Brian', 'Chebet', 'David', 'Esther', 'Faith', 'George', 'Halima', 'Ian', 'Jane']
+LAST_NAMES = ['Kamau', 'Mutua', 'Njeri', 'Odhiambo', 'Otieno', 'Wanjiru', 'Kiprop', 'Achieng', 'Mwangi', 'Wafula']
+
+
+def ensure_structure(faculties=None, programs_per_faculty=PROGRAMS_PER_FACULTY):
+    """
+    ``faculties`` faculties (default: one per Faculty.FACULTY_CHOICES entry), each
+    with ``programs_per_faculty`` programs; existing rows are reused.
+    """
+    codes = [code for code, label in Faculty.FACULTY_CHOICES]
+    count = len(codes) if faculties is None else faculties
+    codes = (codes + [f'FAC{n:02d}' for n in range(len(codes) + 1, count + 1)])[:count]
+
+    faculty_rows = []
+    for code in codes:
+        faculty, _ = Faculty.objects.get_or_create(name=code, defaults={'code': code})
+        faculty_rows.append(faculty)
+
+    programs = {}
+    for faculty in faculty_rows:
+        existing = list(Program.objects.filter(faculty=faculty).order_by('id'))
+        missing = [
+            Program(name=f'{faculty.name} Program {n}', faculty=faculty)
+            for n in range(len(existing) + 1, programs_per_faculty + 1)
+        ]
+        Program.objects.bulk_create(missing)
+        programs[faculty.id] = list(Program.objects.filter(faculty=faculty).order_by('id'))
+    return faculty_rows, programs
+
+
+def staff_usernames(faculties, prefix='synthetic'):
+    """{username: (user_type, faculty)} for the reviewer and admin accounts ``ensure_staff`` creates"""
+    wanted = {
+        f'{prefix}_hod': ('hod', None),
+        f'{prefix}_registrar': ('registrar', None),
+        f'{prefix}_admin': ('admin', None),
+    }
+    for faculty in faculties:
+        wanted[f'{prefix}_dean_{faculty.name.lower()}'] = ('dean', faculty)
+    return wanted
+
+
+def ensure_staff(faculties, prefix='synthetic', password='password'):
+    """A university HOD, a dean per faculty, a registrar and a staff admin, created if missing"""
+    hashed = make_password(password)
+    staff = []
+    for username, (user_type, faculty) in staff_usernames(faculties, prefix).items():
+        is_admin = user_type == 'admin'
+        user, created = User.objects.get_or_create(
+            username=username,
+            defaults={'password': hashed, 'is_staff': is_admin, 'is_superuser': is_admin},
+        )
+        if created:
+            Profile.objects.create(user=user, user_type=user_type, faculty=faculty)
+        staff.append(user)
+    return staff
+
+
+def generate(students=1000, faculties=None, programs_per_faculty=PROGRAMS_PER_FACULTY, kcse_subjects=7,
+             notifications_per_user=5, prefix='synthetic', seed=0, password='password'):
+    """
+    Create ``students`` students, each with KCSE results, one transfer
+    application and some notifications; returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    hashed = make_password(password)
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+
+    with transaction.atomic():
+        faculties, programs = ensure_structure(faculties, programs_per_faculty)
+        staff = ensure_staff(faculties, prefix, password)
+        offset = User.objects.filter(username__startswith=f'{prefix}_s').count()
+        last_user_id = User.objects.aggregate(last=Max('id'))['last'] or 0
+        last_student_id = Student.objects.aggregate(last=Max('id'))['last'] or 0
+
+        users = [
+            User(
+                username=f'{prefix}_s{offset + n}',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'{prefix}_s{offset + n}@example.com',
+                password=hashed,
+                date_joined=now - timedelta(minutes=rng.randrange(0, 60 * 24 * 720)),
+            )
+            for n in range(students)
+        ]
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        # bulk_create only returns primary keys on backends that support RETURNING
+        users = list(User.objects.filter(id__gt=last_user_id, username__startswith=f'{prefix}_s').order_by('id'))
+
+        home_faculties = [rng.choice(faculties) for _ in users]
+        Profile.objects.bulk_create(
+            [Profile(user=user, user_type='student', faculty=faculty) for user, faculty in zip(users, home_faculties)],
+            batch_size=BATCH_SIZE,
+        )
+        Student.objects.bulk_create(
+            [
+                Student(
+                    user=user,
+                    admission_number=f'{prefix[:4].upper()}/{offset + n:07d}',
+                    current_program=rng.choice(programs[faculty.id]),
+                    current_year=rng.randint(1, 4),
+                    phone='0700000000',
+                    mean_grade=rng.choice(KCSE_GRADES[:6]),
+                    cluster_weight=round(rng.uniform(25, 46), 3),
+                    university_cutoff=round(rng.uniform(28, 40), 3),
+                )
+                for n, (user, faculty) in enumerate(zip(users, home_faculties))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        student_rows = list(Student.objects.filter(id__gt=last_student_id).order_by('id'))
+
+        results = [
+            KCSE_Result(student=student, subject=subject, grade=grade, points=kcse_grade_points(grade))
+            for student in student_rows
+            for subject in rng.sample(KCSE_SUBJECTS, min(kcse_subjects, len(KCSE_SUBJECTS)))
+            for grade in [rng.choice(KCSE_GRADES)]
+        ]
+        KCSE_Result.objects.bulk_create(results, batch_size=BATCH_SIZE)
+
+        program_faculty = {program.id: faculty_id for faculty_id, group in programs.items() for program in group}
+        applications = []
+        for student in student_rows:
+            current_faculty = program_faculty[student.current_program_id]
+            target = rng.choice([f for f in faculties if f.id != current_faculty] or faculties)
+            applications.append(TransferApplication(
+                student=student,
+                current_program_id=student.current_program_id,
+                requested_program=rng.choice(programs[target.id]),
+                reason='Synthetic application',
+                academic_year=rng.choice(ACADEMIC_YEARS),
+                semester=rng.randint(1, 2),
+                status=rng.choices(statuses, weights)[0],
+            ))
+        TransferApplication.objects.bulk_create(applications, batch_size=BATCH_SIZE)
+
+        # auto_now / auto_now_add stamp every row with "now"; spread them out for realistic ordering
+        applications = list(
+            TransferApplication.objects.filter(student_id__gt=last_student_id).only('id').order_by('student_id')
+        )
+        for application in applications:
+            submitted = now - timedelta(minutes=rng.randrange(0, 60 * 24 * 720))
+            application.application_date = submitted
+            application.last_updated = submitted + timedelta(minutes=rng.randrange(0, 60 * 24 * 30))
+        TransferApplication.objects.bulk_update(
+            applications, ['application_date', 'last_updated'], batch_size=BATCH_SIZE
+        )
+
+        notifications = []
+        for user, application in zip(users, applications):
+            for n in range(notifications_per_user):
+                notifications.append(Notification(
+                    user=user,
+                    message=f'Synthetic notification {n + 1}',
+                    is_read=n > 0,
+                    application_id=application.id,
+                ))
+        for user in staff:
+            for application in rng.sample(applications, min(notifications_per_user * 10, len(applications))):
+                notifications.append(Notification(
+                    user=user, message='Synthetic reviewer notification', is_read=rng.random() < 0.8,
+                    application_id=application.id,
+                ))
+        Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+
+        # bulk_create bypasses save(), which maintains the counters, scores and search index
+        search.index_users(user.id for user in users)
+        counters.rebuild()
+        eligibility.score_applications(
+            TransferApplication.objects.filter(student_id__gt=last_student_id, status__in=AWAITING_REVIEW_STATUSES)
+        )
+        cache.delete(SNAPSHOT_CACHE_KEY)
+
+    return {
+        'users': len(users),
+        'students': len(student_rows),
+        'kcse_results': len(results),
+        'applications': len(applications),
+        'notifications': len(notifications),
+    }
@@ -0,0 +1,245 @@
+"""
+Background jobs for the transfer workflow.
+
+Status changes are applied by ``workflow.apply_transition``, which queues
+``application_status_changed``; everything that fans out from it
+(notifications, e-mail) runs in the job worker instead of the request. PDF
+reports are rendered, and uploaded files validated and thumbnailed, here too.
+"""
+
+import logging
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.mail import send_mass_mail
+from django.db import transaction
+
+from .exports import (
+    applications_for_profile, filter_applications, pdf_report_title, prune_pdf_reports,
+    set_pdf_report_state, write_applications_pdf,
+)
+from .eligibility import rescore_program
+from .jobs import enqueue, job
+from . import uploads
+from .models import Notification, Profile, TransferApplication, Upload
+from .notifications import notify_many
+from .replicas import use_replica
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Recipients:
+    """First user of each profile type/faculty, looked up once per job however many applications it covers"""
+
+    def __init__(self):
+        self._users = {}
+
+    def first(self, user_type, faculty_id=None):
+        key = (user_type, faculty_id)
+        if key not in self._users:
+            profiles = Profile.objects.select_related('user').filter(user_type=user_type)
+            if user_type != 'registrar':
+                profiles = profiles.filter(faculty_id=faculty_id)
+            profile = profiles.first()
+            self._users[key] = profile.user if profile else None
+        return self._users[key]
+
+
+def _status_notes(application, status, comment, override, recipients):
+    """The notifications for ``application`` moving to ``status``"""
+    student_user = application.student.user
+    full_name = student_user.get_full_name()
+    requested_program = application.requested_program
+    requested_faculty = requested_program.faculty if requested_program else None
+    notes = []
+
+    def note(user, message):
+        if user is not None:
+            notes.append(Notification(user=user, message=message, application=application))
+
+    if override:
+        label = dict(TransferApplication.STATUS_CHOICES).get(status, status)
+        note(student_user, f'Admin updated your application status to: {label}. Comment: {comment}')
+
+    elif status == 'pending_hod':
+        # Notify HOD (University HOD - no faculty)
+        current_name = application.current_program.name if application.current_program else ''
+        requested_name = requested_program.name if requested_program else ''
+        note(
+            recipients.first('hod'),
+            f"New transfer application from {full_name} - {current_name} to {requested_name}",
+        )
+
+    elif status == 'hod_approved':
+        note(student_user, 'Your transfer application has been approved by HOD.')
+        if requested_faculty:
+            note(
+                recipients.first('dean', requested_faculty.id),
+                f'New transfer application pending for {requested_faculty.name} from {full_name}',
+            )
+
+    elif status == 'hod_rejected':
+        note(student_user, f'Your transfer application has been rejected by HOD. Reason: {comment}')
+
+    elif status == 'dean_approved':
+        faculty_name = requested_faculty.name if requested_faculty else ''
+        note(
+            student_user,
+            f'Your transfer application has been approved by the Dean of {faculty_name}. Sent to Registrar for final approval.',
+        )
+        note(
+            recipients.first('registrar'),
+            f'New application from {full_name} approved by Dean. Pending your review.',
+        )
+
+    elif status == 'dean_rejected':
+        note(student_user, f'Your transfer application has been rejected by the Dean. Reason: {comment}')
+
+    elif status == 'completed':
+        # The student's program and admission number were updated with the status
+        new_admission = application.new_admission_number
+        note(
+            student_user,
+            f'✅ Your transfer has been approved! New admission number: {new_admission}. '
+            f'You are now in {requested_program.name if requested_program else ""}.',
+        )
+        if requested_faculty:
+            note(
+                recipients.first('hod', requested_faculty.id),
+                f'Student {full_name} has transferred to your faculty. New admission: {new_admission}',
+            )
+            note(
+                recipients.first('dean', requested_faculty.id),
+                f'Student {full_name} has been approved by Registrar and joined your faculty.',
+            )
+
+    elif status == 'registrar_rejected':
+        note(
+            student_user,
+            f'❌ Your transfer application has been rejected by the Registrar. Reason: {comment}',
+        )
+
+    return notes
+
+
+@job('application_status_changed', bind=True)
+def application_status_changed(application_id=None, status='', comment='', override=False, application_ids=(),
+                               job_id=None):
+    """
+    Notify everyone affected by the applications moving to ``status``; an
+    admin ``override`` only tells the student. Bulk reviews pass
+    ``application_ids``: their notifications are created with one INSERT,
+    each faculty's dean is looked up once and the e-mails go out as one job.
+
+    Safe to run again: a job whose worker died after committing is claimed a
+    second time. Its notifications carry ``job_id`` and commit together with
+    the e-mail job, so an application this job has already notified about is
+    skipped. Other jobs for the same application (its later transitions) are
+    unaffected, however late this one runs.
+    """
+    ids = list(application_ids) + ([application_id] if application_id is not None else [])
+    # Locked so a second run of the same job waits for this one's notifications
+    applications = TransferApplication.objects.select_related(
+        'student__user', 'current_program', 'requested_program__faculty'
+    ).filter(id__in=ids).order_by('id').select_for_update(of=('self',))
+    applications = list(applications)
+    notified = set()
+    if job_id is not None:
+        notified = set(
+            Notification.objects.filter(
+                job_id=job_id, application_id__in=[application.id for application in applications],
+            ).values_list('application_id', flat=True)
+        )
+
+    recipients = _Recipients()
+    notes = []
+    emails = []
+    for application in applications:
+        if application.id in notified:
+            continue
+        for note in _status_notes(application, status, comment, override, recipients):
+            note.job_id = job_id
+            notes.append(note)
+        if application.student.user.email and status != 'pending_hod':
+            emails.append(application.id)
+
+    if notes:
+        notify_many(notes)
+    if emails:
+        enqueue('send_status_email', application_ids=emails, status=status)
+
+
+@job('send_status_email')
+def send_status_email(application_id=None, status='', application_ids=()):
+    ids = list(application_ids) + ([application_id] if application_id is not None else [])
+    label = dict(TransferApplication.STATUS_CHOICES).get(status, status)
+    users = [
+        application.student.user
+        for application in TransferApplication.objects.select_related('student__user').filter(id__in=ids).order_by('id')
+    ]
+    # One SMTP connection for the whole batch
+    send_mass_mail(
+        (
+            (
+                f'Transfer application update: {label}',
+                f'Dear {user.get_full_name() or user.username},\n\n'
+                f'Your inter-faculty transfer application is now: {label}.\n'
+                f'Sign in to your dashboard for details.',
+                None,
+                [user.email],
+            )
+            for user in users if user.email
+        ),
+    )
+
+
+@job('rescore_program_eligibility')
+def rescore_program_eligibility(program_id):
+    """Rescore the open applications for a program whose cutoff or subject requirements changed"""
+    rescore_program(program_id)
+
+
+@job('process_upload')
+def process_upload(upload_id):
+    """Validate a newly stored upload and generate its thumbnail"""
+    upload = Upload.objects.filter(pk=upload_id).first()
+    if upload is not None:
+        uploads.process_upload(upload)
+
+
+@job('render_pdf_report')
+def render_pdf_report(key, user_id, filters):
+    """
+    Render the PDF report ``key`` for ``user_id`` into default_storage and mark it ready.
+
+    A failure is recorded rather than retried: the state is written in the
+    job's transaction, which a raised error would roll back, and the report
+    page offers to request the report again.
+    """
+    try:
+        # A savepoint, so a failed query leaves the job's transaction usable for the state
+        with transaction.atomic():
+            user = User.objects.get(pk=user_id)
+            profile = Profile.objects.select_related('faculty').get(user=user)
+            applications = applications_for_profile(profile, user)
+            if applications is None:
+                set_pdf_report_state(key, 'failed', error='Access denied.')
+                return
+            applications = filter_applications(applications, filters)
+
+            name = f'reports/{key}.pdf'
+            with tempfile.TemporaryFile() as output, use_replica():
+                pages = write_applications_pdf(applications, pdf_report_title(profile, user), output)
+                output.seek(0)
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                name = default_storage.save(name, File(output, name=f'{key}.pdf'))
+    except Exception:
+        logger.exception("Rendering PDF report %s failed", key)
+        set_pdf_report_state(key, 'failed', error='The report could not be generated.')
+        return
+    set_pdf_report_state(key, 'ready', name=name, pages=pages)
+    prune_pdf_reports()
@@ -0,0 +1,38 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from transfer import images
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_srcset(source, fmt='jpeg'):
+    """``srcset`` value listing every resized variant of ``source`` in ``fmt`` ('webp' or 'jpeg')"""
+    return images.srcset(source, fmt)
+
+
+@register.simple_tag
+def responsive_image(source, sizes='100vw', alt='', **attrs):
+    """
+    A <picture> for a media image (a FieldFile or a name such as
+    'deans/scit.png') offering WebP and JPEG variants at every fixed width;
+    the browser picks the smallest that fills ``sizes``. Extra keyword
+    arguments become <img> attributes, e.g. ``class="dean-avatar"``.
+    Images that cannot be resized fall back to a plain <img>.
+
+        {% responsive_image user.profile.profile_pic sizes="60px" alt="Dean" class="rounded-circle" %}
+    """
+    extra = format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items()))
+    webp = images.srcset(source, 'webp')
+    jpeg = images.srcset(source, 'jpeg')
+    if not webp:
+        url = getattr(source, 'url', None) or images.media_url(source)
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', url, alt, extra)
+    fallback = jpeg.split(', ')[-1].rsplit(' ', 1)[0]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy" decoding="async"{}></picture>',
+        webp, sizes, fallback, jpeg, sizes, alt, extra,
+    )
@@ -1,3 +1,599 @@
-from django.test import TestCase
+"""
+Tests for the transfer app.
 
-# Create your tests here.
+Read replica routing (transfer/replicas.py): under test the replica is a
+separate database (see DATABASE_REPLICA_URL in settings). The router keeps
+migrations off it, so these tests create its tables, copy the primary's rows
+into it and then change the replica's copy: a page showing the replica's
+version was read from the replica.
+"""
+
+import json
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import counters, jobs, query_plans, synthetic, uploads
+from .eligibility import INELIGIBLE_PENALTY, score, score_applications
+from .models import (
+    UNRANKED, ApplicationStatusCounter, Faculty, Job, KCSE_Result, Notification, Profile, Program, Student,
+    TransferApplication, Upload,
+)
+from .notifications import notify, notify_many, take_unread, unread_count
+from .replicas import PIN_COOKIE, REPLICA_ALIAS, ReplicaMiddleware, reading_from_replica, use_replica
+from .workflow import TransitionError, queue_status_notifications, review, review_many
+
+
+REPLICATED_MODELS = (User, Faculty, Program, Profile, Student, TransferApplication, ApplicationStatusCounter)
+PRIMARY_ADMISSION = 'SCIT/001/2024'
+REPLICA_ADMISSION = 'REPLICA/001/2024'
+
+
+def create_replica_schema():
+    """Create the tables missing from the test replica; must run outside any transaction"""
+    connection = connections[REPLICA_ALIAS]
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in apps.get_models():
+            if model._meta.managed and not model._meta.proxy and model._meta.db_table not in existing:
+                editor.create_model(model)
+
+
+def touched(queries, table):
+    return [query['sql'] for query in queries.captured_queries if table in query['sql']]
+
+
+class ReplicaRoutingTests(TestCase):
+    databases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        create_replica_schema()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        computing = Faculty.objects.create(name='Computing', code='SCIT')
+        science = Faculty.objects.create(name='Science', code='SOS')
+        current = Program.objects.create(name='Computer Science', faculty=computing)
+        requested = Program.objects.create(name='Physics', faculty=science)
+
+        cls.registrar = User.objects.create_user('registrar', password='pw')
+        Profile.objects.create(user=cls.registrar, user_type='registrar')
+        student_user = User.objects.create_user('student', first_name='Amina', password='pw')
+        Profile.objects.create(user=student_user, user_type='student', faculty=computing)
+        student = Student.objects.create(
+            user=student_user, admission_number=PRIMARY_ADMISSION, current_program=current, current_year=2, phone='0700',
+        )
+        TransferApplication.objects.create(
+            student=student, current_program=current, requested_program=requested,
+            reason='Interest', academic_year='2025/2026', semester=1,
+        )
+
+        # "Replicate", then let the replica's copy differ from the primary
+        for model in REPLICATED_MODELS:
+            model.objects.using(REPLICA_ALIAS).bulk_create(model.objects.using(DEFAULT_DB_ALIAS).all())
+        Student.objects.using(REPLICA_ALIAS).update(admission_number=REPLICA_ADMISSION)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.registrar)
+
+    def get(self, url):
+        """Response to ``url`` with its streamed body read, and the queries each database ran for it"""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = self.client.get(url)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body.decode(), primary, replica
+
+    def test_report_reads_go_to_the_replica(self):
+        for url in (reverse('report_dashboard'), reverse('faculty_report', args=['SCIT'])):
+            with self.subTest(url=url):
+                response, body, primary, replica = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(replica.captured_queries)
+                self.assertEqual(touched(primary, 'transfer_transferapplication'), [])
+                self.assertEqual(touched(primary, 'transfer_applicationstatuscounter'), [])
+
+        self.assertIn(REPLICA_ADMISSION, body)
+
+    def test_streamed_csv_is_read_from_the_replica(self):
+        response = self.client.get(reverse('export_applications_csv'))
+        self.assertTrue(response.streaming)
+
+        # The rows are read while the body streams, after the view has returned
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertIn(REPLICA_ADMISSION, body)
+        self.assertNotIn(PRIMARY_ADMISSION, body)
+        self.assertTrue(touched(replica, 'transfer_transferapplication'))
+        self.assertEqual(touched(primary, 'transfer_transferapplication'), [])
+
+    def test_write_pins_the_rest_of_the_request_and_sets_the_cookie(self):
+        routed = []
+
+        def view(request):
+            with use_replica():
+                routed.append(reading_from_replica())
+                Notification.objects.create(user=self.registrar, message='Saved')
+                routed.append(reading_from_replica())
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(RequestFactory().post('/'))
+
+        self.assertEqual(routed, [True, False])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(response.cookies[PIN_COOKIE]['httponly'])
+
+    def test_read_only_request_sets_no_cookie(self):
+        response, body, primary, replica = self.get(reverse('report_dashboard'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_pin_cookie_keeps_reads_on_the_primary(self):
+        self.client.cookies[PIN_COOKIE] = '1'
+        response, body, primary, replica = self.get(reverse('export_applications_csv'))
+
+        self.assertIn(PRIMARY_ADMISSION, body)
+        self.assertEqual(replica.captured_queries, [])
+
+
+def create_staff(username, user_type, faculty=None):
+    user = User.objects.create_user(username, password='pw')
+    Profile.objects.create(user=user, user_type=user_type, faculty=faculty)
+    return user
+
+
+class UniversityTestCase(TestCase):
+    """Two faculties with a program each, their reviewers and a student of Computer Science"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.computing = Faculty.objects.create(name='Computing', code='SCIT')
+        cls.science = Faculty.objects.create(name='Science', code='SOS')
+        cls.computer_science = Program.objects.create(name='Computer Science', faculty=cls.computing)
+        cls.physics = Program.objects.create(name='Physics', faculty=cls.science)
+
+        cls.hod = create_staff('hod', 'hod')
+        cls.science_hod = create_staff('science_hod', 'hod', cls.science)
+        cls.science_dean = create_staff('science_dean', 'dean', cls.science)
+        cls.registrar = create_staff('registrar', 'registrar')
+
+        cls.student = cls.create_student('student', 'Amina', 'SCIT/001/2024')
+
+    @classmethod
+    def create_student(cls, username, first_name, admission_number):
+        user = User.objects.create_user(username, first_name=first_name, email=f'{username}@example.com', password='pw')
+        Profile.objects.create(user=user, user_type='student', faculty=cls.computing)
+        return Student.objects.create(
+            user=user, admission_number=admission_number, current_program=cls.computer_science,
+            current_year=2, phone='0700',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def apply(self, student=None, **fields):
+        return TransferApplication.objects.create(**{
+            'student': student or self.student, 'current_program': self.computer_science,
+            'requested_program': self.physics, 'reason': 'Interest', 'academic_year': '2025/2026', 'semester': 1,
+            **fields,
+        })
+
+    def counter(self, status, count=1):
+        """The stored counters when ``count`` Computing to Science applications are in ``status``"""
+        return {(self.computing.id, self.science.id, '2025/2026', status): count}
+
+    def messages(self, user):
+        return list(Notification.objects.filter(user=user).order_by('id').values_list('message', flat=True))
+
+
+class StatusNotificationTests(UniversityTestCase):
+
+    def test_late_worker_notifies_every_transition(self):
+        application = self.apply()
+        queue_status_notifications(application)
+        review(application, 'hod', 'approve')
+        review(application, 'dean', 'approve')
+        review(application, 'registrar', 'approve', new_admission_number='SOS/001/2024')
+
+        # One worker run, after the application has already reached "completed"
+        jobs.run_pending()
+
+        student = self.student.user
+        self.assertEqual(len(self.messages(student)), 3)
+        self.assertIn('approved by HOD', self.messages(student)[0])
+        self.assertIn('approved by the Dean of Science', self.messages(student)[1])
+        self.assertIn('New admission number: SOS/001/2024', self.messages(student)[2])
+        self.assertEqual(len(self.messages(self.hod)), 1)
+        self.assertEqual(len(self.messages(self.science_dean)), 2)
+        self.assertEqual(len(self.messages(self.science_hod)), 1)
+        self.assertEqual(len(self.messages(self.registrar)), 1)
+
+        # Then the e-mail jobs that run queued
+        jobs.run_pending()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_rerun_of_a_committed_job_does_not_notify_again(self):
+        application = self.apply()
+        review(application, 'hod', 'approve')
+        jobs.run_pending()
+        notifications = Notification.objects.count()
+
+        # A worker that died after committing leaves the job to be claimed again
+        Job.objects.filter(name='application_status_changed').update(status='queued')
+        jobs.run_pending()
+
+        self.assertEqual(Notification.objects.count(), notifications)
+        self.assertEqual(Job.objects.filter(name='send_status_email').count(), 1)
+
+
+class StatusCounterTests(UniversityTestCase):
+
+    def assertCountersMatch(self):
+        self.assertEqual(counters.stored_counters(), counters.expected_counters())
+
+    def test_application_form_counts_posted_program_by_faculty(self):
+        self.client.force_login(self.student.user)
+        response = self.client.post(reverse('student_application_form'), {
+            'requested_program': str(self.physics.id), 'reason': 'Interest',
+            'academic_year': '2025/2026', 'semester': '1',
+        })
+        self.assertRedirects(response, reverse('student_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(counters.stored_counters(), self.counter('pending_hod'))
+
+        application = TransferApplication.objects.get()
+        review(application, 'hod', 'approve')
+        review(application, 'dean', 'approve')
+        review(application, 'registrar', 'approve', new_admission_number='SOS/001/2024')
+        self.assertEqual(counters.stored_counters(), self.counter('completed'))
+
+    def test_moving_a_program_to_another_faculty_recounts(self):
+        self.apply()
+        engineering = Faculty.objects.create(name='Engineering', code='SEE')
+        admin = User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.force_login(admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('admin_program_edit', args=[self.physics.id]),
+                {'name': 'Physics', 'faculty': str(engineering.id)},
+            )
+
+        self.assertEqual(
+            counters.stored_counters(), {(self.computing.id, engineering.id, '2025/2026', 'pending_hod'): 1},
+        )
+        self.assertCountersMatch()
+
+    def test_renaming_a_program_does_not_recount(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.physics.name = 'Applied Physics'
+            self.physics.save()
+        self.assertNotIn(counters.rebuild, callbacks)
+
+
+class UnreadCountTests(UniversityTestCase):
+
+    def count(self, user):
+        """``user``'s unread count, and whether reading it counted the notifications table"""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            count = unread_count(user)
+        return count, bool(touched(queries, 'transfer_notification'))
+
+    def test_count_is_kept_in_the_cache(self):
+        notify(self.hod, 'First')
+        self.assertEqual(self.count(self.hod), (1, True))
+        self.assertEqual(self.count(self.hod), (1, False))
+
+        notify(self.hod, 'Second')
+        notify_many([Notification(user=self.hod, message='Third'), Notification(user=self.registrar, message='Other')])
+        self.assertEqual(self.count(self.hod), (3, False))
+
+        self.assertEqual(len(take_unread(self.hod)), 3)
+        self.assertEqual(self.count(self.hod), (0, False))
+        self.assertEqual(self.count(self.registrar), (1, True))
+
+    def test_missing_count_is_recounted(self):
+        notify(self.hod, 'First')
+        self.assertEqual(self.count(self.hod), (1, True))
+        cache.clear()
+        notify(self.hod, 'Second')
+        self.assertEqual(self.count(self.hod), (2, True))
+
+
+class TransitionTests(UniversityTestCase):
+
+    def status_jobs(self):
+        return list(Job.objects.filter(name='application_status_changed').values_list('payload', flat=True))
+
+    def test_transition_moves_the_counter_and_queues_notifications(self):
+        application = self.apply()
+        review(application, 'hod', 'approve', comment='Strong case')
+
+        application.refresh_from_db()
+        self.assertEqual((application.status, application.hod_comment), ('hod_approved', 'Strong case'))
+        self.assertEqual(counters.stored_counters(), self.counter('hod_approved'))
+        self.assertEqual(self.status_jobs(), [{
+            'application_id': application.id, 'status': 'hod_approved', 'comment': 'Strong case', 'override': False,
+        }])
+
+        jobs.run_pending()
+        self.assertEqual(self.messages(self.student.user), ['Your transfer application has been approved by HOD.'])
+        self.assertEqual(len(self.messages(self.science_dean)), 1)
+
+    def test_lost_race_writes_nothing(self):
+        application = self.apply()
+        stale = TransferApplication.objects.get(pk=application.pk)
+        review(application, 'hod', 'approve')
+
+        # A second HOD acting on the page they loaded before the approval
+        with self.assertRaises(TransitionError):
+            review(stale, 'hod', 'reject', comment='Too late')
+
+        application.refresh_from_db()
+        self.assertEqual((application.status, application.hod_comment), ('hod_approved', ''))
+        self.assertEqual(counters.stored_counters(), self.counter('hod_approved'))
+        self.assertEqual([job['status'] for job in self.status_jobs()], ['hod_approved'])
+
+    def test_completion_updates_the_student_with_the_status(self):
+        application = self.apply(status='dean_approved')
+        review(application, 'registrar', 'approve', new_admission_number='SOS/001/2024')
+
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.current_program, self.physics)
+        self.assertEqual(self.student.admission_number, 'SOS/001/2024')
+        self.assertEqual(counters.stored_counters(), self.counter('completed'))
+
+    def test_taken_admission_number_rolls_the_transition_back(self):
+        self.create_student('other', 'Brian', 'SOS/001/2024')
+        application = self.apply(status='dean_approved')
+
+        with self.assertRaises(TransitionError):
+            review(application, 'registrar', 'approve', new_admission_number='SOS/001/2024')
+
+        application.refresh_from_db()
+        self.assertEqual(application.status, 'dean_approved')
+        self.assertEqual(counters.stored_counters(), self.counter('dean_approved'))
+        self.assertEqual(self.status_jobs(), [])
+
+    def test_review_from_the_wrong_status_is_refused(self):
+        application = self.apply(status='hod_rejected')
+        with self.assertRaises(TransitionError):
+            review(application, 'dean', 'approve')
+        self.assertEqual(self.status_jobs(), [])
+
+
+class BulkReviewTests(UniversityTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pending = [
+            self.apply(),
+            self.apply(self.create_student('brian', 'Brian', 'SCIT/002/2024')),
+        ]
+        self.rejected = self.apply(self.create_student('chege', 'Chege', 'SCIT/003/2024'), status='hod_rejected')
+        self.with_dean = self.apply(self.create_student('dalia', 'Dalia', 'SCIT/004/2024'), status='hod_approved')
+
+    def statuses(self):
+        return dict(TransferApplication.objects.values_list('id', 'status'))
+
+    def test_mixed_selection_moves_only_the_pending_applications(self):
+        selected = TransferApplication.objects.all()
+        moved = review_many(selected, 'hod', 'approve', comment='Batch')
+
+        self.assertEqual(moved, [application.id for application in self.pending])
+        self.assertEqual(self.statuses(), {
+            self.pending[0].id: 'hod_approved', self.pending[1].id: 'hod_approved',
+            self.rejected.id: 'hod_rejected', self.with_dean.id: 'hod_approved',
+        })
+        self.assertEqual(counters.stored_counters(), {**self.counter('hod_approved', 3), **self.counter('hod_rejected')})
+        self.assertEqual(counters.stored_counters(), counters.expected_counters())
+
+        status_jobs = Job.objects.filter(name='application_status_changed')
+        self.assertEqual(
+            [job.payload['application_ids'] for job in status_jobs], [[application.id for application in self.pending]],
+        )
+        jobs.run_pending()
+        for application in self.pending:
+            self.assertEqual(
+                self.messages(application.student.user), ['Your transfer application has been approved by HOD.'],
+            )
+        self.assertEqual(self.messages(self.rejected.student.user), [])
+        self.assertEqual(len(self.messages(self.science_dean)), 2)
+
+    def test_nothing_awaiting_review_moves_nothing(self):
+        self.assertEqual(review_many(TransferApplication.objects.filter(pk=self.rejected.pk), 'hod', 'reject'), [])
+        self.assertFalse(Job.objects.exists())
+
+    def test_completion_is_not_bulk(self):
+        with self.assertRaises(TransitionError):
+            review_many(TransferApplication.objects.all(), 'registrar', 'approve')
+
+    def test_hod_bulk_endpoint(self):
+        self.client.force_login(self.hod)
+        response = self.client.post(reverse('hod_bulk_review'), {
+            'action': 'reject', 'comment': 'Quota reached',
+            'application_ids': [str(self.pending[0].id), str(self.rejected.id), str(self.with_dean.id)],
+        })
+
+        self.assertRedirects(response, reverse('hod_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.statuses(), {
+            self.pending[0].id: 'hod_rejected', self.pending[1].id: 'pending_hod',
+            self.rejected.id: 'hod_rejected', self.with_dean.id: 'hod_approved',
+        })
+        self.assertEqual(counters.stored_counters(), counters.expected_counters())
+
+
+class EligibilityScoreTests(TestCase):
+
+    def test_unscored_without_a_cluster_weight(self):
+        self.assertEqual(score(None, 30, {'mathematics': 10}, {'Mathematics': 'B'}), (None, None, UNRANKED))
+
+    def test_margin_over_the_cutoff(self):
+        eligible, margin, rank = score(Decimal('42.5'), Decimal('40'), {}, {})
+        self.assertEqual((eligible, margin, rank), (True, 2.5, 2.5))
+
+    def test_below_the_cutoff_ranks_below_every_eligible_application(self):
+        eligible, margin, rank = score(39, 40, {}, {})
+        self.assertEqual((eligible, margin), (False, -1.0))
+        self.assertEqual(rank, -1.0 - INELIGIBLE_PENALTY)
+        self.assertLess(rank, score(40, 40, {}, {})[2])
+
+    def test_subject_requirements(self):
+        points = {'mathematics': 9, 'physics': 7}
+        self.assertTrue(score(45, 40, points, {' Mathematics ': 'b', 'Physics': 'C+'})[0])
+        self.assertFalse(score(45, 40, points, {'Mathematics': 'B+'})[0])
+        self.assertFalse(score(45, 40, points, {'Chemistry': 'D'})[0])
+        self.assertFalse(score(45, 40, points, {'Mathematics': 'Z'})[0])
+
+    def test_mean_subject_points_break_ties(self):
+        self.assertGreater(score(45, 40, {'mathematics': 12}, {})[2], score(45, 40, {'mathematics': 8}, {})[2])
+
+
+class EligibilityRankingTests(UniversityTestCase):
+
+    def scored_student(self, username, cluster_weight, grades):
+        student = self.create_student(username, username.title(), f'SCIT/{username}/2024')
+        student.cluster_weight = cluster_weight
+        student.save()
+        for subject, grade in grades.items():
+            KCSE_Result.objects.create(student=student, subject=subject, grade=grade)
+        return self.apply(student, status='hod_approved')
+
+    def test_dean_queue_is_ranked_by_eligibility(self):
+        self.physics.cutoff_points = Decimal('40')
+        self.physics.subject_requirements = {'Mathematics': 'B'}
+        self.physics.save()
+        strong = self.scored_student('strong', Decimal('44'), {'Mathematics': 'A'})
+        close = self.scored_student('close', Decimal('41'), {'Mathematics': 'B'})
+        weak_maths = self.scored_student('weak', Decimal('46'), {'Mathematics': 'C'})
+        below_cutoff = self.scored_student('below', Decimal('38'), {'Mathematics': 'A'})
+        unscored = self.scored_student('unscored', None, {})
+
+        self.assertEqual(score_applications(), 5)
+
+        # Ineligible applications still rank among themselves by margin
+        queue = TransferApplication.objects.order_by('-eligibility_rank').values_list('id', 'eligible')
+        self.assertEqual(list(queue), [
+            (strong.id, True), (close.id, True), (weak_maths.id, False), (below_cutoff.id, False), (unscored.id, None),
+        ])
+
+    def test_only_rule_changes_queue_a_rescore(self):
+        def rescore_jobs():
+            return Job.objects.filter(name='rescore_program_eligibility').count()
+
+        self.physics.name = 'Applied Physics'
+        self.physics.save()
+        self.assertEqual(rescore_jobs(), 0)
+
+        self.physics.subject_requirements = {'Mathematics': 'C+'}
+        self.physics.save()
+        self.assertEqual(rescore_jobs(), 1)
+
+    def test_unknown_grades_are_rejected(self):
+        self.physics.subject_requirements = {'Mathematics': 'Excellent'}
+        with self.assertRaises(ValidationError):
+            self.physics.save()
+
+
+PDF = b'%PDF-1.4\n1 0 obj << >> endobj\n%%EOF\n'
+
+
+@override_settings(STORAGES={
+    **settings.STORAGES, 'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+})
+class StoreUploadTests(TestCase):
+
+    def upload(self, content, name='slip.pdf'):
+        return uploads.store_upload(SimpleUploadedFile(name, content), prefix='kcse_slips')
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload(PDF)
+        second = self.upload(PDF, name='renamed.pdf')
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(first.content_type, 'application/pdf')
+        self.assertTrue(first.file.name.startswith(f'kcse_slips/{first.sha256[:2]}/{first.sha256}'))
+        self.assertTrue(default_storage.exists(first.file.name))
+        self.assertEqual(Upload.objects.count(), 1)
+        self.assertEqual(Job.objects.filter(name='process_upload').count(), 1)
+
+    def test_different_content_is_stored_separately(self):
+        self.assertNotEqual(self.upload(PDF).pk, self.upload(PDF + b'\n').pk)
+
+    def test_type_is_read_from_the_content(self):
+        with self.assertRaisesMessage(uploads.UploadRejected, 'Upload a PDF, JPEG or PNG file.'):
+            self.upload(b'MZ\x90\x00 not a slip', name='slip.pdf')
+        with self.assertRaisesMessage(uploads.UploadRejected, 'The file is empty.'):
+            self.upload(b'')
+        self.assertFalse(Upload.objects.exists())
+
+    def test_oversized_files_are_rejected(self):
+        with mock.patch.object(uploads, 'UPLOAD_MAX_BYTES', len(PDF) - 1):
+            with self.assertRaises(uploads.UploadRejected):
+                self.upload(PDF)
+        self.assertFalse(Upload.objects.exists())
+
+    def test_processing_marks_damaged_pdfs_invalid(self):
+        valid = self.upload(PDF)
+        damaged = self.upload(b'%PDF-1.4\ntruncated')
+        jobs.run_pending()
+
+        valid.refresh_from_db()
+        damaged.refresh_from_db()
+        self.assertEqual(valid.status, 'valid')
+        self.assertEqual((damaged.status, damaged.error), ('invalid', 'The PDF is incomplete or damaged.'))
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN every dashboard, report and admin-list query over seeded data.
+
+    Fails on a sequential scan of a table of PLAN_MIN_ROWS or more rows and,
+    where benchmarks/ has a baseline for the database in use, on any change to
+    how such a table is read. Re-record the baseline on an empty database with
+    ``manage.py check_query_plans --seed 600 --min-rows 500 --write-baseline
+    benchmarks/query-plans-<vendor>.json``.
+    """
+    PLAN_SEED_STUDENTS = 600
+    PLAN_MIN_ROWS = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        synthetic.generate(students=cls.PLAN_SEED_STUDENTS)
+        query_plans.analyze()
+
+    def baseline(self):
+        path = Path(settings.BASE_DIR) / 'benchmarks' / f'query-plans-{connection.vendor}.json'
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def test_large_tables_are_read_through_indexes(self):
+        plans, problems = query_plans.check_plans(query_plans.plan_queries(), self.PLAN_MIN_ROWS)
+        self.assertEqual(problems, [])
+
+    def test_plans_match_the_baseline(self):
+        baseline = self.baseline()
+        if baseline is None:
+            self.skipTest(f'No query plan baseline for {connection.vendor}')
+        plans, problems = query_plans.check_plans(query_plans.plan_queries(), self.PLAN_MIN_ROWS, baseline)
+        self.assertEqual(problems, [])
+        self.assertEqual(sorted(plans), sorted(baseline))
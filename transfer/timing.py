@@ -0,0 +1,218 @@
+"""
+Per-request performance instrumentation.
+
+``ServerTimingMiddleware`` times every request. It records the number of
+queries, the total and slowest query time on every database alias, the time
+spent rendering templates (through ``TimedDjangoTemplates``, the template
+backend) and the view's own time (measured by ``ViewTimingMiddleware``, the
+innermost middleware). The figures go back to the browser in a
+``Server-Timing`` header, which the browser's developer tools show under
+the request's timing. They are also folded into a rolling per-route summary
+(count, p50, p95 and max of the last PERFORMANCE_ROUTE_SAMPLES requests),
+shown on the admin panel's performance page. The summary lives in each
+process's memory, so it covers the process that serves the page, since it
+started or was last reset.
+
+A streamed body is produced after the middleware returns, so its time is
+not counted.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+
+ROUTE_SAMPLES = getattr(settings, 'PERFORMANCE_ROUTE_SAMPLES', 500)
+SLOW_QUERY_SQL_LENGTH = 300
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """What one request spent its time on, in milliseconds"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ''
+        self.template_ms = 0.0
+        self.view_ms = None
+        self.total_ms = 0.0
+        self._template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_ms += elapsed
+            if elapsed > self.slowest_ms:
+                self.slowest_ms = elapsed
+                self.slowest_sql = sql[:SLOW_QUERY_SQL_LENGTH]
+
+    def header(self):
+        metrics = [
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'db-slowest;dur={self.slowest_ms:.1f}',
+            f'tpl;dur={self.template_ms:.1f}',
+        ]
+        if self.view_ms is not None:
+            metrics.append(f'view;dur={self.view_ms:.1f}')
+        metrics.append(f'total;dur={self.total_ms:.1f}')
+        return ', '.join(metrics)
+
+
+# ============================================
+# TEMPLATES
+# ============================================
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+        self.origin = template.origin
+
+    def render(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None:
+            return self.template.render(context, request)
+        # Templates rendered while another one renders (e.g. by a tag) are already inside its time
+        timing._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timing._template_depth -= 1
+            if not timing._template_depth:
+                timing.template_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each render for the current request"""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+# ============================================
+# ROUTE SUMMARY
+# ============================================
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class RouteStats:
+    """Rolling timings for one route; ``samples`` keeps (total_ms, queries, db_ms) of the latest requests"""
+
+    def __init__(self):
+        self.count = 0
+        self.max_ms = 0.0
+        self.slowest_sql = ''
+        self.slowest_query_ms = 0.0
+        self.samples = deque(maxlen=ROUTE_SAMPLES)
+
+    def add(self, timing):
+        self.count += 1
+        self.max_ms = max(self.max_ms, timing.total_ms)
+        if timing.slowest_ms > self.slowest_query_ms:
+            self.slowest_query_ms = timing.slowest_ms
+            self.slowest_sql = timing.slowest_sql
+        self.samples.append((timing.total_ms, timing.queries, timing.db_ms))
+
+    def summary(self):
+        totals = [total for total, queries, db in self.samples]
+        return {
+            'count': self.count,
+            'p50_ms': round(_percentile(totals, 0.5), 1),
+            'p95_ms': round(_percentile(totals, 0.95), 1),
+            'max_ms': round(self.max_ms, 1),
+            'avg_queries': round(sum(queries for total, queries, db in self.samples) / len(self.samples), 1),
+            'avg_db_ms': round(sum(db for total, queries, db in self.samples) / len(self.samples), 1),
+            'slowest_query_ms': round(self.slowest_query_ms, 1),
+            'slowest_sql': self.slowest_sql,
+        }
+
+
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def record(route, timing):
+    with _routes_lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = RouteStats()
+        stats.add(timing)
+
+
+def route_summaries():
+    """[(route, summary dict)] for every route seen by this process, slowest p95 first"""
+    with _routes_lock:
+        summaries = [(route, stats.summary()) for route, stats in _routes.items()]
+    return sorted(summaries, key=lambda item: item[1]['p95_ms'], reverse=True)
+
+
+def reset_summaries():
+    with _routes_lock:
+        _routes.clear()
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+def _route_name(request):
+    # view_name falls back to the view's dotted path for unnamed routes
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else '(unresolved)'
+
+
+class ServerTimingMiddleware:
+    """Time every request, add a Server-Timing header and record it in the route summary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in settings.DATABASES:
+                    stack.enter_context(connections[alias].execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        timing.total_ms = (time.perf_counter() - started) * 1000
+
+        response['Server-Timing'] = timing.header()
+        record(_route_name(request), timing)
+        return response
+
+
+class ViewTimingMiddleware:
+    """Innermost middleware: measures the view itself for ServerTimingMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        timing = _current.get()
+        if timing is not None:
+            timing.view_ms = (time.perf_counter() - started) * 1000
+        return response
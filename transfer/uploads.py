@@ -0,0 +1,201 @@
+"""
+Content-addressed uploads.
+
+Views that take uploads are wrapped with ``limit_uploads``: its
+``SizeLimitUploadHandler`` skips any file that grows past UPLOAD_MAX_BYTES
+while it is still being received, and the TemporaryFileUploadHandler after it
+streams what remains to disk in chunks. The view then only has to call
+``store_upload``: it checks the type from the file's leading bytes, hashes it
+in chunks and stores it once under its SHA-256, so re-uploading the same slip
+reuses the stored copy. Decoding the file and building a thumbnail happen
+later in the ``process_upload`` job, not in the request.
+"""
+
+import hashlib
+import io
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from .jobs import enqueue
+from .models import Upload
+
+
+UPLOAD_MAX_BYTES = getattr(settings, 'UPLOAD_MAX_BYTES', 5 * 1024 * 1024)
+THUMBNAIL_SIZE = getattr(settings, 'UPLOAD_THUMBNAIL_SIZE', (320, 320))
+
+# Accepted types, recognised by their leading bytes rather than the browser's claim
+SIGNATURES = {
+    'application/pdf': b'%PDF-',
+    'image/jpeg': b'\xff\xd8\xff',
+    'image/png': b'\x89PNG\r\n\x1a\n',
+}
+EXTENSIONS = {
+    'application/pdf': '.pdf',
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+}
+IMAGE_TYPES = {'image/jpeg', 'image/png'}
+
+
+class UploadRejected(Exception):
+    """The uploaded file is too large or not an accepted type"""
+
+
+def _megabytes(size):
+    return f'{size / (1024 * 1024):g} MB'
+
+
+# ============================================
+# RECEIVING
+# ============================================
+class SizeLimitUploadHandler(FileUploadHandler):
+    """
+    Stop storing a file as soon as it passes UPLOAD_MAX_BYTES. Skipped files
+    are missing from request.FILES; their field names are listed in
+    ``request.rejected_uploads`` so the view can say why.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > UPLOAD_MAX_BYTES:
+            if not hasattr(self.request, 'rejected_uploads'):
+                self.request.rejected_uploads = set()
+            self.request.rejected_uploads.add(self.field_name)
+            raise SkipFile
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def rejected(request, field_name):
+    """Whether the upload in ``field_name`` was skipped for being too large"""
+    return field_name in getattr(request, 'rejected_uploads', ())
+
+
+def limit_uploads(view_func):
+    """
+    Receive the view's uploads with SizeLimitUploadHandler, streaming them to
+    temporary files. Upload handlers must be set before request.POST is first
+    read, which CsrfViewMiddleware would do, so the CSRF check runs here instead.
+    """
+    protected_view = csrf_protect(view_func)
+
+    @csrf_exempt
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [SizeLimitUploadHandler(request), TemporaryFileUploadHandler(request)]
+        return protected_view(request, *args, **kwargs)
+    return wrapper
+
+
+# ============================================
+# STORING
+# ============================================
+def sniff(head):
+    """The accepted content type ``head`` (the first bytes of a file) starts with, or None"""
+    for content_type, signature in SIGNATURES.items():
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def store_upload(uploaded_file, prefix='uploads', allowed=tuple(SIGNATURES)):
+    """
+    Store ``uploaded_file`` under its SHA-256 and return its Upload row,
+    reusing the existing row (and file) when the same content was uploaded
+    before. Raises UploadRejected for files that are too large or of a type
+    not in ``allowed``. New uploads queue ``process_upload``.
+    """
+    if uploaded_file.size > UPLOAD_MAX_BYTES:
+        raise UploadRejected(f'The file is larger than {_megabytes(UPLOAD_MAX_BYTES)}.')
+    if not uploaded_file.size:
+        raise UploadRejected('The file is empty.')
+
+    digest = hashlib.sha256()
+    content_type = None
+    for chunk in uploaded_file.chunks():
+        if content_type is None:
+            content_type = sniff(chunk)
+            if content_type not in allowed:
+                raise UploadRejected('Upload a PDF, JPEG or PNG file.')
+        digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    existing = Upload.objects.filter(sha256=sha256).first()
+    if existing is not None:
+        return existing
+
+    name = f'{prefix}/{sha256[:2]}/{sha256}{EXTENSIONS[content_type]}'
+    if not default_storage.exists(name):
+        uploaded_file.seek(0)
+        name = default_storage.save(name, uploaded_file)
+    try:
+        with transaction.atomic():
+            upload = Upload.objects.create(
+                sha256=sha256, file=name, content_type=content_type, size=uploaded_file.size,
+            )
+            enqueue('process_upload', upload_id=upload.pk)
+    except IntegrityError:
+        # The same file was stored by a concurrent request
+        return Upload.objects.get(sha256=sha256)
+    return upload
+
+
+# ============================================
+# PROCESSING (job worker)
+# ============================================
+def _check_pdf(upload):
+    with upload.file.open('rb') as f:
+        head = f.read(1024)
+        f.seek(max(0, upload.size - 2048))
+        tail = f.read()
+    if not head.startswith(SIGNATURES['application/pdf']) or b'%%EOF' not in tail:
+        raise ValueError('The PDF is incomplete or damaged.')
+
+
+def _make_thumbnail(upload):
+    from PIL import Image, ImageOps
+
+    with upload.file.open('rb') as f:
+        data = f.read()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+        # verify() leaves the image unusable, so decode it again
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            image.thumbnail(THUMBNAIL_SIZE)
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=80, optimize=True)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as error:
+        raise ValueError(f'The image could not be read: {error}')
+
+    directory, filename = os.path.split(upload.file.name)
+    name = f'{directory}/thumbs/{os.path.splitext(filename)[0]}.jpg'
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(output.getvalue()))
+
+
+def process_upload(upload):
+    """Validate ``upload`` and build its thumbnail; marks it valid or invalid"""
+    try:
+        if upload.content_type in IMAGE_TYPES:
+            upload.thumbnail = _make_thumbnail(upload)
+        else:
+            _check_pdf(upload)
+    except ValueError as error:
+        upload.status = 'invalid'
+        upload.error = str(error)
+    else:
+        upload.status = 'valid'
+        upload.error = ''
+    upload.save(update_fields=['status', 'error', 'thumbnail'])
+    return upload
@@ -3,6 +3,7 @@ from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
 from . import views_admin  # Import the admin views
+from . import views_realtime
 
 urlpatterns = [
     # Home
@@ -24,15 +25,24 @@ urlpatterns = [
     # HOD
     path('hod-dashboard/', views.hod_dashboard, name='hod_dashboard'),
     path('review/<int:app_id>/', views.review_application, name='review_application'),
+    path('review/bulk/', views.hod_bulk_review, name='hod_bulk_review'),
     
     # DEAN
     path('dean-dashboard/', views.dean_dashboard, name='dean_dashboard'),
     path('dean-review/<int:app_id>/', views.dean_review, name='dean_review'),
+    path('dean-review/bulk/', views.dean_bulk_review, name='dean_bulk_review'),
     
     # REGISTRAR
     path('registrar-dashboard/', views.registrar_dashboard, name='registrar_dashboard'),
     path('registrar-review/<int:app_id>/', views.registrar_review, name='registrar_review'),
     
+    # ============ IMAGE VARIANTS ============
+    path('img/<int:width>/<str:fmt>/<str:digest>/<path:source>', views.image_variant, name='image_variant'),
+    
+    # ============ REAL-TIME NOTIFICATIONS ============
+    path('notifications/stream/', views_realtime.notification_stream, name='notification_stream'),
+    path('notifications/poll/', views_realtime.notification_poll, name='notification_poll'),
+    
     # ============ REPORTS ============
     path('reports/', views.report_dashboard, name='report_dashboard'),
     path('reports/export/csv/', views.export_applications_csv, name='export_applications_csv'),
@@ -49,6 +59,7 @@ urlpatterns = [
     
     path('admin-panel/students/', views_admin.admin_students, name='admin_students'),
     path('admin-panel/students/<int:student_id>/', views_admin.admin_student_detail, name='admin_student_detail'),
+    path('admin-panel/search/', views_admin.admin_search, name='admin_search'),
     
     path('admin-panel/faculties/', views_admin.admin_faculties, name='admin_faculties'),
     path('admin-panel/faculties/create/', views_admin.admin_faculty_create, name='admin_faculty_create'),
@@ -65,6 +76,7 @@ urlpatterns = [
     
     path('admin-panel/reports/', views_admin.admin_reports, name='admin_reports'),
     path('admin-panel/audit/', views_admin.admin_audit_logs, name='admin_audit_logs'),
+    path('admin-panel/performance/', views_admin.admin_performance, name='admin_performance'),
     path('admin-panel/settings/', views_admin.admin_settings, name='admin_settings'),
     path('admin-panel/notifications/', views_admin.admin_notifications, name='admin_notifications'),
 ]
@@ -3,14 +3,33 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
-from .models import Student, Program, TransferApplication, Notification, Profile, Faculty, KCSE_Result
+from .models import Student, Program, TransferApplication, Profile, Faculty, KCSE_Result
 from .forms import StudentRegistrationForm, StudentApplicationForm, TransferApplicationForm
-from django.db.models import Q
-from django.http import HttpResponse
-from django.template.loader import render_to_string
+from .worklists import worklist_queryset, keyset_page
+from .kcse import replace_results, results_from_post, with_kcse_results
+from . import images
+from .uploads import UPLOAD_MAX_BYTES, UploadRejected, limit_uploads, rejected as rejected_upload, store_upload
+from .counters import status_totals, summarize
+from .exports import (
+    applications_for_profile, filter_applications, stream_applications_csv,
+    pdf_report_key, pdf_report_state, pdf_report_title, request_pdf_report,
+)
+from .fragments import FRAGMENT_CACHE_TTL, dashboard_version
+from .notifications import take_unread, unread_count
+from .replicas import replica_view
+from .reports import academic_years, faculty_report_data, report_etag
+from .decorators import role_required, faculty_required
+from .workflow import TransitionError, queue_status_notifications, review, review_many
+from django.db import transaction
+from django.db.models import Count
+from django.core.files.storage import default_storage
+from django.views.decorators.http import require_POST
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils import timezone
-import csv
+from django.utils.functional import SimpleLazyObject
 import json
+from collections import Counter
 from datetime import datetime
 from faq.models import Question
 
@@ -35,6 +54,20 @@ def home(request):
     return render(request, 'home.html')
 
 
+# ============================================
+# IMAGE VARIANTS
+# ============================================
+def image_variant(request, width, fmt, digest, source):
+    """Serve a resized copy of a media image; the URL changes with the content, so it never goes stale"""
+    try:
+        name = images.get_variant(source, digest, width, fmt)
+    except images.StaleVariant as stale:
+        return redirect(stale.url)
+    except images.VariantError:
+        raise Http404('No such image variant.')
+    response = FileResponse(default_storage.open(name, 'rb'), content_type=images.FORMATS[fmt][1])
+    patch_cache_control(response, public=True, max_age=images.IMMUTABLE_MAX_AGE, immutable=True)
+    return response
 
 
 # ============================================
@@ -51,23 +84,22 @@ def custom_logout(request):
 @login_required
 def dashboard_redirect(request):
     """Redirect users to their appropriate dashboard based on user type"""
-    try:
-        profile = Profile.objects.get(user=request.user)
-        
-        if profile.user_type == 'student':
-            return redirect('student_dashboard')
-        elif profile.user_type == 'hod':
-            return redirect('hod_dashboard')
-        elif profile.user_type == 'dean':
-            return redirect('dean_dashboard')
-        elif profile.user_type == 'registrar':
-            return redirect('registrar_dashboard')
-        elif profile.user_type == 'admin':
-            return redirect('/admin/')
-        else:
-            return redirect('home')
-    except Profile.DoesNotExist:
+    profile = request.profile
+    if profile is None:
         return redirect('register_student')
+    
+    if profile.user_type == 'student':
+        return redirect('student_dashboard')
+    elif profile.user_type == 'hod':
+        return redirect('hod_dashboard')
+    elif profile.user_type == 'dean':
+        return redirect('dean_dashboard')
+    elif profile.user_type == 'registrar':
+        return redirect('registrar_dashboard')
+    elif profile.user_type == 'admin':
+        return redirect('/admin/')
+    else:
+        return redirect('home')
 
 
 # ============================================
@@ -114,24 +146,15 @@ def register_student(request):
 from django.http import HttpResponse
 
 
-@login_required
+@role_required('student', message='Access denied. Student dashboard only.', redirect_to='dashboard_redirect')
 def student_dashboard(request):
     try:
-        # Check if user is a student
-        profile = Profile.objects.get(user=request.user)
-        if profile.user_type != 'student':
-            messages.error(request, 'Access denied. Student dashboard only.')
-            return redirect('dashboard_redirect')
-            
-        student = Student.objects.get(user=request.user)
+        student = Student.objects.select_related('user', 'current_program').get(user=request.user)
         # THIS LINE IS CRITICAL - make sure it's there
-        applications = TransferApplication.objects.filter(student=student).order_by('-application_date')
-        notifications = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at')
-        
-        # Mark notifications as read
-        for notification in notifications:
-            notification.is_read = True
-            notification.save()
+        applications = TransferApplication.objects.filter(student=student).select_related(
+            'requested_program__faculty'
+        ).order_by('-application_date')
+        notifications = take_unread(request.user)
         
         # Check if student has completed their profile
         has_completed_profile = all([
@@ -143,15 +166,14 @@ def student_dashboard(request):
     except Student.DoesNotExist:
         messages.warning(request, 'Please complete your student profile first.')
         return redirect('student_application_form')
-    except Profile.DoesNotExist:
-        messages.error(request, 'Profile not found. Please contact admin.')
-        return redirect('home')
     
     context = {
         'student': student,
         'applications': applications,  # This must be passed to template
         'notifications': notifications,
         'has_completed_profile': has_completed_profile,
+        'fragment_version': dashboard_version(request, applications, len(notifications)),
+        'fragment_ttl': FRAGMENT_CACHE_TTL,
     }
     return render(request, 'student_dashboard.html', context)
 
@@ -162,29 +184,24 @@ def student_dashboard(request):
 # ============================================
 # STUDENT APPLICATION FORM (KCSE & Transfer Details)
 # ============================================
-@login_required
+@limit_uploads
+@role_required('student', message='Access denied. Student only.')
 def student_application_form(request):
     """Student fills detailed KCSE and transfer application"""
     try:
-        # Check if user is a student
-        profile = Profile.objects.get(user=request.user)
-        if profile.user_type != 'student':
-            messages.error(request, 'Access denied. Student only.')
-            return redirect('home')
-            
         student = Student.objects.get(user=request.user)
         
         # Check if already has pending application
         existing_application = TransferApplication.objects.filter(
             student=student,
-            status__in=['pending_hod', 'hod_approved', 'dean_approved']
+            status__in=TransferApplication.AWAITING_REVIEW_STATUSES
         ).first()
         
         if existing_application:
             messages.warning(request, 'You already have a pending transfer application.')
             return redirect('student_dashboard')
         
-    except (Student.DoesNotExist, Profile.DoesNotExist):
+    except Student.DoesNotExist:
         return redirect('register_student')
     
     if request.method == 'POST':
@@ -199,47 +216,37 @@ def student_application_form(request):
         student.university_cutoff = request.POST.get('university_cutoff')
         student.address = request.POST.get('address')
         
-        # Handle KCSE slip upload
+        # The slip was streamed to a temporary file while the request was received;
+        # store it under its content hash and leave decoding to the job worker
         if 'kcse_slip' in request.FILES:
-            student.kcse_slip = request.FILES['kcse_slip']
+            try:
+                upload = store_upload(request.FILES['kcse_slip'], prefix='kcse_slips')
+            except UploadRejected as error:
+                messages.error(request, f'KCSE slip: {error}')
+                return redirect('student_application_form')
+            student.kcse_slip.name = upload.file.name
+            student.kcse_slip_upload = upload
+        elif rejected_upload(request, 'kcse_slip'):
+            messages.error(request, f'KCSE slip: the file is larger than {UPLOAD_MAX_BYTES // (1024 * 1024)} MB.')
+            return redirect('student_application_form')
         
         student.save()
         
-        # Save KCSE subject results
-        KCSE_Result.objects.filter(student=student).delete()  # Clear old results
-        for i in range(1, 20):
-            subject = request.POST.get(f'subject_{i}')
-            grade = request.POST.get(f'grade_{i}')
-            if subject and grade:
-                KCSE_Result.objects.create(
-                    student=student,
-                    subject=subject,
-                    grade=grade
-                )
-        
-        # Create transfer application
-        application = TransferApplication.objects.create(
-            student=student,
-            current_program=student.current_program,
-            requested_program_id=request.POST.get('requested_program'),
-            reason=request.POST.get('reason'),
-            academic_year=request.POST.get('academic_year'),
-            semester=request.POST.get('semester'),
-            status='pending_hod'
-        )
-        
-        # Notify HOD (University HOD - no faculty)
-        hod_profile = Profile.objects.filter(
-            user_type='hod',
-            faculty=None
-        ).first()
-        
-        if hod_profile:
-            Notification.objects.create(
-                user=hod_profile.user,
-                message=f"New transfer application from {student.user.get_full_name()} - {student.current_program.name} to {application.requested_program.name}",
-                application=application
+        # Replace KCSE subject results with one DELETE and one bulk INSERT
+        replace_results(student, results_from_post(request.POST))
+        
+        # Create transfer application; the HOD is notified by the job worker
+        with transaction.atomic():
+            application = TransferApplication.objects.create(
+                student=student,
+                current_program=student.current_program,
+                requested_program_id=request.POST.get('requested_program'),
+                reason=request.POST.get('reason'),
+                academic_year=request.POST.get('academic_year'),
+                semester=request.POST.get('semester'),
+                status='pending_hod'
             )
+            queue_status_notifications(application)
         
         messages.success(request, 'Transfer application submitted successfully!')
         return redirect('student_dashboard')
@@ -257,71 +264,83 @@ def student_application_form(request):
 # ============================================
 # HOD DASHBOARD - University HOD (No Faculty)
 # ============================================
-@login_required
+@role_required('hod', message='You are not authorized as a HOD.')
 def hod_dashboard(request):
+    profile = request.profile
+    scope = hod_scope(profile)
+    faculty_filter = "All Faculties" if profile.faculty is None else profile.faculty.name
+    
+    pending_queryset = worklist_queryset(status='pending_hod', **scope)
+    pending_applications = keyset_page(pending_queryset, request, param='pending_after')
+    all_applications = keyset_page(worklist_queryset(**scope), request, param='after')
+    
+    # Get unread notifications
+    notifications = take_unread(request.user)
+    
+    context = {
+        'faculty': faculty_filter,
+        'pending_applications': pending_applications,
+        'all_applications': all_applications,
+        'notifications': notifications,
+        'pending_count': pending_queryset.count(),
+        'is_university_hod': profile.faculty is None,
+    }
+    return render(request, 'hod_dashboard.html', context)
+
+
+def hod_scope(profile):
+    """Filters for the applications a HOD may review"""
+    # University HOD (no faculty assigned) - sees ALL applications
+    if profile.faculty is None:
+        return {}
+    # Faculty-specific HOD (fallback)
+    return {'current_program__faculty': profile.faculty}
+
+
+def bulk_review(request, queue, role):
+    """
+    Apply the posted action to the selected applications in ``queue``, or to
+    the whole queue when ``all_pending`` is set. Returns the number moved.
+    """
+    action = request.POST.get('action')
+    comment = request.POST.get('comment', '')
+    if request.POST.get('all_pending') != '1':
+        ids = [pk for pk in request.POST.getlist('application_ids') if pk.isdigit()]
+        if not ids:
+            messages.error(request, 'Select at least one application.')
+            return 0
+        queue = queue.filter(id__in=ids)
+    
     try:
-        # Get HOD profile
-        profile = Profile.objects.get(user=request.user, user_type='hod')
-        
-        # University HOD (no faculty assigned) - sees ALL applications
-        if profile.faculty is None:
-            pending_applications = TransferApplication.objects.filter(
-                status='pending_hod'
-            ).order_by('-application_date')
-            
-            all_applications = TransferApplication.objects.all().order_by('-application_date')
-            faculty_filter = "All Faculties"
-        else:
-            # Faculty-specific HOD (fallback)
-            pending_applications = TransferApplication.objects.filter(
-                current_program__faculty=profile.faculty,
-                status='pending_hod'
-            ).order_by('-application_date')
-            
-            all_applications = TransferApplication.objects.filter(
-                current_program__faculty=profile.faculty
-            ).order_by('-application_date')
-            faculty_filter = profile.faculty.name
-        
-        # Get unread notifications
-        notifications = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).order_by('-created_at')
-        
-        # Mark notifications as read
-        for notification in notifications:
-            notification.is_read = True
-            notification.save()
-        
-        context = {
-            'faculty': faculty_filter,
-            'pending_applications': pending_applications,
-            'all_applications': all_applications,
-            'notifications': notifications,
-            'pending_count': pending_applications.count(),
-            'is_university_hod': profile.faculty is None,
-        }
-        return render(request, 'hod_dashboard.html', context)
-        
-    except Profile.DoesNotExist:
-        messages.error(request, 'You are not authorized as a HOD.')
-        return redirect('home')
+        moved = review_many(queue, role, action, comment)
+    except TransitionError as error:
+        messages.error(request, str(error))
+        return 0
+    
+    verb = 'approved' if action == 'approve' else 'rejected'
+    messages.success(request, f'{len(moved)} application{"s" if len(moved) != 1 else ""} {verb}.')
+    return len(moved)
+
+
+# ============================================
+# HOD BULK REVIEW
+# ============================================
+@role_required('hod', message='Access denied. Only HOD can review applications.', redirect_to='dashboard_redirect')
+@require_POST
+def hod_bulk_review(request):
+    queue = TransferApplication.objects.filter(status='pending_hod', **hod_scope(request.profile))
+    bulk_review(request, queue, 'hod')
+    return redirect('hod_dashboard')
 
 
 # ============================================
 # HOD REVIEW APPLICATION
 # ============================================
-@login_required
+@role_required('hod', message='Access denied. Only HOD can review applications.', redirect_to='dashboard_redirect')
 def review_application(request, app_id):
+    profile = request.profile
     try:
-        # Check if user is HOD
-        profile = Profile.objects.get(user=request.user)
-        if profile.user_type != 'hod':
-            messages.error(request, 'Access denied. Only HOD can review applications.')
-            return redirect('dashboard_redirect')
-        
-        application = TransferApplication.objects.get(id=app_id)
+        application = with_kcse_results(worklist_queryset().select_related('student__kcse_slip_upload')).get(id=app_id)
         
         # University HOD (no faculty) can review ANY application
         if profile.faculty is not None:
@@ -334,48 +353,18 @@ def review_application(request, app_id):
             action = request.POST.get('action')
             comment = request.POST.get('comment', '')
             
+            try:
+                review(application, 'hod', action, comment)
+            except TransitionError as error:
+                messages.error(request, str(error))
+                return redirect('hod_dashboard')
+            
             if action == 'approve':
-                application.status = 'hod_approved'
-                application.hod_comment = comment
                 messages.success(request, 'Application approved! Sent to Dean.')
-                
-                # Notify student
-                Notification.objects.create(
-                    user=application.student.user,
-                    message=f'Your transfer application has been approved by HOD.',
-                    application=application
-                )
-                
-                # Notify dean of the requested faculty
-                dean_profile = Profile.objects.filter(
-                    user_type='dean',
-                    faculty=application.requested_program.faculty
-                ).first()
-                if dean_profile:
-                    Notification.objects.create(
-                        user=dean_profile.user,
-                        message=f'New transfer application pending for {application.requested_program.faculty.name} from {application.student.user.get_full_name()}',
-                        application=application
-                    )
-                
-            elif action == 'reject':
-                application.status = 'hod_rejected'
-                application.hod_comment = comment
+            else:
                 messages.success(request, 'Application rejected.')
-                
-                # Notify student
-                Notification.objects.create(
-                    user=application.student.user,
-                    message=f'Your transfer application has been rejected by HOD. Reason: {comment}',
-                    application=application
-                )
-            
-            application.save()
             return redirect('hod_dashboard')
             
-    except Profile.DoesNotExist:
-        messages.error(request, 'Profile not found.')
-        return redirect('home')
     except TransferApplication.DoesNotExist:
         messages.error(request, 'Application not found.')
         return redirect('hod_dashboard')
@@ -389,68 +378,65 @@ def review_application(request, app_id):
 # ============================================
 # DEAN DASHBOARD
 # ============================================
-@login_required
+@role_required('dean', message='You are not authorized as a Dean.')
+@faculty_required(message='Your dean profile has no faculty assigned. Contact administrator.')
 def dean_dashboard(request):
-    try:
-        # Get Dean profile
-        profile = Profile.objects.get(user=request.user, user_type='dean')
-        
-        # IMPORTANT: Check if faculty exists
-        if not profile.faculty:
-            messages.error(request, 'Your dean profile has no faculty assigned. Contact administrator.')
-            return redirect('home')
-        
-        dean_faculty = profile.faculty
-        
-        # Get applications for THIS DEAN'S FACULTY (where students want to transfer TO this faculty)
-        pending_applications = TransferApplication.objects.filter(
-            requested_program__faculty=dean_faculty,
-            status='hod_approved'  # Only show HOD approved applications
-        ).order_by('-application_date')
-        
-        # All applications for this faculty
-        all_applications = TransferApplication.objects.filter(
-            requested_program__faculty=dean_faculty
-        ).order_by('-application_date')
-        
-        # Get unread notifications
-        notifications = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).order_by('-created_at')
-        
-        # Mark notifications as read
-        for notification in notifications:
-            notification.is_read = True
-            notification.save()
-        
-        context = {
-            'faculty': dean_faculty,
-            'pending_applications': pending_applications,
-            'all_applications': all_applications,
-            'notifications': notifications,
-            'pending_count': pending_applications.count(),
-        }
-        return render(request, 'dean_dashboard.html', context)
-        
-    except Profile.DoesNotExist:
-        messages.error(request, 'You are not authorized as a Dean.')
-        return redirect('home')
+    dean_faculty = request.profile.faculty
+    
+    # Get applications for THIS DEAN'S FACULTY (where students want to transfer TO this faculty)
+    pending_queryset = worklist_queryset(
+        requested_program__faculty=dean_faculty,
+        status='hod_approved'  # Only show HOD approved applications
+    )
+    # The pages and count are only read when the cached fragment misses (see transfer/fragments.py)
+    # Highest merit first (see transfer/eligibility.py)
+    pending_applications = SimpleLazyObject(lambda: keyset_page(
+        pending_queryset, request, param='pending_after', order_field='eligibility_rank'
+    ))
+    
+    # All applications for this faculty
+    all_applications = SimpleLazyObject(lambda: keyset_page(
+        worklist_queryset(requested_program__faculty=dean_faculty), request, param='after'
+    ))
+    
+    # Get unread notifications
+    notifications = take_unread(request.user)
+    
+    faculty_applications = TransferApplication.objects.filter(requested_program__faculty=dean_faculty)
+    context = {
+        'faculty': dean_faculty,
+        'pending_applications': pending_applications,
+        'all_applications': all_applications,
+        'notifications': notifications,
+        'pending_count': pending_queryset.count,
+        # The page cursors are part of the key
+        'fragment_version': dashboard_version(request, faculty_applications, len(notifications), request.GET.urlencode()),
+        'fragment_ttl': FRAGMENT_CACHE_TTL,
+    }
+    return render(request, 'dean_dashboard.html', context)
+
+
+# ============================================
+# DEAN BULK REVIEW
+# ============================================
+@role_required('dean', message='You are not authorized as a Dean.')
+@faculty_required(message='Your dean profile has no faculty assigned.', redirect_to='dean_dashboard')
+@require_POST
+def dean_bulk_review(request):
+    queue = TransferApplication.objects.filter(status='hod_approved', requested_program__faculty=request.profile.faculty)
+    bulk_review(request, queue, 'dean')
+    return redirect('dean_dashboard')
 
 
 # ============================================
 # DEAN REVIEW APPLICATION
 # ============================================
-@login_required
+@role_required('dean', message='You are not authorized as a Dean.')
+@faculty_required(message='Your dean profile has no faculty assigned.', redirect_to='dean_dashboard')
 def dean_review(request, app_id):
+    profile = request.profile
     try:
-        profile = Profile.objects.get(user=request.user, user_type='dean')
-        
-        if not profile.faculty:
-            messages.error(request, 'Your dean profile has no faculty assigned.')
-            return redirect('dean_dashboard')
-        
-        application = TransferApplication.objects.get(id=app_id)
+        application = with_kcse_results(worklist_queryset().select_related('student__kcse_slip_upload')).get(id=app_id)
         
         # Verify this application is for this dean's faculty
         if application.requested_program.faculty != profile.faculty:
@@ -466,45 +452,18 @@ def dean_review(request, app_id):
             action = request.POST.get('action')
             comment = request.POST.get('comment', '')
             
+            try:
+                review(application, 'dean', action, comment)
+            except TransitionError as error:
+                messages.error(request, str(error))
+                return redirect('dean_dashboard')
+            
             if action == 'approve':
-                application.status = 'dean_approved'
-                application.dean_comment = comment
                 messages.success(request, 'Application approved and sent to Registrar!')
-                
-                # Notify student
-                Notification.objects.create(
-                    user=application.student.user,
-                    message=f'Your transfer application has been approved by the Dean of {profile.faculty.name}. Sent to Registrar for final approval.',
-                    application=application
-                )
-                
-                # Notify registrar
-                registrar_profile = Profile.objects.filter(user_type='registrar').first()
-                if registrar_profile:
-                    Notification.objects.create(
-                        user=registrar_profile.user,
-                        message=f'New application from {application.student.user.get_full_name()} approved by Dean. Pending your review.',
-                        application=application
-                    )
-                
-            elif action == 'reject':
-                application.status = 'dean_rejected'
-                application.dean_comment = comment
+            else:
                 messages.success(request, 'Application rejected.')
-                
-                # Notify student
-                Notification.objects.create(
-                    user=application.student.user,
-                    message=f'Your transfer application has been rejected by the Dean. Reason: {comment}',
-                    application=application
-                )
-            
-            application.save()
             return redirect('dean_dashboard')
             
-    except Profile.DoesNotExist:
-        messages.error(request, 'You are not authorized as a Dean.')
-        return redirect('home')
     except TransferApplication.DoesNotExist:
         messages.error(request, 'Application not found.')
         return redirect('dean_dashboard')
@@ -519,43 +478,26 @@ def dean_review(request, app_id):
 # ============================================
 # REGISTRAR DASHBOARD
 # ============================================
-@login_required
+@role_required('registrar', message='Access denied. Registrar only.')
 def registrar_dashboard(request):
     """Registrar dashboard with pending and completed transfers"""
-    try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.user_type != 'registrar':
-            messages.error(request, 'Access denied. Registrar only.')
-            return redirect('home')
-    except Profile.DoesNotExist:
-        return redirect('home')
-    
     # Get dean-approved applications pending registrar review
-    pending_applications = TransferApplication.objects.filter(
-        status='dean_approved'
-    ).order_by('-application_date')
+    pending_queryset = worklist_queryset(status='dean_approved')
+    pending_applications = keyset_page(pending_queryset, request, param='pending_after')
     
     # Get completed transfers
-    completed_transfers = TransferApplication.objects.filter(
-        status='completed'
-    ).order_by('-last_updated')
+    completed_transfers = keyset_page(
+        worklist_queryset(status='completed'), request, param='after', order_field='last_updated'
+    )
     
     # Get unread notifications
-    notifications = Notification.objects.filter(
-        user=request.user,
-        is_read=False
-    ).order_by('-created_at')
-    
-    # Mark notifications as read
-    for notification in notifications:
-        notification.is_read = True
-        notification.save()
+    notifications = take_unread(request.user)
     
     context = {
         'pending_applications': pending_applications,
         'completed_transfers': completed_transfers,
         'notifications': notifications,
-        'pending_count': pending_applications.count(),
+        'pending_count': pending_queryset.count(),
     }
     return render(request, 'registrar_dashboard.html', context)
 
@@ -563,16 +505,11 @@ def registrar_dashboard(request):
 # ============================================
 # REGISTRAR REVIEW APPLICATION
 # ============================================
-@login_required
+@role_required('registrar', message='Access denied. Registrar only.')
 def registrar_review(request, app_id):
     """Registrar reviews dean-approved applications and issues new admission number"""
     try:
-        profile = Profile.objects.get(user=request.user)
-        if profile.user_type != 'registrar':
-            messages.error(request, 'Access denied. Registrar only.')
-            return redirect('home')
-        
-        application = TransferApplication.objects.get(id=app_id)
+        application = with_kcse_results(worklist_queryset().select_related('student__kcse_slip_upload')).get(id=app_id)
         
         # Only allow review of dean-approved applications
         if application.status != 'dean_approved':
@@ -582,69 +519,20 @@ def registrar_review(request, app_id):
         if request.method == 'POST':
             action = request.POST.get('action')
             comment = request.POST.get('comment', '')
-            new_admission = request.POST.get('new_admission_number', '')
+            new_admission = request.POST.get('new_admission_number', '').strip()
+            
+            try:
+                review(application, 'registrar', action, comment, new_admission_number=new_admission)
+            except TransitionError as error:
+                messages.error(request, str(error))
+                return redirect('registrar_dashboard')
             
             if action == 'approve':
-                application.status = 'completed'
-                application.registrar_comment = comment
-                application.new_admission_number = new_admission
                 messages.success(request, 'Transfer completed! New admission number issued.')
-                
-                # Update student's program and admission number
-                student = application.student
-                student.current_program = application.requested_program
-                student.admission_number = new_admission
-                student.save()
-                
-                # Notify student
-                Notification.objects.create(
-                    user=application.student.user,
-                    message=f'✅ Your transfer has been approved! New admission number: {new_admission}. You are now in {application.requested_program.name}.',
-                    application=application
-                )
-                
-                # Notify HOD of new faculty
-                hod_profile = Profile.objects.filter(
-                    user_type='hod',
-                    faculty=application.requested_program.faculty
-                ).first()
-                if hod_profile:
-                    Notification.objects.create(
-                        user=hod_profile.user,
-                        message=f'Student {application.student.user.get_full_name()} has transferred to your faculty. New admission: {new_admission}',
-                        application=application
-                    )
-                
-                # Notify Dean of new faculty
-                dean_profile = Profile.objects.filter(
-                    user_type='dean',
-                    faculty=application.requested_program.faculty
-                ).first()
-                if dean_profile:
-                    Notification.objects.create(
-                        user=dean_profile.user,
-                        message=f'Student {application.student.user.get_full_name()} has been approved by Registrar and joined your faculty.',
-                        application=application
-                    )
-                
-            elif action == 'reject':
-                application.status = 'registrar_rejected'
-                application.registrar_comment = comment
+            else:
                 messages.success(request, 'Application rejected.')
-                
-                # Notify student
-                Notification.objects.create(
-                    user=application.student.user,
-                    message=f'❌ Your transfer application has been rejected by the Registrar. Reason: {comment}',
-                    application=application
-                )
-            
-            application.save()
             return redirect('registrar_dashboard')
             
-    except Profile.DoesNotExist:
-        messages.error(request, 'Profile not found.')
-        return redirect('home')
     except TransferApplication.DoesNotExist:
         messages.error(request, 'Application not found.')
         return redirect('registrar_dashboard')
@@ -656,67 +544,50 @@ def registrar_review(request, app_id):
 #============================================  
       # REPORT DASHBOARD
 # ============================================
-@login_required
+@role_required('hod', 'dean', 'registrar', 'student')
+@replica_view
 def report_dashboard(request):
     """Central report dashboard - different views per user type"""
     try:
-        profile = Profile.objects.get(user=request.user)
+        profile = request.profile
         
-        # Get counts based on user type
+        # Get counts based on user type (one grouped query against the status counters)
         if profile.user_type == 'hod' and profile.faculty is None:
             # University HOD - sees all
-            total_applications = TransferApplication.objects.count()
-            pending = TransferApplication.objects.filter(status='pending_hod').count()
-            approved = TransferApplication.objects.filter(status='hod_approved').count()
-            rejected = TransferApplication.objects.filter(status='hod_rejected').count()
-            completed = TransferApplication.objects.filter(status='completed').count()
+            totals = status_totals()
+            pending, approved, rejected = totals['pending_hod'], totals['hod_approved'], totals['hod_rejected']
             faculties = Faculty.objects.all()
             
         elif profile.user_type == 'dean':
             # Dean - sees only their faculty
-            total_applications = TransferApplication.objects.filter(
-                requested_program__faculty=profile.faculty
-            ).count()
-            pending = TransferApplication.objects.filter(
-                requested_program__faculty=profile.faculty,
-                status='hod_approved'
-            ).count()
-            approved = TransferApplication.objects.filter(
-                requested_program__faculty=profile.faculty,
-                status='dean_approved'
-            ).count()
-            rejected = TransferApplication.objects.filter(
-                requested_program__faculty=profile.faculty,
-                status='dean_rejected'
-            ).count()
-            completed = TransferApplication.objects.filter(
-                requested_program__faculty=profile.faculty,
-                status='completed'
-            ).count()
+            totals = status_totals(requested_faculty=profile.faculty)
+            pending, approved, rejected = totals['hod_approved'], totals['dean_approved'], totals['dean_rejected']
             faculties = [profile.faculty]
             
         elif profile.user_type == 'registrar':
             # Registrar - sees all completed and pending
-            total_applications = TransferApplication.objects.count()
-            pending = TransferApplication.objects.filter(status='dean_approved').count()
-            completed = TransferApplication.objects.filter(status='completed').count()
-            rejected = TransferApplication.objects.filter(status='registrar_rejected').count()
+            totals = status_totals()
+            pending, approved, rejected = totals['dean_approved'], totals['completed'], totals['registrar_rejected']
             faculties = Faculty.objects.all()
             
         elif profile.user_type == 'student':
             # Student - sees only their own
             student = Student.objects.get(user=request.user)
-            total_applications = TransferApplication.objects.filter(student=student).count()
-            applications = TransferApplication.objects.filter(student=student)
-            pending = applications.filter(status__contains='pending').count()
-            approved = applications.filter(status__contains='approved').count()
-            rejected = applications.filter(status__contains='rejected').count()
+            totals = Counter(dict(
+                TransferApplication.objects.filter(student=student)
+                .values_list('status').annotate(total=Count('id'))
+            ))
+            summary = summarize(totals)
+            pending, approved, rejected = summary['pending'], summary['approved'], summary['rejected']
             faculties = []
             
         else:
             messages.error(request, 'Access denied.')
             return redirect('home')
         
+        total_applications = sum(totals.values())
+        completed = totals['completed']
+        
         context = {
             'user_type': profile.user_type,
             'total_applications': total_applications,
@@ -725,6 +596,7 @@ def report_dashboard(request):
             'rejected': rejected,
             'completed': completed,
             'faculties': faculties,
+            'status_choices': TransferApplication.STATUS_CHOICES,
         }
         return render(request, 'report_dashboard.html', context)
         
@@ -736,112 +608,80 @@ def report_dashboard(request):
 # ============================================
 # EXPORT TO CSV
 # ============================================
-@login_required
+@role_required('hod', 'dean', 'registrar', 'student', redirect_to='report_dashboard')
+@replica_view
 def export_applications_csv(request):
-    """Export applications data to CSV"""
+    """Stream applications data as CSV, optionally filtered by status, faculty and date range"""
     try:
-        profile = Profile.objects.get(user=request.user)
+        profile = request.profile
         
         # Filter based on user type
-        if profile.user_type == 'hod' and profile.faculty is None:
-            applications = TransferApplication.objects.all()
-        elif profile.user_type == 'dean':
-            applications = TransferApplication.objects.filter(
-                requested_program__faculty=profile.faculty
-            )
-        elif profile.user_type == 'registrar':
-            applications = TransferApplication.objects.all()
-        elif profile.user_type == 'student':
-            student = Student.objects.get(user=request.user)
-            applications = TransferApplication.objects.filter(student=student)
-        else:
+        applications = applications_for_profile(profile, request.user)
+        if applications is None:
             messages.error(request, 'Access denied.')
             return redirect('report_dashboard')
+        applications = filter_applications(applications, request.GET)
         
-        # Create HttpResponse with CSV header
-        response = HttpResponse(content_type='text/csv')
+        # Rows are produced lazily as the response is sent
+        response = StreamingHttpResponse(stream_applications_csv(applications), content_type='text/csv')
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         response['Content-Disposition'] = f'attachment; filename="transfer_applications_{timestamp}.csv"'
-        
-        writer = csv.writer(response)
-        # Write header
-        writer.writerow([
-            'Application ID', 'Date', 'Student Name', 'Admission Number',
-            'Current Program', 'Current Faculty', 'Requested Program',
-            'Requested Faculty', 'Status', 'Academic Year', 'Semester',
-            'HOD Comment', 'Dean Comment', 'Registrar Comment',
-            'New Admission Number'
-        ])
-        
-        # Write data rows
-        for app in applications:
-            writer.writerow([
-                app.id,
-                app.application_date.strftime('%Y-%m-%d %H:%M'),
-                app.student.user.get_full_name(),
-                app.student.admission_number,
-                app.current_program.name,
-                app.current_program.faculty.name,
-                app.requested_program.name,
-                app.requested_program.faculty.name,
-                app.get_status_display(),
-                app.academic_year,
-                app.get_semester_display(),
-                app.hod_comment or '',
-                app.dean_comment or '',
-                app.registrar_comment or '',
-                app.new_admission_number or ''
-            ])
-        
         return response
         
-    except Exception as e:
+    except Student.DoesNotExist as e:
         messages.error(request, f'Error exporting data: {str(e)}')
         return redirect('report_dashboard')
 
 
 # ============================================
-# EXPORT TO PDF (Simple HTML version)
+# EXPORT TO PDF
 # ============================================
-@login_required
+@role_required('hod', 'dean', 'registrar', 'student', redirect_to='report_dashboard')
+@replica_view
 def export_applications_pdf(request):
-    """Export applications data to printable HTML/PDF"""
+    """
+    PDF of the applications the user may report on, with the same filters as the CSV export.
+
+    The PDF is rendered by the job worker. Until it is ready this returns a
+    page that polls ``?poll=1`` and reloads once the file can be downloaded.
+    """
     try:
-        profile = Profile.objects.get(user=request.user)
-        
-        # Filter based on user type
-        if profile.user_type == 'hod' and profile.faculty is None:
-            applications = TransferApplication.objects.all()
-            title = "All Applications Report"
-        elif profile.user_type == 'dean':
-            applications = TransferApplication.objects.filter(
-                requested_program__faculty=profile.faculty
-            )
-            title = f"{profile.faculty.name} - Applications Report"
-        elif profile.user_type == 'registrar':
-            applications = TransferApplication.objects.all()
-            title = "Registrar - Complete Applications Report"
-        elif profile.user_type == 'student':
-            student = Student.objects.get(user=request.user)
-            applications = TransferApplication.objects.filter(student=student)
-            title = f"{student.user.get_full_name()} - My Applications Report"
-        else:
+        profile = request.profile
+        applications = applications_for_profile(profile, request.user)
+        if applications is None:
             messages.error(request, 'Access denied.')
             return redirect('report_dashboard')
+        applications = filter_applications(applications, request.GET)
+        key = pdf_report_key(profile, request.user, request.GET, applications)
+        
+        state = pdf_report_state(key)
+        if state is not None and state['status'] == 'ready' and not default_storage.exists(state['name']):
+            state = None  # the stored file has gone; render it again
+        if state is None or state['status'] == 'failed' and not request.GET.get('poll'):
+            state = request_pdf_report(key, request.user, request.GET)
+        
+        if request.GET.get('poll'):
+            return JsonResponse({'status': state['status'], 'error': state.get('error', '')})
+        
+        if state['status'] == 'ready':
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            return FileResponse(
+                default_storage.open(state['name'], 'rb'),
+                as_attachment=True,
+                filename=f'transfer_applications_{timestamp}.pdf',
+                content_type='application/pdf',
+            )
         
+        params = request.GET.copy()
+        params['poll'] = '1'
         context = {
-            'applications': applications,
-            'title': title,
-            'generated_date': datetime.now(),
-            'user': request.user,
-            'user_type': profile.user_type,
+            'title': pdf_report_title(profile, request.user),
+            'poll_url': f"{request.path}?{params.urlencode()}",
+            'state': state,
         }
+        return render(request, 'report_pdf_pending.html', context)
         
-        # Render HTML template
-        html_string = render_to_string('report_pdf.html', context)
-        return HttpResponse(html_string)
-        
-    except Exception as e:
+    except Student.DoesNotExist as e:
         messages.error(request, f'Error generating report: {str(e)}')
         return redirect('report_dashboard')
 
@@ -849,38 +689,33 @@ def export_applications_pdf(request):
 # ============================================
 # FACULTY WISE REPORT
 # ============================================
-@login_required
+@role_required('hod', 'registrar', 'admin', redirect_to='report_dashboard')
+@replica_view
 def faculty_report(request, faculty_code=None):
-    """Generate report for specific faculty"""
+    """Generate report for specific faculty, optionally for one academic year (?year=)"""
     try:
-        profile = Profile.objects.get(user=request.user)
-        
-        # Check permissions
-        if profile.user_type not in ['hod', 'registrar', 'admin']:
-            messages.error(request, 'Access denied.')
-            return redirect('report_dashboard')
+        faculty = Faculty.objects.get(code=faculty_code) if faculty_code else None
+        faculty_id = faculty.id if faculty else None
+        academic_year = request.GET.get('year') or None
         
-        if faculty_code:
-            faculty = Faculty.objects.get(code=faculty_code)
-            applications = TransferApplication.objects.filter(
-                Q(current_program__faculty=faculty) | 
-                Q(requested_program__faculty=faculty)
-            )
-        else:
-            faculty = None
-            applications = TransferApplication.objects.all()
+        # The page is per user (navigation, unread badge), so is the ETag
+        etag = report_etag(faculty_id, academic_year, request.user.pk, unread_count(request.user))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
         
         context = {
             'faculty': faculty,
-            'applications': applications,
-            'total': applications.count(),
-            'pending': applications.filter(status__contains='pending').count(),
-            'approved': applications.filter(status__contains='approved').count(),
-            'rejected': applications.filter(status__contains='rejected').count(),
-            'completed': applications.filter(status='completed').count(),
+            'academic_year': academic_year,
+            'academic_years': academic_years(),
+            **faculty_report_data(faculty, academic_year),
         }
         
-        return render(request, 'faculty_report.html', context)
+        response = render(request, 'faculty_report.html', context)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
         
     except Faculty.DoesNotExist:
         messages.error(request, 'Faculty not found.')
@@ -893,20 +728,16 @@ def faculty_report(request, faculty_code=None):
 # ============================================
 # STUDENT PERFORMANCE REPORT (For HOD/Registrar)
 # ============================================
-@login_required
+@role_required('hod', 'dean', 'registrar', 'admin')
+@replica_view
 def student_academic_report(request, student_id):
     """View student's academic details and KCSE results"""
     try:
-        profile = Profile.objects.get(user=request.user)
-        
-        # Only HOD, Dean, Registrar can view
-        if profile.user_type not in ['hod', 'dean', 'registrar', 'admin']:
-            messages.error(request, 'Access denied.')
-            return redirect('home')
-        
-        student = Student.objects.get(id=student_id)
-        applications = TransferApplication.objects.filter(student=student)
-        kcse_results = KCSE_Result.objects.filter(student=student)
+        student = Student.objects.select_related('user', 'current_program__faculty').get(id=student_id)
+        applications = TransferApplication.objects.filter(student=student).select_related(
+            'current_program__faculty', 'requested_program__faculty'
+        ).order_by('-application_date')
+        kcse_results = KCSE_Result.objects.filter(student=student).order_by('id')
         
         context = {
             'student': student,
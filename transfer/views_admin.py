@@ -4,9 +4,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.db.models import Q, Count
-from django.core.paginator import Paginator
-from .models import Faculty, Program, Student, Profile, TransferApplication, Notification, KCSE_Result
-from faq.models import Question
+from django.http import JsonResponse
+from django.urls import reverse
+from .models import Faculty, Program, Student, Profile, TransferApplication, Notification, KCSE_Result, AuditLog
+from .analytics import dashboard_snapshot
+from .audit import filter_entries
+from .notifications import notify
+from .replicas import replica_view
+from .search import autocomplete, search_filter
+from .timing import ROUTE_SAMPLES, reset_summaries, route_summaries
+from .workflow import TransitionError, override_status
+from .worklists import keyset_page
+
+ADMIN_PAGE_SIZE = 20
 
 # ============================================
 # ADMIN DASHBOARD
@@ -16,75 +26,8 @@ from faq.models import Question
 def admin_dashboard(request):
     """Main admin dashboard with statistics"""
     
-    # Statistics
-    total_users = User.objects.count()
-    total_students = Student.objects.count()
-    total_faculties = Faculty.objects.count()
-    total_programs = Program.objects.count()
-    
-    # Application statistics
-    total_applications = TransferApplication.objects.count()
-    pending_applications = TransferApplication.objects.filter(
-        Q(status='pending_hod') | Q(status='pending_dean') | Q(status='pending_registrar')
-    ).count()
-    approved_applications = TransferApplication.objects.filter(
-        Q(status='hod_approved') | Q(status='dean_approved') | Q(status='registrar_approved')
-    ).count()
-    rejected_applications = TransferApplication.objects.filter(
-        Q(status='hod_rejected') | Q(status='dean_rejected') | Q(status='registrar_rejected')
-    ).count()
-    completed_applications = TransferApplication.objects.filter(status='completed').count()
-    
-    # Recent applications
-    recent_applications = TransferApplication.objects.all().order_by('-application_date')[:10]
-    
-    # Faculty distribution
-    faculty_stats = []
-    for faculty in Faculty.objects.all():
-        faculty_stats.append({
-            'name': faculty.name,
-            'code': faculty.code,
-            'programs': Program.objects.filter(faculty=faculty).count(),
-            'students': Student.objects.filter(current_program__faculty=faculty).count(),
-            'applications': TransferApplication.objects.filter(
-                Q(current_program__faculty=faculty) | Q(requested_program__faculty=faculty)
-            ).count()
-        })
-    
-    # User type distribution
-    user_types = {
-        'students': total_students,
-        'hods': Profile.objects.filter(user_type='hod').count(),
-        'deans': Profile.objects.filter(user_type='dean').count(),
-        'registrars': Profile.objects.filter(user_type='registrar').count(),
-        'admins': User.objects.filter(is_superuser=True).count(),
-    }
-    
-    # Unread notifications
-    unread_notifications = Notification.objects.filter(user=request.user, is_read=False).count()
-
-    faq_count = Question.objects.count()
-
-
-    context = {
-        # At the top of the file with other imports
-        
-        'total_users': total_users,
-        'total_students': total_students,
-        'total_faculties': total_faculties,
-        'total_programs': total_programs,
-        'total_applications': total_applications,
-        'pending_applications': pending_applications,
-        'approved_applications': approved_applications,
-        'rejected_applications': rejected_applications,
-        'completed_applications': completed_applications,
-        'recent_applications': recent_applications,
-        'faq_count': faq_count,
-        'faculty_stats': faculty_stats,
-        'user_types': user_types,
-        'unread_notifications': unread_notifications,
-        
-    }
+    # All statistics come from one cached snapshot (see transfer/analytics.py)
+    context = dict(dashboard_snapshot())
     
     return render(request, 'admin/dashboard.html', context)
 
@@ -101,17 +44,12 @@ def admin_users(request):
     user_type = request.GET.get('type', '')
     search_query = request.GET.get('q', '')
     
-    # Base queryset
-    users = User.objects.all().order_by('-date_joined')
+    # Base queryset; newest accounts first, by id (the primary key index) rather than the unindexed date_joined
+    users = User.objects.all().select_related('profile__faculty').order_by('-id')
     
     # Apply filters
     if search_query:
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        users = users.filter(search_filter(search_query, 'id'))
     
     if user_type:
         if user_type == 'student':
@@ -126,15 +64,14 @@ def admin_users(request):
             users = users.filter(is_superuser=True)
     
     # Pagination
-    paginator = Paginator(users, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = keyset_page(
+        users, request, order_field='id', per_page=ADMIN_PAGE_SIZE, before_param='before', estimate=True,
+    )
     
     context = {
         'page_obj': page_obj,
         'user_type': user_type,
         'search_query': search_query,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/users/list.html', context)
@@ -200,7 +137,6 @@ def admin_user_create(request):
     context = {
         'faculties': faculties,
         'programs': programs,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/users/create.html', context)
@@ -257,7 +193,6 @@ def admin_user_edit(request, user_id):
         'student': student,
         'faculties': faculties,
         'programs': programs,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/users/edit.html', context)
@@ -291,19 +226,14 @@ def admin_students(request):
     students = Student.objects.all().select_related('user', 'current_program__faculty')
     
     if search_query:
-        students = students.filter(
-            Q(user__username__icontains=search_query) |
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(admission_number__icontains=search_query)
-        )
+        students = students.filter(search_filter(search_query, 'user_id'))
     
     if faculty_filter:
         students = students.filter(current_program__faculty__id=faculty_filter)
     
-    paginator = Paginator(students, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = keyset_page(
+        students, request, order_field='id', per_page=ADMIN_PAGE_SIZE, before_param='before', estimate=True,
+    )
     
     faculties = Faculty.objects.all()
     
@@ -312,7 +242,6 @@ def admin_students(request):
         'faculties': faculties,
         'search_query': search_query,
         'faculty_filter': faculty_filter,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/students/list.html', context)
@@ -331,12 +260,35 @@ def admin_student_detail(request, student_id):
         'student': student,
         'applications': applications,
         'kcse_results': kcse_results,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/students/detail.html', context)
 
 
+# ============================================
+# SEARCH
+# ============================================
+@staff_member_required
+@login_required
+def admin_search(request):
+    """Autocomplete suggestions for the admin search boxes (JSON)"""
+    
+    suggestions = []
+    for entry in autocomplete(request.GET.get('q', '')):
+        name = f"{entry['user__first_name']} {entry['user__last_name']}".strip()
+        suggestions.append({
+            'username': entry['user__username'],
+            'name': name,
+            'admission_number': entry['student__admission_number'] or '',
+            'url': (
+                reverse('admin_student_detail', args=[entry['student_id']]) if entry['student_id']
+                else reverse('admin_user_edit', args=[entry['user_id']])
+            ),
+        })
+    
+    return JsonResponse({'results': suggestions})
+
+
 # ============================================
 # FACULTY MANAGEMENT
 # ============================================
@@ -352,7 +304,6 @@ def admin_faculties(request):
     
     context = {
         'faculties': faculties,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/faculties/list.html', context)
@@ -374,9 +325,7 @@ def admin_faculty_create(request):
         except Exception as e:
             messages.error(request, f'Error creating faculty: {str(e)}')
     
-    context = {
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
-    }
+    context = {}
     
     return render(request, 'admin/faculties/create.html', context)
 
@@ -400,7 +349,6 @@ def admin_faculty_edit(request, faculty_id):
     
     context = {
         'faculty': faculty,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/faculties/edit.html', context)
@@ -446,7 +394,6 @@ def admin_programs(request):
         'faculties': faculties,
         'faculty_filter': faculty_filter,
         'search_query': search_query,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/programs/list.html', context)
@@ -473,7 +420,6 @@ def admin_program_create(request):
     
     context = {
         'faculties': faculties,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/programs/create.html', context)
@@ -501,7 +447,6 @@ def admin_program_edit(request, program_id):
     context = {
         'program': program,
         'faculties': faculties,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/programs/edit.html', context)
@@ -547,15 +492,11 @@ def admin_applications(request):
         )
     
     if search_query:
-        applications = applications.filter(
-            Q(student__user__first_name__icontains=search_query) |
-            Q(student__user__last_name__icontains=search_query) |
-            Q(student__admission_number__icontains=search_query)
-        )
+        applications = applications.filter(search_filter(search_query, 'student__user_id'))
     
-    paginator = Paginator(applications, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = keyset_page(
+        applications, request, order_field='application_date', per_page=ADMIN_PAGE_SIZE, before_param='before', estimate=True,
+    )
     
     faculties = Faculty.objects.all()
     status_choices = TransferApplication.STATUS_CHOICES
@@ -567,7 +508,6 @@ def admin_applications(request):
         'status_filter': status_filter,
         'faculty_filter': faculty_filter,
         'search_query': search_query,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/applications/list.html', context)
@@ -586,24 +526,19 @@ def admin_application_detail(request, app_id):
         comment = request.POST.get('admin_comment', '')
         
         if new_status:
-            application.status = new_status
-            application.save()
-            
-            # Create notification
-            Notification.objects.create(
-                user=application.student.user,
-                message=f'Admin updated your application status to: {application.get_status_display()}. Comment: {comment}',
-                application=application
-            )
-            
-            messages.success(request, f'Application status updated to {application.get_status_display()}')
+            # The student is notified by the job worker
+            try:
+                override_status(application, new_status, comment, request.POST.get('expected_status'))
+            except TransitionError as error:
+                messages.error(request, str(error))
+            else:
+                messages.success(request, f'Application status updated to {application.get_status_display()}')
         
         return redirect('admin_application_detail', app_id=app_id)
     
     context = {
         'application': application,
         'status_choices': TransferApplication.STATUS_CHOICES,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/applications/detail.html', context)
@@ -614,6 +549,7 @@ def admin_application_detail(request, app_id):
 # ============================================
 @staff_member_required
 @login_required
+@replica_view
 def admin_reports(request):
     """Generate system reports"""
     
@@ -625,7 +561,6 @@ def admin_reports(request):
         'report_type': report_type,
         'date_from': date_from,
         'date_to': date_to,
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/reports/index.html', context)
@@ -637,15 +572,50 @@ def admin_reports(request):
 @staff_member_required
 @login_required
 def admin_audit_logs(request):
-    """View system audit logs"""
+    """View system audit logs, newest first"""
+    
+    # Entries are written in batches, so the latest few seconds may not be here yet
+    entries = filter_entries(AuditLog.objects.all(), request.GET)
+    page_obj = keyset_page(
+        entries, request, order_field='created_at', per_page=ADMIN_PAGE_SIZE, before_param='before', estimate=True,
+    )
     
     context = {
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
+        'page_obj': page_obj,
+        'action_choices': AuditLog.ACTION_CHOICES,
+        'object_types': ['transferapplication', 'user', 'faculty', 'program'],
+        'action': request.GET.get('action', ''),
+        'actor': request.GET.get('actor', ''),
+        'object_type': request.GET.get('type', ''),
+        'object_id': request.GET.get('object', ''),
+        'date_from': request.GET.get('from', ''),
+        'date_to': request.GET.get('to', ''),
     }
     
     return render(request, 'admin/audit/logs.html', context)
 
 
+# ============================================
+# PERFORMANCE
+# ============================================
+@staff_member_required
+@login_required
+def admin_performance(request):
+    """Per-route request timings collected by this server process"""
+    
+    if request.method == 'POST':
+        reset_summaries()
+        messages.success(request, 'Performance statistics reset.')
+        return redirect('admin_performance')
+    
+    context = {
+        'routes': route_summaries(),
+        'samples': ROUTE_SAMPLES,
+    }
+    
+    return render(request, 'admin/performance/index.html', context)
+
+
 # ============================================
 # SYSTEM SETTINGS
 # ============================================
@@ -657,9 +627,7 @@ def admin_settings(request):
     if request.method == 'POST':
         messages.success(request, 'Settings saved successfully!')
     
-    context = {
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
-    }
+    context = {}
     
     return render(request, 'admin/settings/index.html', context)
 
@@ -681,7 +649,7 @@ def admin_notifications(request):
         
         if user_id and message:
             target_user = User.objects.get(id=user_id)
-            Notification.objects.create(
+            notify(
                 user=target_user,
                 message=message
             )
@@ -690,7 +658,6 @@ def admin_notifications(request):
     context = {
         'notifications': notifications,
         'users': User.objects.filter(is_active=True),
-        'unread_notifications': Notification.objects.filter(user=request.user, is_read=False).count(),
     }
     
     return render(request, 'admin/notifications/index.html', context)
\ No newline at end of file
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .models import Notification
+from .realtime import get_broker, notification_payload, user_channel
+
+
+STREAM_HEARTBEAT = getattr(settings, 'REALTIME_HEARTBEAT', 15)
+STREAM_MAX_AGE = getattr(settings, 'REALTIME_STREAM_MAX_AGE', 300)
+POLL_TIMEOUT = getattr(settings, 'REALTIME_POLL_TIMEOUT', 25)
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _notifications_after(user, last_id):
+    """Notifications for ``user`` with id > last_id, oldest first"""
+    queryset = Notification.objects.filter(user=user, id__gt=last_id).select_related('application').order_by('id')
+    return [notification_payload(n) async for n in queryset]
+
+
+async def _latest_id(user):
+    latest = await Notification.objects.filter(user=user).aaggregate(latest=Max('id'))
+    return latest['latest'] or 0
+
+
+def served_over_asgi(request):
+    """Whether waiting in an async view parks a task on the event loop rather than a whole WSGI worker"""
+    return isinstance(request, ASGIRequest)
+
+
+def _sse_event(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+
+
+# ============================================
+# SERVER-SENT EVENTS STREAM
+# ============================================
+@login_required
+async def notification_stream(request):
+    """Push new notifications (and the application status they report) as Server-Sent Events"""
+    user = await request.auser()
+    last_id = _parse_id(request.headers.get('Last-Event-ID'))
+    if last_id is None:
+        last_id = _parse_id(request.GET.get('after'))
+
+    async def events():
+        nonlocal last_id
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAM_MAX_AGE
+        yield f"retry: {STREAM_HEARTBEAT * 1000}\n\n"
+
+        async with get_broker().subscribe(user_channel(user.pk)) as subscription:
+            # Subscribed first, so nothing created during the catch-up query is lost
+            if last_id is None:
+                last_id = await _latest_id(user)
+            else:
+                for payload in await _notifications_after(user, last_id):
+                    last_id = payload['id']
+                    yield _sse_event(payload)
+
+            while loop.time() < deadline:
+                if await subscription.get(timeout=STREAM_HEARTBEAT) is None:
+                    yield ": keepalive\n\n"
+                    continue
+                # A message only says there is something new; it is read from the table
+                for payload in await _notifications_after(user, last_id):
+                    last_id = payload['id']
+                    yield _sse_event(payload)
+        # The browser's EventSource reconnects with Last-Event-ID and catches up
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ============================================
+# LONG-POLL FALLBACK
+# ============================================
+@login_required
+async def notification_poll(request):
+    """
+    Return notifications newer than ?after=<id> and the id to poll after next.
+
+    Without ``after`` nothing is returned but the newest id. Under ASGI the
+    request waits up to POLL_TIMEOUT seconds for a notification to arrive;
+    under WSGI, where the wait would hold a worker, it answers at once and
+    the page polls every REALTIME_POLL_INTERVAL seconds instead.
+    """
+    user = await request.auser()
+    last_id = _parse_id(request.GET.get('after'))
+    if last_id is None:
+        return JsonResponse({'notifications': [], 'last_id': await _latest_id(user)})
+
+    if not served_over_asgi(request):
+        payloads = await _notifications_after(user, last_id)
+        return JsonResponse({'notifications': payloads, 'last_id': payloads[-1]['id'] if payloads else last_id})
+
+    async def body():
+        # The wait happens while the response streams, so it runs on the server's
+        # event loop rather than holding the thread that serves sync middleware.
+        async with get_broker().subscribe(user_channel(user.pk)) as subscription:
+            payloads = await _notifications_after(user, last_id)
+            if not payloads:
+                await subscription.get(timeout=POLL_TIMEOUT)
+                payloads = await _notifications_after(user, last_id)
+        yield json.dumps({'notifications': payloads, 'last_id': payloads[-1]['id'] if payloads else last_id})
+
+    response = StreamingHttpResponse(body(), content_type='application/json')
+    response['Cache-Control'] = 'no-cache'
+    return response
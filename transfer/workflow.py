@@ -0,0 +1,196 @@
+"""
+The transfer application workflow.
+
+Every status change goes through ``apply_transition``. It runs a single
+conditional UPDATE (``WHERE id = ? AND status = <status the reviewer saw>``)
+that writes only the columns the transition changes. In the same transaction
+it moves the status counters, applies any Student change, queues the
+notification job and records the change in the audit log. If another
+reviewer got there first, the UPDATE matches no row and ``TransitionError``
+is raised, so a decision is never applied twice and no row lock is held
+while the reviewer reads the page.
+
+Reviewers act through ``review(application, role, action)``, or
+``review_many`` for a batch from their queue; the admin panel's status
+override uses ``override_status``.
+"""
+
+from collections import namedtuple
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import audit, counters, reports
+from .analytics import invalidate_dashboard_snapshot
+from .jobs import enqueue
+from .models import Student, TransferApplication
+from .search import index_users
+
+
+class TransitionError(Exception):
+    """The requested status change is not allowed from the application's current status"""
+
+
+Transition = namedtuple('Transition', ['sources', 'target', 'comment_field'])
+
+TRANSITIONS = {
+    'hod': {
+        'approve': Transition(('pending_hod',), 'hod_approved', 'hod_comment'),
+        'reject': Transition(('pending_hod',), 'hod_rejected', 'hod_comment'),
+    },
+    'dean': {
+        'approve': Transition(('hod_approved',), 'dean_approved', 'dean_comment'),
+        'reject': Transition(('hod_approved',), 'dean_rejected', 'dean_comment'),
+    },
+    'registrar': {
+        'approve': Transition(('dean_approved',), 'completed', 'registrar_comment'),
+        'reject': Transition(('dean_approved',), 'registrar_rejected', 'registrar_comment'),
+    },
+}
+
+STATUS_LABELS = dict(TransferApplication.STATUS_CHOICES)
+
+
+def queue_status_notifications(application, comment='', override=False, status=None):
+    """Queue the job that notifies everyone affected by the application moving to ``status`` (default: its current one)"""
+    enqueue(
+        'application_status_changed',
+        application_id=application.id,
+        status=status or application.status,
+        comment=comment,
+        override=override,
+    )
+
+
+def apply_transition(application, expected_status, status, changes=None, comment='',
+                     student_changes=None, override=False):
+    """
+    Move ``application`` from ``expected_status`` to ``status`` with one conditional UPDATE.
+
+    ``changes`` are further TransferApplication columns to write and
+    ``student_changes`` columns to write on its Student. Raises
+    TransitionError, with nothing written, if the row is no longer in
+    ``expected_status``. On success the in-memory instance reflects the new
+    values.
+    """
+    changes = {**(changes or {}), 'status': status, 'last_updated': timezone.now()}
+    old_key = getattr(application, '_counter_key', None) or counters.counter_key(application)
+
+    with transaction.atomic():
+        updated = TransferApplication.objects.filter(pk=application.pk, status=expected_status).update(**changes)
+        if not updated:
+            raise TransitionError('This application has already been updated by someone else. Please reload it.')
+
+        # Transitions never move an application between programs or years
+        new_key = old_key[:3] + (status,)
+        # QuerySet.update() bypasses save() and its signals (counters, reports, search), so do their work here
+        counters.move(old_key, new_key)
+        reports.invalidate_for_counter_keys(old_key, new_key)
+        invalidate_dashboard_snapshot(sender=TransferApplication)
+
+        if student_changes:
+            try:
+                with transaction.atomic():
+                    Student.objects.filter(pk=application.student_id).update(**student_changes)
+            except IntegrityError:
+                # Raising out of the outer block rolls the status change back too
+                raise TransitionError('That admission number is already assigned to another student.')
+            index_users(Student.objects.filter(pk=application.student_id).values_list('user_id', flat=True))
+        queue_status_notifications(application, comment, override, status)
+        audit.record(
+            'application.override' if override else 'application.transition', application,
+            {'from': expected_status, 'to': status, 'comment': comment},
+            object_repr=f'Application #{application.pk}',
+        )
+
+    for field, value in changes.items():
+        setattr(application, field, value)
+    application._counter_key = new_key
+    return application
+
+
+def review(application, role, action, comment='', new_admission_number=None):
+    """Apply reviewer ``role``'s ``action`` ('approve' or 'reject') to ``application``"""
+    transition = TRANSITIONS[role].get(action)
+    if transition is None:
+        raise TransitionError('Unknown action.')
+    if application.status not in transition.sources:
+        raise TransitionError(
+            f'This application is {STATUS_LABELS.get(application.status, application.status)} '
+            f'and can no longer be reviewed here.'
+        )
+
+    changes = {transition.comment_field: comment}
+    student_changes = None
+    if transition.target == 'completed':
+        if not new_admission_number:
+            raise TransitionError('A new admission number is required to complete the transfer.')
+        changes['new_admission_number'] = new_admission_number
+        # The transfer takes effect in the same transaction as the approval
+        student_changes = {
+            'current_program_id': application.requested_program_id,
+            'admission_number': new_admission_number,
+        }
+
+    return apply_transition(
+        application, application.status, transition.target, changes, comment, student_changes,
+    )
+
+
+def review_many(applications, role, action, comment=''):
+    """
+    Apply reviewer ``role``'s ``action`` to every application in the
+    ``applications`` queryset that is still awaiting it, in one transaction.
+
+    The matching rows are locked, moved with a single UPDATE and their
+    notifications queued as one job. Rows another reviewer has already moved
+    are skipped. Returns the ids of the applications that were transitioned.
+    """
+    transition = TRANSITIONS[role].get(action)
+    if transition is None:
+        raise TransitionError('Unknown action.')
+    if transition.target == 'completed':
+        raise TransitionError('Transfers are completed one at a time, with a new admission number each.')
+
+    with transaction.atomic():
+        rows = list(
+            applications.filter(status__in=transition.sources)
+            .select_for_update(of=('self',))
+            .order_by('id')
+            .values_list('id', 'current_program_id', 'requested_program_id', 'academic_year', 'status')
+        )
+        if not rows:
+            return []
+        ids = [row[0] for row in rows]
+        TransferApplication.objects.filter(id__in=ids, status__in=transition.sources).update(
+            status=transition.target,
+            last_updated=timezone.now(),
+            **{transition.comment_field: comment},
+        )
+
+        moves = [(tuple(row[1:]), tuple(row[1:4]) + (transition.target,)) for row in rows]
+        counters.move_many(moves)
+        reports.invalidate_for_moves(moves)
+        invalidate_dashboard_snapshot(sender=TransferApplication)
+        enqueue('application_status_changed', application_ids=ids, status=transition.target, comment=comment)
+        audit.record_many(
+            audit.entry(
+                'application.transition', TransferApplication(pk=row[0]),
+                {'from': row[4], 'to': transition.target, 'comment': comment},
+                object_repr=f'Application #{row[0]}',
+            )
+            for row in rows
+        )
+    return ids
+
+
+def override_status(application, status, comment='', expected_status=None):
+    """
+    Admin override: set any status, provided the application is still in
+    ``expected_status`` (the status the admin saw; defaults to the loaded one).
+    """
+    if status not in STATUS_LABELS:
+        raise TransitionError('Unknown status.')
+    return apply_transition(
+        application, expected_status or application.status, status, comment=comment, override=True,
+    )
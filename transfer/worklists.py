@@ -0,0 +1,200 @@
+"""
+Reviewer worklists for the HOD, Dean and Registrar dashboards.
+
+Each worklist is a bounded, keyset-paginated slice of TransferApplication
+rows ordered descending on (<order_field>, id): newest first, or highest
+merit rank first for the Dean queue. Pages are fetched with
+the student, user and both program/faculty relations joined in, so the
+number of queries per dashboard stays fixed no matter how deep the queue is.
+
+The admin panel's user, student and application lists page the same way,
+with links back as well as forward and an estimated total in place of an
+exact COUNT(*).
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from .models import TransferApplication
+
+
+WORKLIST_PAGE_SIZE = 25
+# Planner estimates below this are replaced by an exact (cheap) count
+EXACT_COUNT_BELOW = getattr(settings, 'ESTIMATED_COUNT_EXACT_BELOW', 1000)
+ESTIMATE_CACHE_TTL = getattr(settings, 'ESTIMATED_COUNT_CACHE_TTL', 300)
+
+WORKLIST_RELATED = (
+    'student__user',
+    'current_program__faculty',
+    'requested_program__faculty',
+)
+
+
+def worklist_queryset(**filters):
+    """TransferApplication queryset with every relation the dashboards render"""
+    return TransferApplication.objects.filter(**filters).select_related(*WORKLIST_RELATED)
+
+
+# ============================================
+# CURSOR ENCODING
+# ============================================
+def encode_cursor(value, pk):
+    # Dates are stored as ISO strings, numbers (a merit rank, an id) with an "n:" prefix
+    if isinstance(value, datetime):
+        encoded = value.isoformat()
+    else:
+        encoded = f"n:{value!r}" if isinstance(value, int) else f"n:{float(value)!r}"
+    raw = f"{encoded}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (datetime or number, id) for a cursor token, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        if value.startswith('n:'):
+            number = value[2:]
+            return (int(number) if number.lstrip('-').isdigit() else float(number)), int(pk)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+# ============================================
+# ESTIMATED TOTALS
+# ============================================
+def estimated_count(queryset):
+    """
+    Roughly how many rows ``queryset`` has, without counting them on every page view.
+
+    PostgreSQL answers from the planner's row estimate (an EXPLAIN, no rows
+    read); small estimates, where the planner is least reliable and counting
+    is cheap anyway, are counted exactly. Elsewhere an exact count is cached
+    for ESTIMATE_CACHE_TTL seconds per distinct query.
+    """
+    queryset = queryset.order_by()
+    if connection.vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        rows = int(plan[0]['Plan']['Plan Rows'])
+        return queryset.count() if rows < EXACT_COUNT_BELOW else rows
+
+    sql, params = queryset.values('pk').query.sql_with_params()
+    key = 'worklists:count:' + hashlib.md5(f'{sql}|{params!r}'.encode()).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, ESTIMATE_CACHE_TTL)
+    return total
+
+
+# ============================================
+# WORKLIST PAGE
+# ============================================
+class WorklistPage:
+    """One page of a worklist, plus the links needed to move through it"""
+
+    def __init__(self, items, has_next, next_cursor, request, param,
+                 prev_cursor=None, before_param=None, estimated_total=None):
+        self.items = items
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.is_first = not request.GET.get(param) and not (before_param and request.GET.get(before_param))
+        self.estimated_total = estimated_total
+        self._request = request
+        self._param = param
+        self._before_param = before_param
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def _url(self, cursor, param=None):
+        params = self._request.GET.copy()
+        for name in (self._param, self._before_param, 'page'):
+            params.pop(name, None)
+        if cursor:
+            params[param or self._param] = cursor
+        query = params.urlencode()
+        return f"{self._request.path}?{query}" if query else self._request.path
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.has_next else None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    @property
+    def previous_url(self):
+        return self._url(self.prev_cursor, self._before_param) if self.has_previous else None
+
+    @property
+    def first_url(self):
+        return self._url(None)
+
+
+def keyset_page(queryset, request, param='after', order_field='application_date', per_page=WORKLIST_PAGE_SIZE,
+                before_param=None, estimate=False):
+    """
+    Fetch the page of ``queryset`` that follows the cursor in ``request.GET[param]``.
+
+    Rows are ordered by (-order_field, -id); one extra row is read to know
+    whether another page exists, so no COUNT(*) or OFFSET is ever issued.
+    With ``before_param`` the page also links back: a cursor there fetches
+    the page that precedes it. ``estimate`` adds ``estimated_total``.
+    """
+    fields = [order_field] if order_field == 'id' else [order_field, 'id']
+    before = decode_cursor(request.GET.get(before_param)) if before_param else None
+    cursor = None if before else decode_cursor(request.GET.get(param))
+    ordered = queryset.order_by(*[f'-{field}' for field in fields])
+
+    if before:
+        # Walk backwards (ascending) from the cursor, then flip the rows back
+        rows = list(_past(queryset.order_by(*fields), fields, before, 'gt')[:per_page + 1])
+        has_previous = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_next = True
+    else:
+        rows = list((_past(ordered, fields, cursor, 'lt') if cursor else ordered)[:per_page + 1])
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_previous = cursor is not None
+
+    next_cursor = prev_cursor = None
+    if has_next and items:
+        next_cursor = encode_cursor(getattr(items[-1], order_field), items[-1].pk)
+    if before_param and has_previous and items:
+        prev_cursor = encode_cursor(getattr(items[0], order_field), items[0].pk)
+
+    total = estimated_count(queryset) if estimate else None
+    return WorklistPage(items, has_next, next_cursor, request, param, prev_cursor, before_param, total)
+
+
+def _past(queryset, fields, cursor, lookup):
+    """Rows of ``queryset`` strictly past ``cursor`` in the direction of ``lookup`` ('lt' or 'gt')"""
+    value, pk = cursor
+    if len(fields) == 1:
+        return queryset.filter(**{f'id__{lookup}': pk})
+    order_field = fields[0]
+    return queryset.filter(
+        Q(**{f'{order_field}__{lookup}': value}) |
+        Q(**{order_field: value, f'id__{lookup}': pk})
+    )